@@ -13,4 +13,8 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core.sse import ChangeFeed  # noqa: E402 (needs configured settings)
+
+application = ChangeFeed(django_application, path='/api/recipe/events/')
@@ -54,6 +54,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.AdmissionControlMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -85,17 +88,46 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
+# With DB_POOL_SIZE set, connections return to the pool instead of closing
+# when CONN_MAX_AGE is up.
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'POOL_SIZE': int(os.environ.get('DB_POOL_SIZE', 0)),
+        'POOL_TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
     }
 }
 
+# Read replicas share the primary's credentials. Safe-method requests read
+# from them unless the client wrote within READ_YOUR_WRITES_WINDOW seconds.
+DATABASE_REPLICAS = []
+for index, host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))
+):
+    alias = f'replica_{index + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.db.routers.ReplicaRouter']
+
+READ_YOUR_WRITES_WINDOW = int(os.environ.get('DB_READ_YOUR_WRITES', 5))
+
+# 'postgres' fans change feed events out to every worker with NOTIFY,
+# 'local' only reaches streams held by the writing process.
+CHANGE_FEED_BACKEND = os.environ.get('CHANGE_FEED_BACKEND', 'postgres')
+CHANGE_FEED_HEARTBEAT = 15
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -139,6 +171,31 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# With STATIC_MANIFEST=1, as in deployment, collectstatic writes
+# content-hashed names with .gz/.br siblings for nginx to cache forever;
+# elsewhere, tests included, the plain names are served.
+STATIC_MANIFEST = bool(int(os.environ.get('STATIC_MANIFEST', 0)))
+STATICFILES_STORAGE = (
+    'core.storage.CompressedManifestStaticFilesStorage' if STATIC_MANIFEST
+    else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+)
+
+# One cache shared by every worker on the host through a memory-mapped
+# file, so cached values and read-your-writes pins are seen by all of them.
+# Unless CACHE_LOCATION is set, the file is named after this project.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.backends.shared_memory.SharedMemoryCache',
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+        'OPTIONS': {
+            'SIZE': int(os.environ.get('CACHE_SIZE', 32 * 1024 * 1024)),
+        },
+    }
+}
+
+# Seconds the readiness endpoint reuses its last dependency check results.
+READINESS_CACHE_TTL = int(os.environ.get('READINESS_CACHE_TTL', 5))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -148,7 +205,124 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core': {
+            'handlers': ['console'],
+            'level': os.environ.get('CORE_LOG_LEVEL', 'INFO'),
+        },
+    },
+}
+
+# Delta sync: seconds the returned watermark trails the request, days of
+# deletion history kept, and the largest page a client may ask for.
+SYNC_WATERMARK_LAG = 5
+SYNC_TOMBSTONE_RETENTION = 30
+SYNC_MAX_PAGE_SIZE = 500
+
+# Build recipe list JSON in Python ('python') or, on PostgreSQL, in the
+# database ('postgres').
+RECIPE_LIST_JSON = os.environ.get('RECIPE_LIST_JSON', 'python')
+
+# Response compression: smallest body worth compressing, codec levels, and
+# the cache holding compressed bodies of up to COMPRESSION_CACHE_MAX_SIZE.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_GZIP_LEVEL = 6
+COMPRESSION_BROTLI_QUALITY = 5
+COMPRESSION_CACHE = 'default'
+COMPRESSION_CACHE_TIMEOUT = 300
+COMPRESSION_CACHE_MAX_SIZE = 1024 * 1024
+
+# Share one computation between concurrent identical list requests.
+REQUEST_COALESCING = True
+
+# Admission control: token buckets per client credential (tokens a second
+# and bucket size), the cost of requests allowed in flight on the host, the
+# cost of heavy views and views never turned away. A batch costs 1 plus the
+# costs of its sub-requests.
+ADMISSION_CONTROL = True
+ADMISSION_CACHE = 'default'
+ADMISSION_RATE = 20
+ADMISSION_BURST = 100
+ADMISSION_MAX_IN_FLIGHT = 32
+ADMISSION_COSTS = {
+    'recipe:recipe-list': 5,
+    'recipe-async:recipe-list': 5,
+    'recipe:recipe-batch': 3,
+    'recipe:recipe-bulk-delete': 5,
+    'recipe:recipe-bulk-assign': 5,
+    'recipe:tag-bulk-delete': 5,
+    'recipe:ingredient-bulk-delete': 5,
+    'recipe:sync': 3,
 }
+ADMISSION_EXEMPT = ['health-check', 'liveness', 'readiness', 'metrics']
+
+# Idempotency keys: seconds the first response is replayed for retries and
+# seconds a retry waits for the first request to finish.
+IDEMPOTENCY_CACHE = 'default'
+IDEMPOTENCY_TTL = 24 * 60 * 60
+IDEMPOTENCY_WAIT = 10
+
+# Account deletion: rows deleted per short transaction, and whether a
+# job for run_worker carries it out ('queue'), a thread of the web worker
+# that took the request does ('thread') or only the process_deletions
+# command does ('command'). Only run_worker resumes deletions whose worker
+# went away, so the other modes need process_deletions run now and then.
+ACCOUNT_DELETION_BATCH_SIZE = 500
+ACCOUNT_DELETION_WORKER = os.environ.get('ACCOUNT_DELETION_WORKER', 'queue')
+
+# Background jobs: run_worker's default pool, attempts before a job is
+# dead-lettered, retry backoff doubling from JOB_RETRY_BACKOFF seconds up
+# to JOB_RETRY_BACKOFF_MAX, seconds before a silent worker's job is handed
+# to another, and seconds finished jobs are kept for.
+JOB_WORKER_POOL = os.environ.get('JOB_WORKER_POOL', 'thread')
+JOB_WORKER_CONCURRENCY = int(os.environ.get('JOB_WORKER_CONCURRENCY', 4))
+JOB_POLL_INTERVAL = 1
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF = 10
+JOB_RETRY_BACKOFF_MAX = 3600
+JOB_LEASE = 600
+JOB_RETENTION = 24 * 60 * 60
+
+# Cached list payloads: seconds fresh (0 disables), fraction of that cut at
+# random, seconds a stale list is served while one request recomputes it,
+# and how eagerly lists are recomputed before they expire.
+LIST_CACHE = 'default'
+LIST_CACHE_TIMEOUT = 60
+LIST_CACHE_JITTER = 0.1
+LIST_CACHE_STALE = 30
+LIST_CACHE_BETA = 1.0
+
+# Largest number of recipes a single batch retrieve may ask for.
+RECIPE_BATCH_MAX_IDS = 100
+
+# Largest number of ids, per list, a bulk delete or assignment may change.
+BULK_MAX_IDS = 500
+
+# Batch endpoint: sub-requests per batch, and threads shared by all
+# batches for running reads in parallel (0 runs everything in order).
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
 
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
@@ -0,0 +1,22 @@
+"""
+Settings for the test suite, which runs with
+
+    python manage.py test --settings=app.test_settings
+
+A second database, 'replica', is created and migrated like the primary but
+never receives its writes, standing for a replica that has not caught up.
+Reads are only routed to it by tests that list it in DATABASE_REPLICAS.
+"""
+from app.settings import *  # noqa: F401,F403
+from app.settings import CACHES, DATABASES
+
+
+DATABASES['replica'] = {
+    **DATABASES['default'],
+    'TEST': {'NAME': f"test_replica_{DATABASES['default']['NAME']}"},
+}
+DATABASE_REPLICAS = []
+
+# Each test process gets a cache of its own, so runs do not see each
+# other's values.
+CACHES['default']['OPTIONS']['PRIVATE'] = True
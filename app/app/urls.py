@@ -13,30 +13,38 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-)
-
 from django.contrib import admin
 from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
 from core import views as core_views
+from core.lazy import lazy_view
 
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/health-check/', core_views.health_check, name='health-check'),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
+    path('api/health-check/live/', core_views.health_check, name='liveness'),
+    path('api/health-check/ready/', core_views.readiness, name='readiness'),
+    path('api/metrics/', core_views.metrics, name='metrics'),
+    path('api/batch/', core_views.batch, name='batch'),
+    path(
+        'api/schema/',
+        lazy_view('drf_spectacular.views.SpectacularAPIView'),
+        name='api-schema',
+    ),
     path(
         'api/docs/',
-        SpectacularSwaggerView.as_view(url_name='api-schema'),
+        lazy_view(
+            'drf_spectacular.views.SpectacularSwaggerView',
+            url_name='api-schema',
+        ),
         name='api-docs',
     ),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
+    path('api/async/recipe/', include('recipe.async_urls')),
 ]
 
 if settings.DEBUG:
@@ -14,3 +14,16 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+if bool(int(os.environ.get('WSGI_WARMUP', 1))):
+    from core import warmup
+
+    try:
+        from uwsgidecorators import postfork
+    except ImportError:
+        warmup.warm_up()
+    else:
+        # Structures built in the master are shared with the forked workers;
+        # connections must be opened by each worker after the fork.
+        warmup.warm_up(connect=False)
+        postfork(warmup.warm_worker)
@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext_lazy as _
 
-from core import models
+from core import jobs, models
+from core.deletion import request_deletion
 
 
 class UserAdmin(BaseUserAdmin):
@@ -39,6 +40,7 @@ class UserAdmin(BaseUserAdmin):
         )
     )
     readonly_fields = ['last_login']
+    actions = ['delete_in_background']
     add_fieldsets = (
         (
             None,
@@ -57,8 +59,48 @@ class UserAdmin(BaseUserAdmin):
         ),
     )
 
+    @admin.action(description=_('Delete selected users in the background'))
+    def delete_in_background(self, request, queryset):
+        for user in queryset:
+            request_deletion(user)
+        self.message_user(
+            request, _('Deletion of %d users scheduled.') % len(queryset)
+        )
+
+
+class AccountDeletionAdmin(admin.ModelAdmin):
+    """ Show the progress of background account deletions. """
+    list_display = ['email', 'status', 'progress', 'requested_at',
+                    'finished_at']
+    readonly_fields = ['user', 'email', 'requested_at', 'claimed_at',
+                       'finished_at', 'total', 'deleted']
+
+    def has_add_permission(self, request):
+        return False
+
+
+class JobAdmin(admin.ModelAdmin):
+    """ Show queued jobs and retry dead-lettered ones. """
+    list_display = ['task', 'state', 'attempts', 'run_at', 'finished_at']
+    list_filter = ['state', 'task']
+    readonly_fields = ['task', 'kwargs', 'state', 'attempts', 'max_attempts',
+                       'run_at', 'locked_at', 'locked_by', 'last_error',
+                       'created_at', 'finished_at']
+    actions = ['retry']
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description=_('Retry selected jobs'))
+    def retry(self, request, queryset):
+        self.message_user(
+            request, _('%d jobs queued again.') % jobs.retry(queryset)
+        )
+
 
 admin.site.register(models.User, UserAdmin)
 admin.site.register(models.Recipe)
 admin.site.register(models.Tag)
 admin.site.register(models.Ingredient)
+admin.site.register(models.AccountDeletion, AccountDeletionAdmin)
+admin.site.register(models.Job, JobAdmin)
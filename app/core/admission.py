@@ -0,0 +1,202 @@
+"""
+Admission control shedding load before it reaches the views.
+
+Each request costs tokens: ``ADMISSION_COSTS`` names heavy views by URL
+name, other views cost 1 and ``ADMISSION_EXEMPT`` ones, such as the health
+checks, nothing. Two limits apply, shared by every worker on the host
+through the cache:
+
+* each client credential has a token bucket refilling at
+  ``ADMISSION_RATE`` tokens a second up to ``ADMISSION_BURST``; a client
+  that runs dry gets 429 with ``Retry-After``;
+* at most ``ADMISSION_MAX_IN_FLIGHT`` tokens' worth of requests are in
+  progress on the host; further requests get 503 at once instead of
+  queueing behind them.
+
+Anonymous requests have no bucket. In-flight costs are kept per process,
+so those of a worker that died are dropped.
+"""
+import math
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+from core.db import routers
+
+
+STATE_KEY = 'admission:state'
+BUCKET_PREFIX = 'admission:bucket:'
+
+_local_lock = threading.Lock()
+
+
+class Rejected(Exception):
+
+    def __init__(self, status, detail, retry_after):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+    def response(self):
+        response = JsonResponse({'detail': self.detail}, status=self.status)
+        response['Retry-After'] = str(max(1, math.ceil(self.retry_after)))
+        return response
+
+
+def _cache():
+    return caches[settings.ADMISSION_CACHE]
+
+
+def _update(key, func, timeout):
+    """Apply ``func`` to a cached value atomically."""
+    cache = _cache()
+    update = getattr(cache, 'update', None)
+    if update is not None:
+        return update(key, func, timeout)
+    # Without an atomic update only this process's updates are serialized,
+    # which covers per-process caches.
+    with _local_lock:
+        value = func(cache.get(key))
+        cache.set(key, value, timeout)
+        return value
+
+
+def path_cost(path):
+    try:
+        name = resolve(path).view_name
+    except Resolver404:
+        return 1
+    if name in settings.ADMISSION_EXEMPT:
+        return 0
+    return settings.ADMISSION_COSTS.get(name, 1)
+
+
+def request_cost(request):
+    return path_cost(request.path_info)
+
+
+def _new_state():
+    return {'in_flight': {}, 'admitted': 0, 'throttled': 0, 'shed': 0}
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _take(client, cost):
+    """Take ``cost`` tokens from the client's bucket, or return the wait."""
+    rate = settings.ADMISSION_RATE
+    burst = settings.ADMISSION_BURST
+    cost = min(cost, burst)
+    now = time.time()
+    wait = []
+
+    def take(bucket):
+        tokens, updated = bucket or (burst, now)
+        tokens = min(burst, tokens + max(0, now - updated) * rate)
+        if tokens >= cost:
+            tokens -= cost
+            wait.append(0)
+        else:
+            wait.append((cost - tokens) / rate)
+        return tokens, now
+
+    # An untouched bucket expires once it would have refilled anyway.
+    _update(BUCKET_PREFIX + client, take, math.ceil(burst / rate) + 1)
+    return wait[0]
+
+
+def _count_throttled():
+    def count(state):
+        state = state or _new_state()
+        state['throttled'] += 1
+        return state
+
+    _update(STATE_KEY, count, None)
+
+
+def _start(cost):
+    limit = settings.ADMISSION_MAX_IN_FLIGHT
+    pid = os.getpid()
+    admitted = []
+
+    def start(state):
+        state = state or _new_state()
+        in_flight = {
+            owner: owned for owner, owned in state['in_flight'].items()
+            if owner == pid or _alive(owner)
+        }
+        total = sum(in_flight.values())
+        # A request costlier than the limit still runs on an idle host.
+        if total and total + cost > limit:
+            state['shed'] += 1
+        else:
+            in_flight[pid] = in_flight.get(pid, 0) + cost
+            state['admitted'] += 1
+            admitted.append(True)
+        state['in_flight'] = in_flight
+        return state
+
+    _update(STATE_KEY, start, None)
+    return bool(admitted)
+
+
+def enter(request, cost=None):
+    """
+    Admit ``request`` at ``cost``, that of its view by default, or raise
+    ``Rejected``. Return the cost to hand to ``leave`` once the response
+    is ready.
+    """
+    if not settings.ADMISSION_CONTROL:
+        return 0
+    if cost is None:
+        cost = request_cost(request)
+    if not cost:
+        return 0
+    client = routers.client_key(request)
+    if client is not None:
+        wait = _take(client, cost)
+        if wait:
+            _count_throttled()
+            raise Rejected(429, 'Request was throttled.', wait)
+    if not _start(cost):
+        raise Rejected(503, 'Server is busy, please retry.', 1)
+    return cost
+
+
+def leave(cost):
+    if not cost:
+        return
+    pid = os.getpid()
+
+    def finish(state):
+        state = state or _new_state()
+        remaining = state['in_flight'].pop(pid, 0) - cost
+        if remaining > 0:
+            state['in_flight'][pid] = remaining
+        return state
+
+    _update(STATE_KEY, finish, None)
+
+
+def stats():
+    state = _cache().get(STATE_KEY) or _new_state()
+    return {
+        'in_flight': sum(state['in_flight'].values()),
+        'limit': settings.ADMISSION_MAX_IN_FLIGHT,
+        'admitted': state['admitted'],
+        'throttled': state['throttled'],
+        'shed': state['shed'],
+    }
@@ -4,3 +4,28 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core import (
+            admission, caching, compression, deletion, events, jobs,
+            metrics, singleflight, tracking, warmup,
+        )
+        from core import schema  # noqa: F401 (registers its extensions)
+        from core.cache.backends import shared_memory
+        from core.db import pool
+        from core.db.backends.postgresql import base
+
+        metrics.register('db_connections', base.connection_stats)
+        metrics.register('db_pool', pool.stats)
+        metrics.register('warmup', lambda: dict(warmup.last_report))
+        metrics.register('change_feed', events.broker.stats)
+        metrics.register('compression', compression.stats)
+        metrics.register('request_coalescing', singleflight.group.stats)
+        metrics.register('shared_cache', shared_memory.stats)
+        metrics.register('list_cache', caching.stats)
+        metrics.register('admission', admission.stats)
+        metrics.register('deletion', deletion.stats)
+        metrics.register('jobs', jobs.stats)
+        events.connect_signals()
+        tracking.connect_signals()
+        caching.connect_signals()
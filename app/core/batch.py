@@ -0,0 +1,243 @@
+"""
+Run a list of API sub-requests in-process and return their responses.
+
+Sub-requests are resolved against the project URLconf and dispatched
+straight to their views, which authenticate them as the user of the batch
+request through ``BatchAuthentication``, so a client pays one round trip
+and one authentication for all of them.
+Runs of consecutive reads may be executed on a thread pool; writes always
+run alone and in order.
+
+Going straight to the views skips the middleware, whose effects come from
+the batch request instead: it is admitted at the cost of all its
+sub-requests, its response is compressed as a whole, and as a POST it
+reads from the primary, with any write pinning the client there
+afterwards. Idempotency keys are handled by the views, so a sub-request
+with an ``Idempotency-Key`` header is deduplicated as usual.
+"""
+import functools
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from rest_framework.authentication import (
+    BaseAuthentication, TokenAuthentication,
+)
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import BooleanField
+from rest_framework.utils.encoders import JSONEncoder
+
+from core import admission
+
+
+# Only API endpoints can be batched; the admin and the like cannot.
+PATH_PREFIX = '/api/'
+METHODS = {'GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'}
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+# Request metadata shared by every sub-request.
+INHERITED_META = [
+    'HTTP_ACCEPT_LANGUAGE',
+    'HTTP_HOST',
+    'HTTP_USER_AGENT',
+    'REMOTE_ADDR',
+    'SERVER_NAME',
+    'SERVER_PORT',
+]
+
+
+class BatchError(ValueError):
+    """The batch payload is malformed."""
+
+
+class BatchAuthentication(BaseAuthentication):
+    """
+    Authenticate a sub-request as its batch request; other requests are
+    left to the authentication classes after this one.
+    """
+
+    def authenticate(self, request):
+        return getattr(request, 'batch_credentials', None)
+
+    def authenticate_header(self, request):
+        # Clients outside a batch still authenticate with a token.
+        return TokenAuthentication.keyword
+
+
+def parse(data):
+    """Validate a batch payload and return its list of sub-requests."""
+    if not isinstance(data, dict) or not isinstance(
+        data.get('requests'), list
+    ):
+        raise BatchError('Expected an object with a list of requests.')
+    limit = settings.BATCH_MAX_REQUESTS
+    if not 0 < len(data['requests']) <= limit:
+        raise BatchError(f'A batch must hold between 1 and {limit} requests.')
+
+    subrequests = []
+    for index, item in enumerate(data['requests']):
+        if not isinstance(item, dict):
+            raise BatchError(f'Request {index} must be an object.')
+        method = str(item.get('method', 'GET')).upper()
+        path = item.get('path')
+        headers = item.get('headers', {})
+        if method not in METHODS:
+            raise BatchError(f'Request {index} has an invalid method.')
+        if not isinstance(path, str) or not path.startswith('/'):
+            raise BatchError(f'Request {index} needs an absolute path.')
+        if not path.startswith(PATH_PREFIX):
+            raise BatchError(f'Request {index} must be under {PATH_PREFIX}.')
+        if not isinstance(headers, dict):
+            raise BatchError(f'Request {index} headers must be an object.')
+        subrequests.append({
+            'method': method,
+            'path': path,
+            'headers': headers,
+            'body': item.get('body'),
+        })
+    return subrequests
+
+
+def parse_parallel(data):
+    """Return the batch's ``parallel`` flag, read as DRF reads booleans."""
+    try:
+        return BooleanField().to_internal_value(data.get('parallel', False))
+    except ValidationError:
+        raise BatchError('parallel must be a boolean.')
+
+
+def cost(subrequests):
+    """
+    What the sub-requests cost admission control together; they skip the
+    middleware, so the batch view charges it for them.
+    """
+    return sum(
+        admission.path_cost(urlsplit(subrequest['path']).path)
+        for subrequest in subrequests
+    )
+
+
+def _build_request(parent, subrequest):
+    url = urlsplit(subrequest['path'])
+    body = b''
+    if subrequest['body'] is not None:
+        body = json.dumps(subrequest['body'], cls=JSONEncoder).encode()
+    environ = {
+        key: parent.META[key] for key in INHERITED_META if key in parent.META
+    }
+    environ.update({
+        'REQUEST_METHOD': subrequest['method'],
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': parent.scheme,
+    })
+    for name, value in subrequest['headers'].items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = str(value)
+    return WSGIRequest(environ)
+
+
+def _dispatch(request, user, auth):
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return 404, {}, b'{"detail":"Not found."}'
+    if getattr(match.func, 'batchable', True) is False:
+        return 400, {}, b'{"detail":"Batch requests cannot be nested."}'
+
+    request.user = user
+    request.batch_credentials = (user, auth)
+    view = convert_exception_to_response(
+        functools.partial(match.func, *match.args, **match.kwargs)
+    )
+    response = view(request)
+    if hasattr(response, 'render'):
+        response.render()
+    if response.streaming:
+        content = b''.join(response.streaming_content)
+    else:
+        content = response.content
+
+    if content and 'json' not in response.get('Content-Type', ''):
+        content = json.dumps(content.decode('utf-8', 'replace')).encode()
+    headers = {
+        name: value for name, value in response.items()
+        if name in ('Location', 'ETag', 'Content-Type')
+    }
+    return response.status_code, headers, content or b'null'
+
+
+def _dispatch_in_thread(request, user, auth):
+    try:
+        return _dispatch(request, user, auth)
+    finally:
+        connections.close_all()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                settings.BATCH_MAX_WORKERS,
+                thread_name_prefix='batch',
+            )
+        return _executor
+
+
+def _runs(subrequests, parallel):
+    """Group consecutive reads so each group can run concurrently."""
+    run = []
+    for subrequest in subrequests:
+        if parallel and subrequest['method'] in SAFE_METHODS:
+            run.append(subrequest)
+            continue
+        if run:
+            yield run
+            run = []
+        yield [subrequest]
+    if run:
+        yield run
+
+
+def execute(parent, subrequests, user, auth, parallel=False):
+    """Run the sub-requests and return ``(status, headers, body)`` each."""
+    parallel = parallel and settings.BATCH_MAX_WORKERS > 0
+    results = []
+    for run in _runs(subrequests, parallel):
+        requests = [_build_request(parent, sub) for sub in run]
+        if len(requests) == 1:
+            results.append(_dispatch(requests[0], user, auth))
+            continue
+        executor = _get_executor()
+        results.extend(executor.map(
+            lambda request: _dispatch_in_thread(request, user, auth),
+            requests,
+        ))
+    return results
+
+
+def encode(results):
+    """Join sub-responses into one JSON document without re-parsing them."""
+    parts = []
+    for status, headers, content in results:
+        parts.append(
+            b'{"status":%d,"headers":%s,"body":%s}'
+            % (status, json.dumps(headers).encode(), content)
+        )
+    return b'{"responses":[' + b','.join(parts) + b']}'
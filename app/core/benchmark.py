@@ -0,0 +1,118 @@
+"""
+Helpers shared by the ``bench_*`` management commands.
+"""
+import contextlib
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import (Recipe, Tag, Ingredient)
+
+
+def measure(func, iterations):
+    """Call ``func`` repeatedly and return each duration in seconds."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def summarize(samples):
+    """Reduce duration samples to millisecond statistics."""
+    ordered = sorted(samples)
+    return {
+        'n': len(ordered),
+        'mean_ms': statistics.mean(ordered) * 1000,
+        'p50_ms': ordered[len(ordered) // 2] * 1000,
+        'p99_ms': ordered[min(len(ordered) - 1,
+                              int(len(ordered) * 0.99))] * 1000,
+    }
+
+
+def format_row(label, summary):
+    return (
+        f"{label:<40} n={summary['n']:<6} "
+        f"mean={summary['mean_ms']:8.3f}ms "
+        f"p50={summary['p50_ms']:8.3f}ms "
+        f"p99={summary['p99_ms']:8.3f}ms"
+    )
+
+
+def populate(user, recipes, tags_per_recipe=3, ingredients_per_recipe=5):
+    """Create a library of recipes with tags and ingredients for a user."""
+    Tag.objects.bulk_create(
+        Tag(user=user, name=f'tag {i}') for i in range(tags_per_recipe * 4)
+    )
+    Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f'ingredient {i}')
+        for i in range(ingredients_per_recipe * 4)
+    )
+    Recipe.objects.bulk_create(
+        Recipe(
+            user=user,
+            title=f'Recipe {i}',
+            time_minutes=10 + i % 50,
+            price=Decimal('5.25'),
+            link='http://example.com/recipe.pdf',
+            description='Benchmark recipe',
+        )
+        for i in range(recipes)
+    )
+    # Not every backend returns primary keys from bulk inserts.
+    tags = list(Tag.objects.filter(user=user).order_by('id'))
+    ingredients = list(Ingredient.objects.filter(user=user).order_by('id'))
+    created = list(Recipe.objects.filter(user=user).order_by('id'))
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(
+            recipe_id=recipe.pk,
+            tag_id=tags[(i + j) % len(tags)].pk,
+        )
+        for i, recipe in enumerate(created)
+        for j in range(tags_per_recipe)
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        Recipe.ingredients.through(
+            recipe_id=recipe.pk,
+            ingredient_id=ingredients[(i + j) % len(ingredients)].pk,
+        )
+        for i, recipe in enumerate(created)
+        for j in range(ingredients_per_recipe)
+    )
+    return created
+
+
+@contextlib.contextmanager
+def bench_user(recipes=0):
+    """
+    Yield a throwaway user owning ``recipes`` recipes. The user and its
+    library are removed afterwards.
+    """
+    user = get_user_model().objects.create_user(
+        email=f'bench-{uuid.uuid4().hex}@example.com',
+        password=uuid.uuid4().hex,
+    )
+    try:
+        populate(user, recipes)
+        yield user
+    finally:
+        user.delete()
+
+
+@contextlib.contextmanager
+def bench_client(recipes=0):
+    """Yield an API client authenticated as a ``bench_user``."""
+    with bench_user(recipes) as user:
+        token = Token.objects.create(user=user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            yield client
@@ -0,0 +1,518 @@
+"""
+Cache backend in a memory-mapped file shared by every process on a host.
+
+All uwsgi workers map the same file, under ``/dev/shm`` by default and
+named after the project's settings, so a value cached by one worker is a
+hit in the others and nothing is cached once per process. The segment is
+split into slab classes of fixed-size slots, each laid out as a
+set-associative table: a key hashes to one set of slots per class and is
+stored in the smallest class it fits. When a set is full, its least
+recently read entry is evicted.
+
+Reads take no lock. Each slot carries a sequence number that a writer
+makes odd while changing the slot and even again when done, and a read
+that saw it change is discarded. Writers on the host serialize on an
+``fcntl`` lock on the file, plus a thread lock within the process.
+
+Extra ``OPTIONS`` understood by this backend:
+
+* ``SIZE``: bytes of the shared segment.
+* ``MAX_ENTRY_SIZE``: largest key and pickled value stored together;
+  larger values are not cached.
+* ``WAYS``: slots per set, i.e. the entries an eviction chooses from.
+* ``PRIVATE``: keep the segment to this process and its forks, as for a
+  test run, removing the file as soon as it is mapped.
+"""
+import contextlib
+import fcntl
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import ENVIRONMENT_VARIABLE, settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.core.exceptions import ImproperlyConfigured
+
+from core import metrics
+
+
+MAGIC = b'SHMCACHE'
+
+# Magic and a fingerprint of the layout, so a changed layout is detected.
+HEADER = struct.Struct('<8sQ')
+HEADER_SIZE = 4096
+
+# Sequence number, expiry time (0 for never), key length, value length and
+# last read time of a slot.
+ENTRY = struct.Struct('<QdIId')
+SEQUENCE = struct.Struct('<Q')
+TIME = struct.Struct('<d')
+EXPIRES_OFFSET = 8
+READ_AT_OFFSET = 24
+HASH = struct.Struct('<Q')
+
+SLOT_SIZES = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+DEFAULT_SIZE = 32 * 1024 * 1024
+DEFAULT_MAX_ENTRY_SIZE = 1024 * 1024
+DEFAULT_WAYS = 8
+
+_segments = {}
+_segments_lock = threading.Lock()
+
+
+def _hash(data):
+    """Return a nonzero 64-bit hash of ``data``, the same in every process."""
+    digest = hashlib.blake2b(data, digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+class _Slab:
+    """A slab class: ``sets`` x ``ways`` slots of ``slot_size`` bytes."""
+
+    def __init__(self, offset, slot_size, sets, ways):
+        self.slot_size = slot_size
+        self.sets = sets
+        self.ways = ways
+        self.hashes = struct.Struct(f'<{ways}Q')
+        slots = sets * ways
+        self.hash_offset = offset
+        self.entry_offset = self.hash_offset + slots * HASH.size
+        self.data_offset = self.entry_offset + slots * ENTRY.size
+        self.end = self.data_offset + slots * slot_size
+
+    def hash_at(self, set_index, way=0):
+        return self.hash_offset + (set_index * self.ways + way) * HASH.size
+
+    def entry_at(self, set_index, way):
+        return self.entry_offset + (set_index * self.ways + way) * ENTRY.size
+
+    def data_at(self, set_index, way):
+        return self.data_offset + (set_index * self.ways + way) * \
+            self.slot_size
+
+
+def _layout(size, max_entry_size, ways):
+    """Split ``size`` bytes evenly between the slab classes."""
+    max_entry_size = -(-max_entry_size // 8) * 8
+    slot_sizes = [s for s in SLOT_SIZES if s < max_entry_size]
+    slot_sizes.append(max_entry_size)
+    share = (size - HEADER_SIZE) // len(slot_sizes)
+    slabs, offset = [], HEADER_SIZE
+    for slot_size in slot_sizes:
+        slots = share // (slot_size + ENTRY.size + HASH.size)
+        if slots < 1:
+            raise ImproperlyConfigured(
+                f'SIZE {size} is too small for entries of {slot_size} bytes'
+            )
+        slab = _Slab(offset, slot_size, max(1, slots // ways),
+                     min(ways, slots))
+        slabs.append(slab)
+        offset = slab.end
+    return slabs
+
+
+class _Segment:
+    """The shared file mapped into this process."""
+
+    def __init__(self, path, size, max_entry_size, ways, private=False):
+        self.path = path
+        self.private = private
+        self.slabs = _layout(size, max_entry_size, ways)
+        self.size = self.slabs[-1].end
+        self.fingerprint = _hash(repr([
+            (slab.slot_size, slab.sets, slab.ways) for slab in self.slabs
+        ]).encode())
+        self._fd = None
+        self._buffer = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._counters = metrics.Counters(
+            'hits', 'misses', 'sets', 'evictions',
+        )
+
+    def _attached(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with _segments_lock:
+                if self._pid != pid:
+                    # A forked child keeps the shared mapping but not the
+                    # thread lock's owner.
+                    self._lock = threading.Lock()
+                    if self._buffer is None:
+                        self._fd, self._buffer = self._attach()
+                    self._pid = pid
+        return self._buffer
+
+    def _attach(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            fcntl.lockf(fd, fcntl.LOCK_EX, 1)
+            buffer = None
+            try:
+                buffer = self._map(fd)
+            finally:
+                if buffer is None:
+                    # Closing the descriptor releases the lock too.
+                    os.close(fd)
+                else:
+                    if self.private:
+                        os.unlink(self.path)
+                    fcntl.lockf(fd, fcntl.LOCK_UN, 1)
+            if buffer is not None:
+                return fd, buffer
+
+    def _map(self, fd):
+        """Map the locked file, or return None if it must be reopened."""
+        stat = os.fstat(fd)
+        try:
+            if os.stat(self.path).st_ino != stat.st_ino:
+                return None
+        except FileNotFoundError:
+            return None
+        if stat.st_size == 0:
+            os.ftruncate(fd, self.size)
+            buffer = mmap.mmap(fd, self.size)
+            HEADER.pack_into(buffer, 0, MAGIC, self.fingerprint)
+            return buffer
+        if stat.st_size == self.size:
+            buffer = mmap.mmap(fd, self.size)
+            if HEADER.unpack_from(buffer) == (MAGIC, self.fingerprint):
+                return buffer
+            buffer.close()
+        # Laid out differently: start a new file, leaving the old one to
+        # any process still mapping it.
+        os.unlink(self.path)
+        return None
+
+    @contextlib.contextmanager
+    def _writing(self):
+        buffer = self._attached()
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1)
+            try:
+                yield buffer
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1)
+
+    def read(self, key, key_hash, now):
+        """Return the value stored for ``key``, or None."""
+        buffer = self._attached()
+        for slab in self.slabs:
+            set_index = key_hash % slab.sets
+            hashes = slab.hashes.unpack_from(buffer, slab.hash_at(set_index))
+            if key_hash not in hashes:
+                continue
+            for way, stored_hash in enumerate(hashes):
+                if stored_hash != key_hash:
+                    continue
+                value = self._read_slot(buffer, slab, set_index, way, key,
+                                        now)
+                if value is not None:
+                    self._counters.add(hits=1)
+                    return value
+        self._counters.add(misses=1)
+        return None
+
+    def _read_slot(self, buffer, slab, set_index, way, key, now):
+        entry = slab.entry_at(set_index, way)
+        sequence, expires, key_length, value_length, _ = \
+            ENTRY.unpack_from(buffer, entry)
+        if sequence & 1 or key_length + value_length > slab.slot_size:
+            return None
+        data = slab.data_at(set_index, way)
+        stored = buffer[data:data + key_length + value_length]
+        if SEQUENCE.unpack_from(buffer, entry)[0] != sequence:
+            return None
+        if stored[:key_length] != key or 0 < expires <= now:
+            return None
+        TIME.pack_into(buffer, entry + READ_AT_OFFSET, now)
+        return memoryview(stored)[key_length:]
+
+    def _find(self, buffer, key, key_hash):
+        """Locate ``key`` while holding the write lock."""
+        for slab in self.slabs:
+            set_index = key_hash % slab.sets
+            hashes = slab.hashes.unpack_from(buffer, slab.hash_at(set_index))
+            for way, stored_hash in enumerate(hashes):
+                if stored_hash != key_hash:
+                    continue
+                _, expires, key_length, _, _ = ENTRY.unpack_from(
+                    buffer, slab.entry_at(set_index, way)
+                )
+                data = slab.data_at(set_index, way)
+                if buffer[data:data + key_length] == key:
+                    return slab, set_index, way, expires
+        return None
+
+    def _victim(self, buffer, slab, set_index, now):
+        hashes = slab.hashes.unpack_from(buffer, slab.hash_at(set_index))
+        oldest, oldest_read_at = 0, None
+        for way, stored_hash in enumerate(hashes):
+            if not stored_hash:
+                return way
+            _, expires, _, _, read_at = ENTRY.unpack_from(
+                buffer, slab.entry_at(set_index, way)
+            )
+            if 0 < expires <= now:
+                return way
+            if oldest_read_at is None or read_at < oldest_read_at:
+                oldest, oldest_read_at = way, read_at
+        self._counters.add(evictions=1)
+        return oldest
+
+    def _begin(self, buffer, entry):
+        # Odd even if a writer died half way, so readers keep away.
+        sequence = SEQUENCE.unpack_from(buffer, entry)[0] | 1
+        SEQUENCE.pack_into(buffer, entry, sequence)
+        return sequence
+
+    def _clear_slot(self, buffer, slab, set_index, way):
+        entry = slab.entry_at(set_index, way)
+        sequence = self._begin(buffer, entry)
+        HASH.pack_into(buffer, slab.hash_at(set_index, way), 0)
+        SEQUENCE.pack_into(buffer, entry, sequence + 1)
+
+    def _store(self, buffer, found, key, key_hash, value, expires, now):
+        size = len(key) + len(value)
+        slab = next(
+            (slab for slab in self.slabs if slab.slot_size >= size), None
+        )
+        if found is not None and found[0] is not slab:
+            self._clear_slot(buffer, *found[:3])
+            found = None
+        if slab is None:
+            return False
+        if found is not None:
+            set_index, way = found[1:3]
+        else:
+            set_index = key_hash % slab.sets
+            way = self._victim(buffer, slab, set_index, now)
+        entry = slab.entry_at(set_index, way)
+        sequence = self._begin(buffer, entry)
+        data = slab.data_at(set_index, way)
+        buffer[data:data + size] = key + value
+        ENTRY.pack_into(buffer, entry, sequence, expires, len(key),
+                        len(value), now)
+        HASH.pack_into(buffer, slab.hash_at(set_index, way), key_hash)
+        SEQUENCE.pack_into(buffer, entry, sequence + 1)
+        self._counters.add(sets=1)
+        return True
+
+    def write(self, key, key_hash, value, expires, now, replace=True):
+        """
+        Store ``value`` for ``key``. Unless ``replace``, leave a live value
+        alone and return False.
+        """
+        with self._writing() as buffer:
+            found = self._find(buffer, key, key_hash)
+            if not replace and found is not None and \
+                    not 0 < found[3] <= now:
+                return False
+            return self._store(buffer, found, key, key_hash, value, expires,
+                               now)
+
+    def update(self, key, key_hash, func, expires, now):
+        """
+        Store ``func(value)`` for ``key``, passing None when it has no live
+        value, and return what was stored. An ``expires`` of None keeps the
+        expiry of the live value.
+        """
+        with self._writing() as buffer:
+            found = self._find(buffer, key, key_hash)
+            value = None
+            if found is not None and not 0 < found[3] <= now:
+                slab, set_index, way, current_expires = found
+                _, _, key_length, value_length, _ = ENTRY.unpack_from(
+                    buffer, slab.entry_at(set_index, way)
+                )
+                data = slab.data_at(set_index, way) + key_length
+                value = buffer[data:data + value_length]
+                if expires is None:
+                    expires = current_expires
+            value = func(value)
+            self._store(buffer, found, key, key_hash, value, expires or 0.0,
+                        now)
+            return value
+
+    def touch(self, key, key_hash, expires, now):
+        with self._writing() as buffer:
+            found = self._find(buffer, key, key_hash)
+            if found is None or 0 < found[3] <= now:
+                return False
+            slab, set_index, way, _ = found
+            entry = slab.entry_at(set_index, way)
+            sequence = self._begin(buffer, entry)
+            TIME.pack_into(buffer, entry + EXPIRES_OFFSET, expires)
+            SEQUENCE.pack_into(buffer, entry, sequence + 1)
+            return True
+
+    def delete(self, key, key_hash):
+        with self._writing() as buffer:
+            found = self._find(buffer, key, key_hash)
+            if found is None:
+                return False
+            self._clear_slot(buffer, *found[:3])
+            return True
+
+    def clear(self):
+        with self._writing() as buffer:
+            for slab in self.slabs:
+                for set_index in range(slab.sets):
+                    hashes = slab.hashes.unpack_from(
+                        buffer, slab.hash_at(set_index)
+                    )
+                    for way, stored_hash in enumerate(hashes):
+                        # Through the sequence number, so reads already
+                        # past the hash check discard what they copied.
+                        if stored_hash:
+                            self._clear_slot(buffer, slab, set_index, way)
+
+    def stats(self):
+        buffer = self._attached()
+        entries = capacity = 0
+        for slab in self.slabs:
+            with memoryview(buffer)[
+                slab.hash_offset:slab.entry_offset
+            ] as hashes:
+                slots = hashes.cast('Q').tolist()
+            entries += len(slots) - slots.count(0)
+            capacity += len(slots)
+        stats = self._counters.snapshot()
+        stats.update(entries=entries, capacity=capacity, size=self.size)
+        return stats
+
+
+def _segment(path, size, max_entry_size, ways, private):
+    key = (path, size, max_entry_size, ways)
+    with _segments_lock:
+        if key not in _segments:
+            _segments[key] = _Segment(path, size, max_entry_size, ways,
+                                      private)
+        return _segments[key]
+
+
+def default_location(private=False):
+    """
+    A file named after the settings module and project directory, so
+    projects on one host do not share a cache, and after the process too
+    if ``private``.
+    """
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else \
+        tempfile.gettempdir()
+    project = hashlib.blake2b(
+        f'{os.environ.get(ENVIRONMENT_VARIABLE, "")}:'
+        f'{getattr(settings, "BASE_DIR", "")}'.encode(),
+        digest_size=8,
+    ).hexdigest()
+    name = f'django-shared-cache-{project}'
+    if private:
+        name += f'-{os.getpid()}'
+    return os.path.join(directory, name)
+
+
+def stats():
+    """Return counters and occupancy of the segments this process uses."""
+    with _segments_lock:
+        segments = list(_segments.values())
+    return {segment.path: segment.stats() for segment in segments}
+
+
+class SharedMemoryCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        private = bool(options.get('PRIVATE', False))
+        self._segment = _segment(
+            location or default_location(private),
+            int(options.get('SIZE', DEFAULT_SIZE)),
+            int(options.get('MAX_ENTRY_SIZE', DEFAULT_MAX_ENTRY_SIZE)),
+            int(options.get('WAYS', DEFAULT_WAYS)),
+            private,
+        )
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        data = key.encode()
+        return data, _hash(data)
+
+    def _expires(self, timeout):
+        expires = self.get_backend_timeout(timeout)
+        return 0.0 if expires is None else expires
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        data, key_hash = self._key(key, version)
+        return self._segment.write(
+            data, key_hash, pickle.dumps(value, self.pickle_protocol),
+            self._expires(timeout), time.time(), replace=False,
+        )
+
+    def get(self, key, default=None, version=None):
+        data, key_hash = self._key(key, version)
+        value = self._segment.read(data, key_hash, time.time())
+        if value is None:
+            return default
+        return pickle.loads(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        data, key_hash = self._key(key, version)
+        self._segment.write(
+            data, key_hash, pickle.dumps(value, self.pickle_protocol),
+            self._expires(timeout), time.time(),
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        data, key_hash = self._key(key, version)
+        return self._segment.touch(
+            data, key_hash, self._expires(timeout), time.time()
+        )
+
+    def update(self, key, func, timeout=DEFAULT_TIMEOUT, version=None):
+        """
+        Atomically replace the value of ``key`` with ``func(value)``, where
+        ``value`` is None if there is none, and return the new value.
+        """
+        data, key_hash = self._key(key, version)
+        result = []
+
+        def apply(value):
+            result.append(func(None if value is None else pickle.loads(value)))
+            return pickle.dumps(result[0], self.pickle_protocol)
+
+        self._segment.update(data, key_hash, apply, self._expires(timeout),
+                             time.time())
+        return result[0]
+
+    def incr(self, key, delta=1, version=None):
+        data, key_hash = self._key(key, version)
+
+        def add_delta(value):
+            if value is None:
+                raise KeyError(key)
+            return pickle.dumps(pickle.loads(value) + delta,
+                                self.pickle_protocol)
+
+        try:
+            value = self._segment.update(data, key_hash, add_delta, None,
+                                         time.time())
+        except KeyError:
+            raise ValueError("Key '%s' not found" % key)
+        return pickle.loads(value)
+
+    def delete(self, key, version=None):
+        data, key_hash = self._key(key, version)
+        return self._segment.delete(data, key_hash)
+
+    def clear(self):
+        self._segment.clear()
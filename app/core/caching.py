@@ -0,0 +1,166 @@
+"""
+Cached computations that do not stampede when they expire.
+
+``get_or_compute`` stores a value with the time computing it took and:
+
+* recomputes it early with a probability that rises as expiry nears and
+  with the cost of recomputing (XFetch), so one request usually refreshes
+  a hot key before it expires at all;
+* lets one request at a time recompute a key, under a lock in the cache,
+  while the others serve the stale value kept for ``stale`` seconds past
+  expiry, or wait for the new one when there is none to serve;
+* jitters each timeout, so keys written together don't expire together.
+
+Values belong to a generation of their scope, and ``invalidate`` starts a
+new one, turning every value of the scope stale at once. Writes to a
+user's recipes, tags or ingredients invalidate the user's library scope
+straight away, and ``core.events`` again once they commit, in case a list
+read before the commit was cached meanwhile.
+"""
+import math
+import random
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from core import metrics
+from core.models import Recipe, Tag, Ingredient
+
+
+GENERATION_PREFIX = 'generation:'
+LOCK_PREFIX = 'recompute:'
+
+# Seconds between checks for a value another request is recomputing.
+POLL_INTERVAL = 0.01
+
+_counters = metrics.Counters(
+    'hits', 'stale_hits', 'misses', 'early_recomputes', 'waits',
+)
+stats = _counters.snapshot
+
+
+def generation(cache, scope):
+    key = GENERATION_PREFIX + scope
+    current = cache.get(key)
+    if current is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        current = cache.get(key)
+    return current
+
+
+def invalidate(cache, scope):
+    """Make every value cached in ``scope`` stale."""
+    cache.set(GENERATION_PREFIX + scope, uuid.uuid4().hex, None)
+
+
+def _recompute_early(now, cost, expires, beta):
+    # -log(u) for u in (0, 1] is exponentially distributed around 1.
+    return now - cost * beta * math.log(1 - random.random()) >= expires
+
+
+def _compute(cache, key, compute, current, timeout, stale, jitter):
+    start = time.perf_counter()
+    value = compute()
+    cost = time.perf_counter() - start
+    timeout *= 1 - jitter * random.random()
+    cache.set(key, (value, current, cost, time.time() + timeout),
+              timeout + stale)
+    return value
+
+
+def get_or_compute(cache, key, compute, timeout, scope=None, stale=0,
+                   beta=1.0, jitter=0.0, lock_timeout=10, allow_stale=True):
+    """
+    Return the value cached for ``key`` in ``scope``, calling ``compute``
+    to refresh it as described above. Pass ``allow_stale=False`` for a
+    caller that must see every write, which then waits for a fresh value.
+    """
+    current = generation(cache, scope) if scope is not None else None
+    entry = cache.get(key)
+    now = time.time()
+    fresh = servable = False
+    if entry is not None:
+        value, entry_generation, cost, expires = entry
+        fresh = entry_generation == current and now < expires
+        if fresh and not _recompute_early(now, cost, expires, beta):
+            _counters.add(hits=1)
+            return value
+        servable = fresh or allow_stale
+
+    lock_key = LOCK_PREFIX + key
+    if cache.add(lock_key, True, lock_timeout):
+        _counters.add(**{'early_recomputes' if fresh else 'misses': 1})
+        try:
+            return _compute(cache, key, compute, current, timeout, stale,
+                            jitter)
+        finally:
+            cache.delete(lock_key)
+    if servable:
+        _counters.add(**{'hits' if fresh else 'stale_hits': 1})
+        return value
+
+    _counters.add(waits=1)
+    deadline = now + lock_timeout
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry[1] == current:
+            return entry[0]
+        if cache.get(lock_key) is None:
+            break
+    return _compute(cache, key, compute, current, timeout, stale, jitter)
+
+
+def library_scope(user_id):
+    return f'library:{user_id}'
+
+
+def _library_cache():
+    return caches[settings.LIST_CACHE]
+
+
+def invalidate_library(user_id):
+    invalidate(_library_cache(), library_scope(user_id))
+
+
+def _owned_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_library(instance.user_id)
+
+
+def _relations_changed(sender, instance, action, **kwargs):
+    if action.startswith('post_'):
+        invalidate_library(instance.user_id)
+
+
+def _user_changed(sender, instance, created=True, raw=False, **kwargs):
+    # Primary keys of deleted users can come back.
+    if created and not raw:
+        invalidate_library(instance.pk)
+
+
+def connect_signals():
+    user_model = get_user_model()
+    post_save.connect(
+        _user_changed, sender=user_model, dispatch_uid='caching-user'
+    )
+    post_delete.connect(
+        _user_changed, sender=user_model, dispatch_uid='caching-del-user'
+    )
+    for model in [Recipe, Tag, Ingredient]:
+        post_save.connect(
+            _owned_changed, sender=model, dispatch_uid=f'caching-{model}'
+        )
+        post_delete.connect(
+            _owned_changed, sender=model, dispatch_uid=f'caching-del-{model}'
+        )
+    for through in [Recipe.tags.through, Recipe.ingredients.through]:
+        m2m_changed.connect(
+            _relations_changed,
+            sender=through,
+            dispatch_uid=f'caching-m2m-{through}',
+        )
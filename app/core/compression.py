@@ -0,0 +1,155 @@
+"""
+Negotiated gzip and brotli encoding of response bodies.
+
+Brotli is offered when the ``brotli`` package is installed. Compressed
+bodies are cached by a digest of their content, so a hot payload is
+compressed once however many requests render it; streaming responses are
+compressed chunk by chunk and flushed as they go.
+"""
+import hashlib
+import re
+import zlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+
+from core import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = re.compile(
+    r'^(text/|application/(json|javascript|xml|msgpack|vnd\.oai\.openapi)|'
+    r'application/[\w.+-]+\+(json|xml)|image/svg\+xml)'
+)
+
+_ACCEPT_ENCODING = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q=([0-9.]+))?\s*')
+
+_counters = metrics.Counters(
+    'compressed', 'streamed', 'cache_hits', 'bytes_in', 'bytes_out',
+)
+stats = _counters.snapshot
+
+
+def encodings():
+    """Return the supported encodings, most preferred first."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate(accept_encoding):
+    """Pick the preferred supported encoding an ``Accept-Encoding`` allows."""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        match = _ACCEPT_ENCODING.fullmatch(part)
+        if not match:
+            continue
+        try:
+            quality = float(match.group(2) or 1)
+        except ValueError:
+            continue
+        accepted[match.group(1).lower()] = quality
+    best, best_quality = None, 0
+    for encoding in encodings():
+        quality = accepted.get(encoding, accepted.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _gzip_level():
+    return settings.COMPRESSION_GZIP_LEVEL
+
+
+def _brotli_quality():
+    return settings.COMPRESSION_BROTLI_QUALITY
+
+
+def compress(encoding, data, level=None):
+    """Compress ``data`` in one go; gzip output carries no timestamp."""
+    if encoding == 'br':
+        quality = _brotli_quality() if level is None else level
+        return brotli.compress(data, quality=quality)
+    compressor = zlib.compressobj(
+        _gzip_level() if level is None else level, zlib.DEFLATED, 31
+    )
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_chunks(encoding, chunks):
+    """Compress an iterable of byte chunks, flushing after each one."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=_brotli_quality())
+        for chunk in chunks:
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+    compressor = zlib.compressobj(_gzip_level(), zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _cached_compress(encoding, content):
+    limit = settings.COMPRESSION_CACHE_MAX_SIZE
+    if len(content) > limit:
+        return compress(encoding, content)
+    cache = caches[settings.COMPRESSION_CACHE]
+    key = 'compressed:%s:%s' % (
+        encoding, hashlib.blake2b(content, digest_size=20).hexdigest()
+    )
+    compressed = cache.get(key)
+    if compressed is not None:
+        _counters.add(cache_hits=1)
+        return compressed
+    compressed = compress(encoding, content)
+    cache.set(
+        key, compressed, settings.COMPRESSION_CACHE_TIMEOUT
+    )
+    return compressed
+
+
+def compress_response(request, response):
+    """Encode ``response`` for ``request`` if worthwhile, in place."""
+    if response.has_header('Content-Encoding'):
+        return response
+    if not COMPRESSIBLE_TYPES.match(response.get('Content-Type', '')):
+        return response
+    min_size = settings.COMPRESSION_MIN_SIZE
+    if not response.streaming and len(response.content) < min_size:
+        return response
+
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding is None:
+        return response
+
+    if response.streaming:
+        response.streaming_content = compress_chunks(
+            encoding, response.streaming_content
+        )
+        del response['Content-Length']
+        _counters.add(streamed=1)
+    else:
+        content = response.content
+        compressed = _cached_compress(encoding, content)
+        if len(compressed) >= len(content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        _counters.add(compressed=1, bytes_in=len(content),
+                      bytes_out=len(compressed))
+
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        # The encoded body differs from the one the strong tag named.
+        response['ETag'] = 'W/' + etag
+    response['Content-Encoding'] = encoding
+    return response
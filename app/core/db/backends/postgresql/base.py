@@ -0,0 +1,117 @@
+"""
+PostgreSQL backend with connection health checks and optional pooling.
+
+Extra ``DATABASES`` keys understood by this backend:
+
+* ``CONN_HEALTH_CHECKS``: check a persistent connection a query failed
+  on is still usable before reusing it, reconnecting transparently if
+  not. Connections without errors are reused without a round trip.
+* ``POOL_SIZE``: share up to this many connections between the threads
+  of a worker process instead of one connection per thread (0 disables).
+  A pooled connection goes back to the pool when Django would close it,
+  once ``CONN_MAX_AGE`` is up or at the end of every request with 0; the
+  pool keeps it open instead, so more threads than ``POOL_SIZE`` can take
+  turns with the connections.
+* ``POOL_TIMEOUT``: seconds to wait for a pooled connection.
+"""
+import functools
+
+from psycopg2 import extensions
+
+from django.db.backends.postgresql import base
+
+from core import metrics
+from core.db import pool as db_pool
+
+
+_counters = metrics.Counters('opened', 'closed', 'health_check_failures')
+
+
+def connection_stats():
+    """Return counters for unpooled connections, one per thread."""
+    stats = _counters.snapshot()
+    stats['open'] = stats['opened'] - stats['closed']
+    return stats
+
+
+def _raw_is_usable(conn):
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        return True
+    except base.Database.Error:
+        return False
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_enabled = self.settings_dict.get(
+            'CONN_HEALTH_CHECKS', False
+        )
+        self._pool = None
+
+    def get_new_connection(self, conn_params):
+        pool_size = self.settings_dict.get('POOL_SIZE', 0)
+        if not pool_size:
+            connection = super().get_new_connection(conn_params)
+            _counters.add(opened=1)
+            return connection
+
+        self._pool = db_pool.get_pool(
+            self.alias,
+            conn_params,
+            pool_size,
+            self.settings_dict.get('POOL_TIMEOUT', 10),
+        )
+        return self._pool.acquire(
+            functools.partial(self._open_pooled, conn_params),
+            check=_raw_is_usable if self.health_check_enabled else None,
+        )
+
+    def _open_pooled(self, conn_params):
+        return super().get_new_connection(conn_params)
+
+    def ensure_connection(self):
+        self.close_if_health_check_failed()
+        super().ensure_connection()
+
+    def close_if_health_check_failed(self):
+        """Drop a connection a query failed on if it is no longer usable."""
+        if (
+            self.connection is None or
+            not self.health_check_enabled or
+            not self.errors_occurred or
+            self.in_atomic_block
+        ):
+            return
+        if self.is_usable():
+            self.errors_occurred = False
+        else:
+            _counters.add(health_check_failures=1)
+            self.close()
+
+    def _close(self):
+        pool, self._pool = self._pool, None
+        if self.connection is None:
+            return None
+        if pool is None:
+            _counters.add(closed=1)
+            return super()._close()
+        if self.in_atomic_block:
+            # The wrapper keeps a reference to a connection closed inside a
+            # transaction, so it must never be handed to another thread.
+            with self.wrap_database_errors:
+                return pool.discard(self.connection)
+
+        conn = self.connection
+        try:
+            status = conn.get_transaction_status()
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except base.Database.Error:
+            pool.discard(conn)
+            return None
+        pool.release(conn, suspect=self.errors_occurred)
+        return None
@@ -0,0 +1,151 @@
+"""
+In-process database connection pool shared by the threads of a worker.
+"""
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+
+class PoolTimeout(OperationalError):
+    """No connection became available before the pool timeout."""
+
+
+class ConnectionPool:
+    """Bounded LIFO pool of raw DB-API connections."""
+
+    def __init__(self, label, max_size, timeout):
+        self.label = label
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = deque()
+        self._open = 0
+        self._cond = threading.Condition()
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def acquire(self, connect, check=None):
+        """
+        Return an idle connection or open a new one with ``connect``,
+        waiting up to ``timeout`` seconds when the pool is exhausted.
+        Idle connections released as suspect are discarded if they fail
+        ``check``.
+        """
+        start = time.monotonic()
+        waited = False
+        with self._cond:
+            while True:
+                conn, suspect = self._pop_idle()
+                if conn is not None:
+                    break
+                if self._open < self.max_size:
+                    self._open += 1
+                    break
+                remaining = start + self.timeout - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f'Connection pool {self.label} exhausted '
+                        f'after {self.timeout}s'
+                    )
+                waited = True
+                self._cond.wait(remaining)
+            if waited:
+                self._record_wait(time.monotonic() - start)
+
+        if conn is not None:
+            if not suspect or check is None or check(conn):
+                return conn
+            self.discard(conn)
+            return self.acquire(connect, check)
+
+        try:
+            return connect()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn, suspect=False):
+        """
+        Return a connection to the pool for reuse; a ``suspect`` one, such
+        as one a query failed on, is checked before it is reused.
+        """
+        with self._cond:
+            if conn.closed:
+                self._open -= 1
+            else:
+                self._idle.append((conn, suspect))
+            self._cond.notify()
+
+    def discard(self, conn):
+        """Close a connection and free its slot."""
+        try:
+            conn.close()
+        finally:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+
+    def close_idle(self):
+        """Close every idle connection, e.g. after forking a worker."""
+        with self._cond:
+            idle, self._idle = self._idle, deque()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            conn.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.max_size,
+                'open': self._open,
+                'idle': len(self._idle),
+                'in_use': self._open - len(self._idle),
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'wait_total_ms': round(self._wait_total * 1000, 3),
+                'wait_max_ms': round(self._wait_max * 1000, 3),
+            }
+
+    def _pop_idle(self):
+        while self._idle:
+            conn, suspect = self._idle.pop()
+            if not conn.closed:
+                return conn, suspect
+            self._open -= 1
+        return None, False
+
+    def _record_wait(self, elapsed):
+        self._waits += 1
+        self._wait_total += elapsed
+        self._wait_max = max(self._wait_max, elapsed)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, max_size, timeout):
+    """Return the process-wide pool for an alias and connection target."""
+    key = (alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            label = f"{alias}:{conn_params.get('database', '')}"
+            pool = _pools[key] = ConnectionPool(label, max_size, timeout)
+        return pool
+
+
+def all_pools():
+    with _pools_lock:
+        return list(_pools.values())
+
+
+def stats():
+    return {pool.label: pool.stats() for pool in all_pools()}
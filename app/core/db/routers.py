@@ -0,0 +1,130 @@
+"""
+Database router sending safe-method reads to replicas.
+
+Reads are routed to a replica only inside a request opened by
+``core.middleware.ReplicaRoutingMiddleware`` with a safe HTTP method. A
+client that wrote is pinned to the primary for
+``READ_YOUR_WRITES_WINDOW`` seconds so it always reads its own writes.
+
+Pins are keyed on credentials, so a request that creates them, signing up
+or logging in, pins nobody. Users, tokens and sessions are therefore
+always read from the primary: a client's first request with new
+credentials must not be refused by a replica that has not caught up.
+"""
+import contextlib
+import contextvars
+import hashlib
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, DEFAULT_DB_ALIAS
+
+
+PIN_KEY_PREFIX = 'db-pin:'
+
+# Models read from the primary whatever the request, as app_label.model.
+PRIMARY_MODELS = {'authtoken.token', 'sessions.session'}
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+class RoutingState:
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+def client_key(request):
+    """Identify the client behind a request from its credentials."""
+    credential = request.META.get('HTTP_AUTHORIZATION') or \
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    return hashlib.sha256(credential.encode()).hexdigest()
+
+
+def _pin_cache():
+    return caches[getattr(settings, 'READ_YOUR_WRITES_CACHE', 'default')]
+
+
+def is_pinned(key):
+    return key is not None and bool(_pin_cache().get(PIN_KEY_PREFIX + key))
+
+
+def pin(key):
+    """Send reads for ``key`` to the primary for the configured window."""
+    window = settings.READ_YOUR_WRITES_WINDOW
+    if key is not None and window:
+        _pin_cache().set(PIN_KEY_PREFIX + key, True, window)
+
+
+def begin(use_replica):
+    return _state.set(RoutingState(use_replica))
+
+
+def current():
+    return _state.get()
+
+
+def end(token):
+    _state.reset(token)
+
+
+@contextlib.contextmanager
+def primary():
+    """Send the reads of the block to the primary."""
+    state = current()
+    if state is None or not state.use_replica:
+        yield
+        return
+    state.use_replica = False
+    try:
+        yield
+    finally:
+        # A write in the block keeps the request on the primary.
+        state.use_replica = not state.wrote
+
+
+class ReplicaRouter:
+
+    def _replicas(self):
+        return settings.DATABASE_REPLICAS
+
+    def _primary_only(self, model):
+        label = model._meta.label_lower
+        return label in PRIMARY_MODELS or \
+            label == settings.AUTH_USER_MODEL.lower()
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        replicas = self._replicas()
+        if (
+            not replicas or
+            state is None or
+            not state.use_replica or
+            connections[DEFAULT_DB_ALIAS].in_atomic_block or
+            self._primary_only(model)
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            state.use_replica = False
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every alias holds a copy of the same database.
+        if obj1._state.db in settings.DATABASES and \
+                obj2._state.db in settings.DATABASES:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in self._replicas():
+            return False
+        return None
@@ -0,0 +1,240 @@
+"""
+Background deletion of user accounts in bounded batches.
+
+Deleting a user in one go cascades through every recipe, tag, ingredient
+and relation row in a single transaction, holding locks for as long as
+that takes. ``request_deletion`` instead deactivates the account at once,
+which locks its tokens out, and records an ``AccountDeletion``. A worker
+then deletes the account's rows ``ACCOUNT_DELETION_BATCH_SIZE`` at a time,
+each batch in a short transaction together with its progress, removes
+recipe images once their batch commits and finally deletes the user.
+
+The rows go without per-row signals: an account being deleted needs no
+tombstones, change events or cache invalidation. ``delete_rows``, which
+does that for any of a user's rows, is shared with the bulk deletes of
+``recipe.bulk``, and so are the row and image counts in ``stats``.
+
+A worker claims a deletion by stamping it and restamps it every batch, so
+another can take over a deletion whose worker died; ``run_worker`` queues
+``resume`` when it starts and every report interval so that actually
+happens.
+"""
+import datetime
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core import caching, jobs, metrics
+from core.models import (
+    AccountDeletion, Job, Recipe, Tag, Ingredient, Tombstone
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds after which a deletion its worker stopped stamping is taken over.
+CLAIM_TIMEOUT = 60
+
+# Relation rows pointing at each model, as (through model, column), which
+# go before the rows themselves.
+RELATIONS = {
+    Recipe: [
+        (Recipe.tags.through, 'recipe_id'),
+        (Recipe.ingredients.through, 'recipe_id'),
+    ],
+    Tag: [(Recipe.tags.through, 'tag_id')],
+    Ingredient: [(Recipe.ingredients.through, 'ingredient_id')],
+    Tombstone: [],
+}
+
+# The account's rows are deleted a model at a time, in this order.
+STEPS = [
+    ('recipes', Recipe),
+    ('tags', Tag),
+    ('ingredients', Ingredient),
+    ('tombstones', Tombstone),
+]
+
+_counters = metrics.Counters('accounts', 'batches', 'rows', 'images')
+stats = _counters.snapshot
+
+
+def request_deletion(user):
+    """Lock ``user`` out and schedule the deletion of their account."""
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        deletion, _ = AccountDeletion.objects.get_or_create(
+            user=user, defaults={'email': user.email}
+        )
+        transaction.on_commit(ensure_worker)
+    return deletion
+
+
+def _claim(deletion):
+    now = timezone.now()
+    claimed = AccountDeletion.objects.filter(
+        Q(claimed_at__isnull=True) |
+        Q(claimed_at__lt=now - datetime.timedelta(seconds=CLAIM_TIMEOUT)),
+        pk=deletion.pk,
+        finished_at__isnull=True,
+    ).update(claimed_at=now)
+    deletion.claimed_at = now
+    return bool(claimed)
+
+
+def raw_delete(queryset):
+    """Delete the rows of ``queryset`` in one statement, without signals."""
+    queryset._raw_delete(queryset.db)
+
+
+def delete_images(names):
+    storage = Recipe._meta.get_field('image').storage
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.exception('Could not delete recipe image %s', name)
+    _counters.add(images=len(names))
+
+
+def delete_rows(model, ids):
+    """
+    Delete the rows of ``model`` with the primary keys ``ids`` and the
+    relation rows pointing at them, without per-row signals, and recipe
+    images once the surrounding transaction commits.
+    """
+    images = []
+    if model is Recipe:
+        images = list(
+            Recipe.objects.filter(pk__in=ids).exclude(image='')
+            .exclude(image=None).values_list('image', flat=True)
+        )
+    for through, column in RELATIONS[model]:
+        raw_delete(through.objects.filter(**{f'{column}__in': ids}))
+    raw_delete(model.objects.filter(pk__in=ids))
+    if images:
+        transaction.on_commit(lambda: delete_images(images))
+    _counters.add(rows=len(ids))
+
+
+def _delete_batch(deletion, name, model, batch_size):
+    """Delete one batch of a step's rows; return how many there were."""
+    with transaction.atomic():
+        ids = list(
+            model.objects.filter(user_id=deletion.user_id)
+            .order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        delete_rows(model, ids)
+        deletion.deleted[name] = deletion.deleted.get(name, 0) + len(ids)
+        deletion.claimed_at = timezone.now()
+        deletion.save(update_fields=['deleted', 'claimed_at'])
+    _counters.add(batches=1)
+    return len(ids)
+
+
+def process(deletion, batch_size=None, report=None):
+    """
+    Delete the account of a claimed ``deletion``, calling ``report`` with
+    it after every batch.
+    """
+    batch_size = batch_size or settings.ACCOUNT_DELETION_BATCH_SIZE
+    user_id = deletion.user_id
+    if user_id is not None:
+        if not deletion.total:
+            deletion.total = {
+                name: model.objects.filter(user_id=user_id).count()
+                for name, model in STEPS
+            }
+            deletion.save(update_fields=['total'])
+        for name, model in STEPS:
+            while _delete_batch(deletion, name, model, batch_size):
+                if report is not None:
+                    report(deletion)
+        with transaction.atomic():
+            # Only tokens and the like are left to cascade.
+            get_user_model().objects.filter(pk=user_id).delete()
+        caching.invalidate_library(user_id)
+    deletion.finished_at = timezone.now()
+    deletion.save(update_fields=['finished_at'])
+    _counters.add(accounts=1)
+    if report is not None:
+        report(deletion)
+
+
+def process_pending(batch_size=None, report=None):
+    """Carry out every deletion nobody is working on; return how many."""
+    processed = 0
+    pending = AccountDeletion.objects.filter(
+        finished_at__isnull=True
+    ).order_by('requested_at')
+    for deletion in pending:
+        if _claim(deletion):
+            process(deletion, batch_size, report)
+            processed += 1
+    return processed
+
+
+def resume():
+    """
+    Queue ``process_pending`` if a deletion is unfinished and no job for it
+    is waiting or running already; return the job queued, if any.
+    """
+    if not AccountDeletion.objects.filter(finished_at__isnull=True).exists():
+        return None
+    if Job.objects.filter(
+        task=jobs.task_name(process_pending),
+        state__in=[Job.QUEUED, Job.RUNNING],
+    ).exists():
+        return None
+    return jobs.enqueue(process_pending)
+
+
+_worker_lock = threading.Lock()
+_worker = None
+_wanted = False
+
+
+def _run_worker():
+    global _worker, _wanted
+    while True:
+        processed = 0
+        try:
+            processed = process_pending()
+        except Exception:
+            logger.exception('Account deletion worker failed')
+        finally:
+            connections.close_all()
+        with _worker_lock:
+            if not processed and not _wanted:
+                _worker = None
+                return
+            _wanted = False
+
+
+def ensure_worker():
+    """
+    Start this process's deletion thread, or have it look again, or queue
+    a job doing the same for ``run_worker``.
+    """
+    global _worker, _wanted
+    mode = settings.ACCOUNT_DELETION_WORKER
+    if mode == 'queue':
+        jobs.enqueue(process_pending)
+    if mode != 'thread':
+        return
+    with _worker_lock:
+        if _worker is not None:
+            _wanted = True
+            return
+        _worker = threading.Thread(
+            target=_run_worker, name='account-deletion', daemon=True
+        )
+        _worker.start()
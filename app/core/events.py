@@ -0,0 +1,220 @@
+"""
+Change events for a user's recipes, tags and ingredients.
+
+Model signals publish an event once the writing transaction commits. With
+the ``postgres`` backend events travel through ``NOTIFY`` so every worker
+on every host sees them; each process runs one ``LISTEN`` thread feeding
+its local broker. The ``local`` backend delivers in-process only.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import select
+import threading
+
+from django.conf import settings
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from core import caching
+from core.models import Recipe, Tag, Ingredient
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'recipe_changes'
+
+MODELS = {Recipe: 'recipe', Tag: 'tag', Ingredient: 'ingredient'}
+
+
+class Broker:
+    """Fan events out to the subscriptions of their user."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._published = 0
+        self._dropped = 0
+        self._ids = itertools.count(1)
+
+    def subscribe(self, user_id):
+        """Return a queue receiving the user's events on the running loop."""
+        subscription = (
+            asyncio.get_running_loop(),
+            asyncio.Queue(self.queue_size),
+        )
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(user_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscribers.pop(user_id, None)
+
+    def dispatch(self, event):
+        """Deliver an event from any thread."""
+        event.setdefault('seq', next(self._ids))
+        with self._lock:
+            self._published += 1
+            subscriptions = list(self._subscribers.get(event['user'], ()))
+        for loop, queue in subscriptions:
+            loop.call_soon_threadsafe(self._put, queue, event)
+
+    def _put(self, queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._dropped += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'users': len(self._subscribers),
+                'subscriptions': sum(
+                    len(subs) for subs in self._subscribers.values()
+                ),
+                'published': self._published,
+                'dropped': self._dropped,
+            }
+
+
+broker = Broker()
+
+
+def _backend():
+    return settings.CHANGE_FEED_BACKEND
+
+
+def publish(*events):
+    """Deliver ``events``, in one statement with the postgres backend."""
+    if not events:
+        return
+    if _backend() == 'postgres':
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_notify(%s, payload) '
+                'FROM unnest(%s::text[]) AS payload',
+                [CHANNEL, [json.dumps(event) for event in events]],
+            )
+    else:
+        for event in events:
+            broker.dispatch(event)
+
+
+def publish_on_commit(model, user_id, ids, action):
+    """Publish ``action`` on the ``model`` rows ``ids`` once they commit."""
+    events = [
+        {'user': user_id, 'type': f'{MODELS[model]}.{action}', 'id': pk}
+        for pk in ids
+    ]
+
+    def committed():
+        # The write has committed whatever fails here, and a lost event
+        # only delays clients until their next sync.
+        try:
+            # Lists read while the transaction was open may have been
+            # cached.
+            caching.invalidate_library(user_id)
+        except Exception:
+            logger.exception('Could not invalidate library %s', user_id)
+        try:
+            publish(*events)
+        except Exception:
+            logger.exception('Could not publish %d change events',
+                             len(events))
+
+    transaction.on_commit(committed)
+
+
+def _on_commit(instance, action):
+    publish_on_commit(type(instance), instance.user_id, [instance.pk], action)
+
+
+def _saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        _on_commit(instance, 'created' if created else 'updated')
+
+
+def _deleted(sender, instance, **kwargs):
+    _on_commit(instance, 'deleted')
+
+
+def _relations_changed(sender, instance, action, reverse, **kwargs):
+    if action.startswith('post_') and not reverse:
+        _on_commit(instance, 'updated')
+
+
+def connect_signals():
+    for model in MODELS:
+        post_save.connect(_saved, sender=model, dispatch_uid=f'events-{model}')
+        post_delete.connect(
+            _deleted, sender=model, dispatch_uid=f'events-del-{model}'
+        )
+    for through in [Recipe.tags.through, Recipe.ingredients.through]:
+        m2m_changed.connect(
+            _relations_changed,
+            sender=through,
+            dispatch_uid=f'events-m2m-{through}',
+        )
+
+
+class PostgresListener(threading.Thread):
+    """Feed ``NOTIFY`` payloads into the local broker until stopped."""
+
+    def __init__(self, alias=DEFAULT_DB_ALIAS, poll_interval=30):
+        super().__init__(name='change-feed-listener', daemon=True)
+        self.alias = alias
+        self.poll_interval = poll_interval
+        self.listening = threading.Event()
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self._listen()
+            except Exception:
+                logger.exception('Change feed listener failed, reconnecting')
+                self.listening.clear()
+                self._stopped.wait(1)
+
+    def _listen(self):
+        wrapper = connections[self.alias]
+        conn = wrapper.Database.connect(**wrapper.get_connection_params())
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {CHANNEL}')
+            self.listening.set()
+            while not self._stopped.is_set():
+                ready = select.select([conn], [], [], self.poll_interval)
+                if ready == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    broker.dispatch(json.loads(notify.payload))
+        finally:
+            conn.close()
+
+
+_listener_lock = threading.Lock()
+_listener = None
+
+
+def ensure_listener():
+    """Start this process's ``LISTEN`` thread on first subscription."""
+    global _listener
+    if _backend() != 'postgres':
+        return
+    with _listener_lock:
+        if _listener is None:
+            _listener = PostgresListener()
+            _listener.start()
@@ -0,0 +1,84 @@
+"""
+Dependency checks backing the readiness endpoint.
+"""
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+
+def check_database():
+    for alias in [*connections]:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+
+def check_media():
+    with tempfile.NamedTemporaryFile(dir=settings.MEDIA_ROOT) as probe:
+        probe.write(b'ok')
+        probe.flush()
+        os.fsync(probe.fileno())
+
+
+def check_cache():
+    key = f'readiness:{uuid.uuid4().hex}'
+    cache.set(key, 1, 10)
+    value = cache.get(key)
+    cache.delete(key)
+    if value != 1:
+        raise RuntimeError('Cache did not return the stored value')
+
+
+CHECKS = {
+    'database': check_database,
+    'media': check_media,
+    'cache': check_cache,
+}
+
+_lock = threading.Lock()
+_result = None
+_expires_at = 0
+
+
+def run_checks():
+    """Run every check, recording its outcome and latency."""
+    results = {}
+    for name, check in CHECKS.items():
+        start = time.perf_counter()
+        try:
+            check()
+            result = {'ok': True}
+        except Exception as exc:
+            result = {'ok': False, 'error': f'{type(exc).__name__}: {exc}'}
+        result['latency_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        results[name] = result
+    return {
+        'ready': all(result['ok'] for result in results.values()),
+        'checks': results,
+    }
+
+
+def readiness():
+    """
+    Return the latest check results, rerunning the checks at most once
+    per ``READINESS_CACHE_TTL`` seconds however often probes arrive.
+    """
+    global _result, _expires_at
+    with _lock:
+        now = time.monotonic()
+        if _result is None or now >= _expires_at:
+            _result = run_checks()
+            _result['checked_at'] = time.time()
+            _expires_at = now + settings.READINESS_CACHE_TTL
+        return _result
+
+
+def clear():
+    global _result
+    with _lock:
+        _result = None
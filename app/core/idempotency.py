@@ -0,0 +1,121 @@
+"""
+``Idempotency-Key`` handling for writes that clients retry.
+
+The first request with a key runs and its response is stored per user and
+key for ``IDEMPOTENCY_TTL`` seconds; retries get that response back with
+``Idempotent-Replayed: true`` and never reach the write. A retry arriving
+while the first request is still running waits for it. Reusing a key for
+a different request is an error, as is a retry still waiting after
+``IDEMPOTENCY_WAIT`` seconds. Server errors are not stored, so a request
+that failed that way can be retried for real.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import UploadedFile
+
+from rest_framework import status
+from rest_framework.response import Response
+
+
+HEADER = 'Idempotency-Key'
+KEY_PREFIX = 'idempotency:'
+MAX_KEY_LENGTH = 255
+
+# Seconds between checks for the response of a request still running.
+POLL_INTERVAL = 0.05
+
+# Seconds a running request holds its key, in case its worker dies.
+PENDING_TTL = 60
+
+
+def _cache():
+    return caches[settings.IDEMPOTENCY_CACHE]
+
+
+def _encode(value):
+    if isinstance(value, UploadedFile):
+        digest = hashlib.sha256()
+        for chunk in value.chunks():
+            digest.update(chunk)
+        value.seek(0)
+        return f'file:{digest.hexdigest()}'
+    return str(value)
+
+
+def fingerprint(request):
+    """Identify what ``request`` asks for, files included."""
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    body = json.dumps(data, sort_keys=True, default=_encode)
+    return hashlib.sha256(
+        f'{request.method} {request.get_full_path()}\n{body}'.encode()
+    ).hexdigest()
+
+
+def _error(detail, status_code):
+    return Response({'detail': detail}, status=status_code)
+
+
+def _replay(entry):
+    return Response(entry['data'], status=entry['status'],
+                    headers={'Idempotent-Replayed': 'true'})
+
+
+def run(request, func):
+    """
+    Return ``func()``'s response for the first request with the request's
+    idempotency key, and a replay of it for the others.
+    """
+    key = request.headers.get(HEADER)
+    if key is None:
+        return func()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return _error(
+            f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters.',
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    cache = _cache()
+    cache_key = KEY_PREFIX + hashlib.sha256(
+        f'{request.user.pk}:{key}'.encode()
+    ).hexdigest()
+    request_fingerprint = fingerprint(request)
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+    while not cache.add(cache_key, {'fingerprint': request_fingerprint},
+                        PENDING_TTL):
+        entry = cache.get(cache_key)
+        if entry is None:
+            continue
+        if entry['fingerprint'] != request_fingerprint:
+            return _error(
+                f'{HEADER} was already used for a different request.',
+                status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if 'status' in entry:
+            return _replay(entry)
+        if time.monotonic() >= deadline:
+            return _error(
+                f'A request with this {HEADER} is still in progress.',
+                status.HTTP_409_CONFLICT,
+            )
+        time.sleep(POLL_INTERVAL)
+
+    try:
+        response = func()
+    except Exception:
+        cache.delete(cache_key)
+        raise
+    if response.status_code >= 500:
+        cache.delete(cache_key)
+    else:
+        cache.set(cache_key, {
+            'fingerprint': request_fingerprint,
+            'status': response.status_code,
+            'data': response.data,
+        }, settings.IDEMPOTENCY_TTL)
+    return response
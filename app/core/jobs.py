@@ -0,0 +1,240 @@
+"""
+A job queue kept in the database, for work that should not hold up a
+request.
+
+``enqueue`` stores a call of a task function, named by its dotted path, as
+a ``Job`` row; enqueued inside a transaction, the job only exists once it
+commits. ``run_worker`` processes claim ready jobs with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so any number of them share the
+queue without handing a job out twice or waiting on each other's locks,
+and run them outside any transaction.
+
+A job that raises is retried after an exponential, jittered backoff until
+it has made ``max_attempts`` attempts, and is then dead-lettered: left in
+the ``dead`` state with its last traceback until someone retries it from
+the admin. While a job runs, its worker restamps it every third of
+``JOB_LEASE``; a job left unstamped for ``JOB_LEASE`` seconds, because its
+worker died or lost the database, is handed to another worker, so tasks
+should be safe to run twice.
+"""
+import datetime
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core import metrics
+from core.models import Job
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds of finished jobs the throughput is measured over.
+THROUGHPUT_WINDOW = 60
+
+_counters = metrics.Counters(
+    'claimed', 'succeeded', 'retried', 'dead_lettered',
+)
+
+
+def task_name(task):
+    return task if isinstance(task, str) else \
+        f'{task.__module__}.{task.__qualname__}'
+
+
+def enqueue(task, kwargs=None, delay=0, max_attempts=None):
+    """
+    Queue a call of ``task``, a function or its dotted path, with the JSON
+    serializable ``kwargs``, to run ``delay`` seconds from now at the
+    earliest.
+    """
+    return Job.objects.create(
+        task=task_name(task),
+        kwargs=kwargs or {},
+        run_at=timezone.now() + datetime.timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def retry_delay(attempts):
+    """Seconds to wait before the attempt after ``attempts`` failed ones."""
+    delay = min(
+        settings.JOB_RETRY_BACKOFF * 2 ** (attempts - 1),
+        settings.JOB_RETRY_BACKOFF_MAX,
+    )
+    # Equal jitter spreads out jobs that failed together.
+    return random.uniform(delay / 2, delay)
+
+
+def claim(worker, limit=1):
+    """Lock up to ``limit`` ready jobs for ``worker`` and return them."""
+    now = timezone.now()
+    expired = now - datetime.timedelta(
+        seconds=settings.JOB_LEASE
+    )
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(state=Job.QUEUED, run_at__lte=now) |
+                Q(state=Job.RUNNING, locked_at__lt=expired)
+            )
+            .order_by('run_at', 'pk')[:limit]
+        )
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            state=Job.RUNNING, locked_at=now, locked_by=worker,
+            attempts=F('attempts') + 1,
+        )
+    for job in jobs:
+        job.state = Job.RUNNING
+        job.locked_at = now
+        job.locked_by = worker
+        job.attempts += 1
+        _counters.add(claimed=1)
+    return jobs
+
+
+def _owned(job):
+    """The row of ``job`` as long as no other worker took it over."""
+    return Job.objects.filter(
+        pk=job.pk, locked_by=job.locked_by, attempts=job.attempts
+    )
+
+
+def _heartbeat(job, done):
+    interval = settings.JOB_LEASE / 3
+    try:
+        while not done.wait(interval):
+            try:
+                _owned(job).update(locked_at=timezone.now())
+            except Exception:
+                logger.exception('Could not restamp job %s', job.pk)
+                close_old_connections()
+    finally:
+        connections.close_all()
+
+
+def execute(job):
+    """Run a claimed ``job`` and record how it went."""
+    done = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat, args=(job, done), name=f'job-{job.pk}-heartbeat',
+        daemon=True,
+    )
+    heartbeat.start()
+    try:
+        import_string(job.task)(**job.kwargs)
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.task)
+        error = traceback.format_exc()
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            changes = {'state': Job.DEAD, 'finished_at': now}
+            _counters.add(dead_lettered=1)
+        else:
+            changes = {
+                'state': Job.QUEUED,
+                'locked_at': None,
+                'run_at': now + datetime.timedelta(
+                    seconds=retry_delay(job.attempts)
+                ),
+            }
+            _counters.add(retried=1)
+        changes['last_error'] = error
+    else:
+        changes = {'state': Job.DONE, 'finished_at': timezone.now()}
+        _counters.add(succeeded=1)
+    finally:
+        done.set()
+        heartbeat.join()
+    # A worker that took over after the lease expired owns the job now.
+    _owned(job).update(**changes)
+
+
+def run_next(worker):
+    """Claim and run one job; return whether there was one."""
+    jobs = claim(worker)
+    for job in jobs:
+        execute(job)
+    return bool(jobs)
+
+
+def serve(stop, burst=False):
+    """
+    Run jobs until ``stop`` is set or, with ``burst``, until none is ready.
+    """
+    worker = f'{socket.gethostname()}:{os.getpid()}:' \
+             f'{threading.current_thread().name}'
+    poll_interval = settings.JOB_POLL_INTERVAL
+    try:
+        while not stop.is_set():
+            # Requests do this for web workers: drop connections the
+            # database closed or that outlived CONN_MAX_AGE.
+            close_old_connections()
+            try:
+                if run_next(worker):
+                    continue
+            except Exception:
+                logger.exception('Job worker %s could not claim a job',
+                                 worker)
+            else:
+                if burst:
+                    return
+            stop.wait(poll_interval)
+    finally:
+        connections.close_all()
+
+
+def retry(queryset):
+    """Queue the jobs in ``queryset`` again with fresh attempts."""
+    return queryset.exclude(state=Job.RUNNING).update(
+        state=Job.QUEUED, attempts=0, run_at=timezone.now(), locked_at=None,
+        locked_by='', finished_at=None,
+    )
+
+
+def prune():
+    """Delete finished jobs older than ``JOB_RETENTION`` seconds."""
+    cutoff = timezone.now() - datetime.timedelta(
+        seconds=settings.JOB_RETENTION
+    )
+    deleted, _ = Job.objects.filter(
+        state=Job.DONE, finished_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def stats():
+    """
+    The queue as a whole, read from the database, and the jobs this
+    process ran.
+    """
+    now = timezone.now()
+    states = dict(
+        Job.objects.order_by().values_list('state')
+        .annotate(Count('pk'))
+    )
+    recent = Job.objects.filter(
+        state=Job.DONE,
+        finished_at__gte=now - datetime.timedelta(seconds=THROUGHPUT_WINDOW),
+    ).count()
+    oldest = Job.objects.filter(
+        state=Job.QUEUED, run_at__lte=now
+    ).aggregate(oldest=Min('run_at'))['oldest']
+    local = _counters.snapshot()
+    return {
+        'queued': states.get(Job.QUEUED, 0),
+        'running': states.get(Job.RUNNING, 0),
+        'dead': states.get(Job.DEAD, 0),
+        'per_second': recent / THROUGHPUT_WINDOW,
+        'lag_seconds': (now - oldest).total_seconds() if oldest else 0.0,
+        **local,
+    }
@@ -0,0 +1,89 @@
+"""
+Django command to compare the sync and async recipe endpoints under
+concurrent load
+"""
+import asyncio
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient
+from django.urls import reverse
+
+from core import benchmark
+
+
+ENDPOINTS = ['recipe-list', 'tag-list', 'ingredient-list']
+
+
+class Command(BaseCommand):
+    """
+    Fire concurrent GETs at the WSGI viewsets, run on a pool of threads
+    standing in for uwsgi workers, and at the async endpoints, whose
+    queries share an executor of the same size.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--recipes', type=int, default=50)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with benchmark.bench_client(options['recipes']) as client:
+            # The async test client takes raw ASGI header names.
+            headers = {
+                'authorization': client._credentials['HTTP_AUTHORIZATION'],
+            }
+            for name in ENDPOINTS:
+                sync_url = reverse(f'recipe:{name}')
+                async_url = reverse(f'recipe-async:{name}')
+                self._report(
+                    f'wsgi {name}', self._run_sync(client, sync_url, options)
+                )
+                self._report(
+                    f'asgi {name}',
+                    asyncio.run(self._run_async(headers, async_url, options)),
+                )
+
+    def _report(self, label, result):
+        samples, elapsed = result
+        self.stdout.write(
+            benchmark.format_row(label, benchmark.summarize(samples)) +
+            f' rps={len(samples) / elapsed:8.1f}'
+            f' maxrss={resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}kB'
+        )
+
+    def _run_sync(self, client, url, options):
+        def timed_get(_):
+            start = time.perf_counter()
+            response = client.get(url)
+            assert response.status_code == 200, response.content
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(options['workers']) as pool:
+            samples = list(pool.map(timed_get, range(options['requests'])))
+        return samples, time.perf_counter() - start
+
+    async def _run_async(self, headers, url, options):
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(options['workers'])
+        )
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def timed_get():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url, **headers)
+                assert response.status_code == 200, response.content
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        samples = await asyncio.gather(
+            *(timed_get() for _ in range(options['requests']))
+        )
+        return samples, time.perf_counter() - start
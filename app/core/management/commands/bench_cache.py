@@ -0,0 +1,93 @@
+"""
+Django command to compare the shared memory cache with Django's backends
+"""
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core import benchmark
+from core.cache.backends.shared_memory import SharedMemoryCache
+
+
+def _read_in_child(cache, keys, start, queue):
+    start.wait()
+    queue.put(sum(cache.get(key) is not None for key in keys))
+
+
+class Command(BaseCommand):
+    """
+    Time sets, hits and misses of small and large values in each backend,
+    and count how many of the values set afterwards a process forked
+    beforehand finds, as a uwsgi worker would.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keys', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        directory = tempfile.mkdtemp()
+        try:
+            backends = [
+                ('locmem', LocMemCache('bench', {})),
+                ('file', FileBasedCache(
+                    os.path.join(directory, 'files'),
+                    {'OPTIONS': {'MAX_ENTRIES': options['keys'] * 2}},
+                )),
+                ('shared memory', SharedMemoryCache(
+                    os.path.join(directory, 'shared'), {}
+                )),
+            ]
+            for size in (100, 10000):
+                value = b'x' * size
+                for label, cache in backends:
+                    self._run(f'{label} {size}B', cache, value, options)
+        finally:
+            shutil.rmtree(directory)
+
+    def _run(self, label, cache, value, options):
+        keys = [f'bench:{i}' for i in range(options['keys'])]
+        cache.clear()
+        context = multiprocessing.get_context('fork')
+        start, queue = context.Event(), context.Queue()
+        child = context.Process(target=_read_in_child,
+                                args=(cache, keys, start, queue))
+        child.start()
+
+        def set_all():
+            for key in keys:
+                cache.set(key, value)
+
+        def get_all():
+            for key in keys:
+                cache.get(key)
+
+        def miss_all():
+            for key in keys:
+                cache.get(key + ':missing')
+
+        # Milliseconds per thousand operations read as microseconds each.
+        per_thousand = len(keys) / 1000
+        for operation, func in (
+            ('set', set_all), ('hit', get_all), ('miss', miss_all)
+        ):
+            summary = benchmark.summarize([
+                sample / per_thousand
+                for sample in benchmark.measure(func, options['iterations'])
+            ])
+            self.stdout.write(
+                benchmark.format_row(f'{label} {operation} x1000', summary)
+            )
+
+        start.set()
+        found = queue.get()
+        child.join()
+        self.stdout.write(
+            f'{label} seen by another process: {found}/{len(keys)}'
+        )
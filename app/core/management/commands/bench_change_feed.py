@@ -0,0 +1,103 @@
+"""
+Django command to measure the cost of idle change feed connections
+"""
+import asyncio
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from rest_framework.authtoken.models import Token
+
+from core import benchmark, events
+from core.sse import ChangeFeed
+
+
+FEED_PATH = '/feed/'
+
+
+class Command(BaseCommand):
+    """
+    Hold many idle SSE streams open in-process, then time the delivery of
+    one event to all of them, and compare the request rate of polling.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=2000)
+        parser.add_argument(
+            '--poll-interval', type=float, default=10,
+            help='Seconds between list requests of a polling client.',
+        )
+        parser.add_argument(
+            '--writes-per-minute', type=float, default=2,
+            help='Changes per user per minute pushed through the feed.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with benchmark.bench_client() as client, \
+                override_settings(CHANGE_FEED_BACKEND='local'):
+            key = client._credentials['HTTP_AUTHORIZATION'].split()[1]
+            user_id = Token.objects.get(key=key).user_id
+            asyncio.run(self._run(key, user_id, options))
+
+        clients = options['connections']
+        polling = clients * 60 / options['poll_interval']
+        pushed = clients * options['writes_per_minute']
+        self.stdout.write(
+            f'Polling every {options["poll_interval"]}s: '
+            f'{polling:.0f} requests/min; feed: {pushed:.0f} events/min '
+            f'and no requests ({100 * (1 - pushed / polling):.1f}% fewer '
+            f'messages)'
+        )
+
+    async def _run(self, key, user_id, options):
+        app = ChangeFeed(None, FEED_PATH)
+        disconnect = asyncio.Event()
+        received = asyncio.Queue()
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message.get('body', b'').startswith(b'id:'):
+                received.put_nowait(time.perf_counter())
+
+        scope = {
+            'type': 'http',
+            'path': FEED_PATH,
+            'headers': [(b'authorization', f'Token {key}'.encode())],
+            'query_string': b'',
+        }
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tasks = [
+            asyncio.ensure_future(app(scope, receive, send))
+            for _ in range(options['connections'])
+        ]
+        while events.broker.stats()['subscriptions'] < len(tasks):
+            await asyncio.sleep(0.01)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        used = sum(
+            stat.size_diff for stat in after.compare_to(before, 'filename')
+        )
+
+        start = time.perf_counter()
+        events.broker.dispatch({'user': user_id, 'type': 'recipe.updated',
+                                'id': 0})
+        latest = start
+        for _ in tasks:
+            latest = max(latest, await received.get())
+
+        disconnect.set()
+        await asyncio.gather(*tasks)
+
+        self.stdout.write(
+            f'{len(tasks)} idle streams: '
+            f'{used / len(tasks) / 1024:.2f}KiB each, '
+            f'fan-out to all in {(latest - start) * 1000:.2f}ms'
+        )
@@ -0,0 +1,71 @@
+"""
+Django command to measure database load under bursts of identical reads
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, connections
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.urls import reverse
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    """
+    Fire bursts of concurrent identical recipe list requests, with request
+    coalescing off and on, counting the queries each burst runs.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--bursts', type=int, default=10)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        url = reverse('recipe:recipe-list')
+        with benchmark.bench_client(options['recipes']) as client:
+            for coalescing in (False, True):
+                # Without the list cache, which would serve all but the
+                # first burst and hide what coalescing does.
+                with override_settings(REQUEST_COALESCING=coalescing,
+                                       ADMISSION_CONTROL=False,
+                                       LIST_CACHE_TIMEOUT=0):
+                    self._run(
+                        f'coalescing {"on" if coalescing else "off"}',
+                        client, url, options,
+                    )
+
+    def _run(self, label, client, url, options):
+        concurrency = options['concurrency']
+        barrier = threading.Barrier(concurrency)
+        lock = threading.Lock()
+        queries = [0]
+
+        def count(execute, sql, params, many, context):
+            with lock:
+                queries[0] += 1
+            return execute(sql, params, many, context)
+
+        def get(_):
+            barrier.wait()
+            start = time.perf_counter()
+            with connection.execute_wrapper(count):
+                client.get(url)
+            return time.perf_counter() - start
+
+        def close(_):
+            connections.close_all()
+
+        samples = []
+        with ThreadPoolExecutor(concurrency) as pool:
+            for _ in range(options['bursts']):
+                samples += pool.map(get, range(concurrency))
+            list(pool.map(close, range(concurrency)))
+        self.stdout.write(
+            benchmark.format_row(label, benchmark.summarize(samples)) +
+            f" queries/burst={queries[0] / options['bursts']:.1f}"
+        )
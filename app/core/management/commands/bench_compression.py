@@ -0,0 +1,64 @@
+"""
+Django command to weigh compression CPU time against bytes saved
+"""
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from core import benchmark, compression
+from core.models import Recipe
+from core.renderers import FastJSONRenderer
+from recipe import fastpath
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """
+    Compress a rendered recipe list with each encoding and level, then
+    time a repeat of the same payload served from the compression cache.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--iterations', type=int, default=10)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with benchmark.bench_user(options['recipes']) as user:
+            body = FastJSONRenderer().render(fastpath.represent(
+                Recipe.objects.filter(user=user).order_by('-id'),
+                RecipeSerializer,
+            ))
+        self.stdout.write(f'payload: {len(body) / 1024:.1f}KiB')
+
+        levels = [('gzip', level) for level in (1, 6, 9)]
+        if compression.brotli is not None:
+            levels += [('br', quality) for quality in (1, 5, 9, 11)]
+        for encoding, level in levels:
+            size = len(compression.compress(encoding, body, level))
+            samples = benchmark.measure(
+                lambda: compression.compress(encoding, body, level),
+                options['iterations'],
+            )
+            self._report(f'{encoding} level {level}', samples, size, body)
+
+        encoding = compression.encodings()[0]
+        with override_settings(COMPRESSION_CACHE_MAX_SIZE=len(body)):
+            cache.clear()
+            compression._cached_compress(encoding, body)
+            samples = benchmark.measure(
+                lambda: compression._cached_compress(encoding, body),
+                options['iterations'],
+            )
+            size = len(compression._cached_compress(encoding, body))
+        self._report(f'{encoding} cached', samples, size, body)
+
+    def _report(self, label, samples, size, body):
+        summary = benchmark.summarize(samples)
+        throughput = len(body) / 1024 / 1024 / (summary['mean_ms'] / 1000)
+        self.stdout.write(
+            benchmark.format_row(label, summary) +
+            f' size={size / 1024:8.1f}KiB'
+            f' ratio={len(body) / size:5.1f}x'
+            f' {throughput:7.1f}MiB/s'
+        )
@@ -0,0 +1,53 @@
+"""
+Django command to benchmark per-request, persistent and pooled DB
+connections
+"""
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from core import benchmark
+
+
+MODES = {
+    'per-request': {'CONN_MAX_AGE': 0, 'POOL_SIZE': 0},
+    'persistent': {'CONN_MAX_AGE': 600, 'POOL_SIZE': 0},
+    'pooled': {'CONN_MAX_AGE': 0, 'POOL_SIZE': 4},
+}
+
+
+class Command(BaseCommand):
+    """Compare request latency across connection management modes."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=50)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        connection = connections[DEFAULT_DB_ALIAS]
+        original = {
+            key: connection.settings_dict.get(key) for key in
+            ('CONN_MAX_AGE', 'POOL_SIZE')
+        }
+        urls = {
+            'health-check': reverse('health-check'),
+            'recipe-list': reverse('recipe:recipe-list'),
+        }
+        with benchmark.bench_client(options['recipes']) as client:
+            try:
+                for mode, overrides in MODES.items():
+                    connection.close()
+                    connection.settings_dict.update(overrides)
+                    for name, url in urls.items():
+                        samples = benchmark.measure(
+                            lambda: client.get(url),
+                            options['requests'],
+                        )
+                        self.stdout.write(benchmark.format_row(
+                            f'{mode} {name}',
+                            benchmark.summarize(samples),
+                        ))
+            finally:
+                connection.close()
+                connection.settings_dict.update(original)
@@ -0,0 +1,52 @@
+"""
+Django command to compare payload size and encode time of the response
+formats
+"""
+from django.core.management.base import BaseCommand
+
+from rest_framework.renderers import JSONRenderer
+
+from core import benchmark
+from core.models import Recipe
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+from recipe import fastpath
+from recipe.serializers import RecipeSerializer
+
+
+RENDERERS = [
+    ('json (drf)', JSONRenderer),
+    ('json (orjson)', FastJSONRenderer),
+    ('msgpack', MessagePackRenderer),
+]
+
+
+class Command(BaseCommand):
+    """
+    Encode the same recipe list with every renderer and report the time
+    per encode and the size of the payload.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--iterations', type=int, default=20)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with benchmark.bench_user(options['recipes']) as user:
+            data = fastpath.represent(
+                Recipe.objects.filter(user=user).order_by('-id'),
+                RecipeSerializer,
+            )
+
+        for label, renderer_class in RENDERERS:
+            renderer = renderer_class()
+            size = len(renderer.render(data))
+            samples = benchmark.measure(
+                lambda: renderer.render(data), options['iterations']
+            )
+            self.stdout.write(
+                benchmark.format_row(
+                    f'{label} ({options["recipes"]} recipes)',
+                    benchmark.summarize(samples),
+                ) + f' size={size / 1024:9.1f}KiB'
+            )
@@ -0,0 +1,73 @@
+"""
+Django command to compare the CPU cost of rendering a recipe list with
+the serializers, with the values() fast path and, on PostgreSQL, in the
+database
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Prefetch
+
+from rest_framework.renderers import JSONRenderer
+
+from core import benchmark
+from core.models import (Recipe, Tag, Ingredient)
+from recipe import fastpath, pgjson
+from recipe.serializers import RecipeSerializer
+
+
+class Command(BaseCommand):
+    """
+    Render the same recipe list each way, queries included, and report
+    wall-clock and process CPU time per render.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--iterations', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        renderer = JSONRenderer()
+        with benchmark.bench_user(options['recipes']) as user:
+            queryset = Recipe.objects.filter(user=user).order_by('-id')
+
+            def serialized():
+                recipes = queryset.prefetch_related(
+                    Prefetch('tags', queryset=Tag.objects.order_by('id')),
+                    Prefetch('ingredients',
+                             queryset=Ingredient.objects.order_by('id')),
+                )
+                return renderer.render(
+                    RecipeSerializer(recipes, many=True).data
+                )
+
+            def fast():
+                return renderer.render(
+                    fastpath.represent(queryset, RecipeSerializer)
+                )
+
+            def database():
+                return b''.join(pgjson.stream(queryset, RecipeSerializer))
+
+            expected = serialized()
+            if fast() != expected:
+                raise CommandError('The fast path output differs.')
+            modes = [('serializer', serialized), ('fast path', fast)]
+            if connections[queryset.db].vendor == 'postgresql':
+                if json.loads(database()) != json.loads(expected):
+                    raise CommandError('The database output differs.')
+                modes.append(('postgres json', database))
+
+            for label, func in modes:
+                cpu = time.process_time()
+                samples = benchmark.measure(func, options['iterations'])
+                cpu = (time.process_time() - cpu) / options['iterations']
+                self.stdout.write(
+                    benchmark.format_row(
+                        f'{label} ({options["recipes"]} recipes)',
+                        benchmark.summarize(samples),
+                    ) + f' cpu={cpu * 1000:8.1f}ms'
+                )
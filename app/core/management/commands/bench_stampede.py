@@ -0,0 +1,113 @@
+"""
+Django command to reproduce a cache stampede on the recipe list
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import benchmark, caching
+from recipe import views
+
+
+def _cache_aside(cache, key, compute, timeout, scope=None, **kwargs):
+    """What a plain ``cache.get()``/``cache.set()`` around the list does."""
+    key += ':plain'
+    current = caching.generation(cache, scope)
+    entry = cache.get(key)
+    if entry is not None and entry[0] == current:
+        return entry[1]
+    value = compute()
+    cache.set(key, (current, value), timeout)
+    return value
+
+
+class Command(BaseCommand):
+    """
+    Keep clients reading one user's recipe list while the list expires
+    and the user's library is written to, and count how many clients
+    recompute it at once, with plain caching and with stampede protection.
+    Coalescing is off, so each client stands in for a separate worker.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--duration', type=float, default=5)
+        parser.add_argument('--timeout', type=float, default=1)
+        parser.add_argument('--write-interval', type=float, default=1)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        modes = [
+            ('plain caching', _cache_aside),
+            ('stampede protection', caching.get_or_compute),
+        ]
+        with benchmark.bench_user(options['recipes']) as user, \
+                override_settings(ALLOWED_HOSTS=['testserver'],
+                                  ADMISSION_CONTROL=False,
+                                  REQUEST_COALESCING=False,
+                                  LIST_CACHE_TIMEOUT=options['timeout']):
+            token = Token.objects.create(user=user)
+            for label, get_or_compute in modes:
+                with mock.patch.object(views.caching, 'get_or_compute',
+                                       get_or_compute):
+                    self._run(label, user, token, options)
+
+    def _run(self, label, user, token, options):
+        url = reverse('recipe:recipe-list')
+        list_data = views.FastListMixin.list_data
+        lock = threading.Lock()
+        computing = [0]
+        counts = {'computes': 0, 'widest': 0}
+
+        def counted_list_data(view, queryset):
+            with lock:
+                computing[0] += 1
+                counts['computes'] += 1
+                counts['widest'] = max(counts['widest'], computing[0])
+            try:
+                return list_data(view, queryset)
+            finally:
+                with lock:
+                    computing[0] -= 1
+
+        deadline = time.monotonic() + options['duration']
+
+        def read(_):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+            samples = []
+            try:
+                while time.monotonic() < deadline:
+                    start = time.perf_counter()
+                    client.get(url)
+                    samples.append(time.perf_counter() - start)
+            finally:
+                connections.close_all()
+            return samples
+
+        caching.invalidate_library(user.pk)
+        with mock.patch.object(views.FastListMixin, 'list_data',
+                               counted_list_data), \
+                ThreadPoolExecutor(options['concurrency']) as pool:
+            readers = [pool.submit(read, i)
+                       for i in range(options['concurrency'])]
+            while time.monotonic() < deadline:
+                time.sleep(options['write_interval'])
+                caching.invalidate_library(user.pk)
+            samples = [s for reader in readers for s in reader.result()]
+
+        self.stdout.write(
+            benchmark.format_row(label, benchmark.summarize(samples)) +
+            f" recomputes={counts['computes']}"
+            f" widest={counts['widest']}"
+        )
@@ -0,0 +1,34 @@
+"""
+Django command to carry out pending account deletions
+"""
+from django.core.management.base import BaseCommand
+
+from core import deletion
+
+
+class Command(BaseCommand):
+    """
+    Delete the accounts waiting for deletion, including those a worker
+    stopped on, reporting progress after every batch.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        processed = deletion.process_pending(
+            options['batch_size'], self._report
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {processed} accounts')
+        )
+
+    def _report(self, account):
+        done = ', '.join(
+            f'{name} {account.deleted.get(name, 0)}/{total}'
+            for name, total in account.total.items()
+        )
+        self.stdout.write(
+            f'{account.email}: {account.progress:.0%} ({done})'
+        )
@@ -0,0 +1,126 @@
+"""
+Django command to profile the imports made while starting the app
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+TARGETS = {
+    'setup': 'import django; django.setup()',
+    'urls': (
+        'import django; django.setup(); '
+        'from django.urls import get_resolver; get_resolver().url_patterns'
+    ),
+    'wsgi': 'import app.wsgi',
+}
+
+
+class ImportNode:
+
+    def __init__(self, name, self_us, cumulative_us):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.children = []
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'self_ms': self.self_us / 1000,
+            'cumulative_ms': self.cumulative_us / 1000,
+            'children': [child.as_dict() for child in self.children],
+        }
+
+
+def parse_importtime(output):
+    """
+    Build the import tree from ``python -X importtime`` output, which
+    lists each module after the modules it imported, indented by depth.
+    """
+    pending = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        node = ImportNode(name.strip(), int(fields[0]), int(fields[1]))
+        node.children = pending.pop(depth + 1, [])
+        pending.setdefault(depth, []).append(node)
+    return pending.get(0, [])
+
+
+class Command(BaseCommand):
+    """Report a per-module import time tree for a cold start."""
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', choices=sorted(TARGETS), default='urls',
+            help='How much of the app to load.',
+        )
+        parser.add_argument(
+            '--min-ms', type=float, default=5,
+            help='Hide modules whose cumulative time is lower.',
+        )
+        parser.add_argument('--depth', type=int, default=4)
+        parser.add_argument(
+            '--json', action='store_true',
+            help='Print the full tree as JSON.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        env = {**os.environ, 'WSGI_WARMUP': '0'}
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             TARGETS[options['target']]],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        wall_ms = (time.perf_counter() - start) * 1000
+        if result.returncode:
+            raise CommandError(result.stderr)
+
+        roots = parse_importtime(result.stderr)
+        imports_ms = sum(root.cumulative_us for root in roots) / 1000
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'target': options['target'],
+                'wall_ms': wall_ms,
+                'imports_ms': imports_ms,
+                'modules': [root.as_dict() for root in roots],
+            }))
+            return
+
+        ordered = sorted(roots, key=lambda n: n.cumulative_us, reverse=True)
+        for root in ordered:
+            self._write_node(root, 0, options)
+        self.stdout.write(self.style.SUCCESS(
+            f"Cold start ({options['target']}): {wall_ms:.1f}ms wall, "
+            f'{imports_ms:.1f}ms importing'
+        ))
+
+    def _write_node(self, node, depth, options):
+        if node.cumulative_us / 1000 < options['min_ms'] or \
+                depth >= options['depth']:
+            return
+        self.stdout.write(
+            f"{node.cumulative_us / 1000:9.1f}ms "
+            f"{node.self_us / 1000:9.1f}ms  {'  ' * depth}{node.name}"
+        )
+        children = sorted(
+            node.children, key=lambda n: n.cumulative_us, reverse=True
+        )
+        for child in children:
+            self._write_node(child, depth + 1, options)
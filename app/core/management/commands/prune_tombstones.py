@@ -0,0 +1,22 @@
+"""
+Django command to delete tombstones older than the sync retention
+"""
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Tombstone
+
+
+class Command(BaseCommand):
+    """Drop deletion history clients can no longer sync from."""
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        cutoff = timezone.now() - datetime.timedelta(
+            days=settings.SYNC_TOMBSTONE_RETENTION
+        )
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Pruned {deleted} tombstones'))
@@ -0,0 +1,105 @@
+"""
+Django command to run queued background jobs
+"""
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import deletion, jobs
+
+
+class Command(BaseCommand):
+    """
+    Run queued jobs in a pool of threads or processes until stopped,
+    reporting the queue's throughput every so often. Account deletions
+    left unfinished by a worker that went away are queued again on start
+    and at every report.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pool', choices=['thread', 'process'],
+            default=settings.JOB_WORKER_POOL,
+            help='Run jobs in threads, or in forked processes for CPU '
+                 'bound tasks.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int,
+            default=settings.JOB_WORKER_CONCURRENCY,
+            help='Number of jobs run at once.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no job is ready instead of waiting for more.',
+        )
+        parser.add_argument(
+            '--report-interval', type=float, default=60,
+            help='Seconds between throughput reports.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['pool'] == 'process':
+            context = multiprocessing.get_context('fork')
+            stop = context.Event()
+            # Children must open connections of their own.
+            connections.close_all()
+            units = [
+                context.Process(target=jobs.serve,
+                                args=(stop, options['burst']),
+                                name=f'job-worker-{index}')
+                for index in range(options['concurrency'])
+            ]
+        else:
+            stop = threading.Event()
+            units = [
+                threading.Thread(target=jobs.serve,
+                                 args=(stop, options['burst']),
+                                 name=f'job-worker-{index}')
+                for index in range(options['concurrency'])
+            ]
+
+        def shutdown(signum, frame):
+            stop.set()
+
+        handlers = {
+            signum: signal.signal(signum, shutdown)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        self.stdout.write(
+            f'Running {len(units)} job workers in a {options["pool"]} pool'
+        )
+        deletion.resume()
+        try:
+            for unit in units:
+                unit.start()
+            self._wait(units, options['report_interval'])
+        finally:
+            stop.set()
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+        self._report()
+
+    def _wait(self, units, interval):
+        next_report = time.monotonic() + interval
+        while any(unit.is_alive() for unit in units):
+            for unit in units:
+                unit.join(0.1)
+            if time.monotonic() >= next_report:
+                self._report()
+                jobs.prune()
+                deletion.resume()
+                next_report += interval
+
+    def _report(self):
+        stats = jobs.stats()
+        self.stdout.write(
+            f'{stats["per_second"]:.2f} jobs/s, {stats["queued"]} queued, '
+            f'{stats["running"]} running, {stats["dead"]} dead, '
+            f'lag {stats["lag_seconds"]:.1f}s'
+        )
@@ -1,27 +1,70 @@
 """
 Django comand to wait DB be available
 """
+import os
+import random
 import time
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
+from django.db import connections, DEFAULT_DB_ALIAS
 from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 
 class Command(BaseCommand):
     """Django command to wait for database."""
+    # System checks import every app's URLs and views; the probe needs none.
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--timeout', type=float,
+            default=float(os.environ.get('WAIT_FOR_DB_TIMEOUT', 60)),
+            help='Give up after this many seconds.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0.1,
+            help='Initial delay between attempts, doubled on each retry.',
+        )
+        parser.add_argument(
+            '--max-interval', type=float, default=2,
+            help='Upper bound for the delay between attempts.',
+        )
+
+    def probe(self, database):
+        """Open a connection without running the system checks."""
+        connections[database].ensure_connection()
 
     def handle(self, *args, **options):
         """Entrypoint for command."""
         self.stdout.write('Waiting for database...')
-        db_up = False
-        while db_up is False:
+        start = time.monotonic()
+        deadline = start + options['timeout']
+        interval = options['interval']
+        attempts = 0
+        while True:
+            attempts += 1
             try:
-                self.check(databases=['default'])
-                db_up = True
+                self.probe(options['database'])
+                break
             except (Psycopg2OpError, OperationalError):
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CommandError(
+                        f'Database unavailable after {attempts} attempts '
+                        f'in {time.monotonic() - start:.2f}s'
+                    )
+                # Full jitter keeps restarting workers from probing in sync.
+                delay = min(random.uniform(0, interval), remaining)
+                self.stdout.write(
+                    f'Database unavailable, waiting {delay:.2f} seconds...'
+                )
+                time.sleep(delay)
+                interval = min(interval * 2, options['max_interval'])
 
-        self.stdout.write(self.style.SUCCESS('Database available!'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Database available after {time.monotonic() - start:.2f}s '
+            f'({attempts} attempts)'
+        ))
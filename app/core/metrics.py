@@ -0,0 +1,33 @@
+"""
+Process-local registry of runtime metrics exposed by the metrics endpoint.
+"""
+import threading
+
+_collectors = {}
+
+
+class Counters:
+    """Named counters shared by the threads of a process."""
+
+    def __init__(self, *names):
+        self._values = dict.fromkeys(names, 0)
+        self._lock = threading.Lock()
+
+    def add(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                self._values[name] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+
+def register(name, collector):
+    """Register a callable returning a JSON serializable snapshot."""
+    _collectors[name] = collector
+
+
+def collect():
+    """Return the current snapshot of every registered collector."""
+    return {name: collector() for name, collector in _collectors.items()}
@@ -0,0 +1,119 @@
+import asyncio
+
+from rest_framework.permissions import SAFE_METHODS
+
+from core import admission, compression
+from core.db import routers
+
+
+class Middleware:
+    """
+    Middleware running natively under both WSGI and ASGI. Subclasses
+    implement ``handle(request)`` and its coroutine twin ``ahandle``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Mark the instance as a coroutine function, as Django's
+            # MiddlewareMixin does, so the handler awaits it.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.ahandle(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def ahandle(self, request):
+        raise NotImplementedError
+
+
+class ReplicaRoutingMiddleware(Middleware):
+    """Open a DB routing scope for each request."""
+
+    def _begin(self, request):
+        key = routers.client_key(request)
+        use_replica = request.method in SAFE_METHODS and \
+            not routers.is_pinned(key)
+        return key, routers.begin(use_replica)
+
+    def _end(self, key, token):
+        try:
+            if routers.current().wrote:
+                routers.pin(key)
+        finally:
+            routers.end(token)
+
+    def handle(self, request):
+        key, token = self._begin(request)
+        try:
+            return self.get_response(request)
+        finally:
+            self._end(key, token)
+
+    async def ahandle(self, request):
+        key, token = self._begin(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            self._end(key, token)
+
+
+class CompressionMiddleware(Middleware):
+    """Compress responses with the best encoding the client accepts."""
+
+    def handle(self, request):
+        return compression.compress_response(
+            request, self.get_response(request)
+        )
+
+    async def ahandle(self, request):
+        return compression.compress_response(
+            request, await self.get_response(request)
+        )
+
+
+def _leave_after(response, cost):
+    """Release the admission slot of ``response`` once it is done."""
+    if response.streaming:
+        # The body is produced while it is sent, so the slot is held
+        # until the server closes the response.
+        response._resource_closers.append(lambda: admission.leave(cost))
+    else:
+        admission.leave(cost)
+
+
+class AdmissionControlMiddleware(Middleware):
+    """Turn away requests over the client's rate or the host's capacity."""
+
+    def handle(self, request):
+        try:
+            cost = admission.enter(request)
+        except admission.Rejected as exc:
+            return exc.response()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            admission.leave(cost)
+            raise
+        _leave_after(response, cost)
+        return response
+
+    async def ahandle(self, request):
+        try:
+            cost = admission.enter(request)
+        except admission.Rejected as exc:
+            return exc.response()
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            admission.leave(cost)
+            raise
+        _leave_after(response, cost)
+        return response
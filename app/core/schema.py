@@ -0,0 +1,25 @@
+"""
+OpenAPI extensions for the project's own DRF classes, registered by
+``CoreConfig.ready``.
+"""
+from rest_framework.authentication import TokenAuthentication
+
+from drf_spectacular.authentication import TokenScheme
+
+
+class BatchAuthenticationScheme(TokenScheme):
+    """
+    Nothing for clients to send: views authenticate batch sub-requests
+    this way, and everyone else with the token scheme.
+    """
+    target_class = 'core.batch.BatchAuthentication'
+    match_subclasses = False
+    priority = 0
+
+    def get_security_requirement(self, auto_schema):
+        return None
+
+    def get_security_definition(self, auto_schema):
+        return TokenScheme(TokenAuthentication()).get_security_definition(
+            auto_schema
+        )
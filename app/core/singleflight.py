@@ -0,0 +1,88 @@
+"""
+Coalescing of identical concurrent computations within a process.
+
+When a burst of identical reads arrives, e.g. a client retrying or fanning
+out, the first request computes the result and the others wait for it and
+share it instead of repeating the same queries.
+"""
+import threading
+
+from django.conf import settings
+
+from core.db import routers
+
+
+class _Call:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Group:
+    """Run at most one call per key at a time; share it with late callers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._executed = 0
+        self._shared = 0
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._executed += 1
+            else:
+                self._shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executed': self._executed,
+                'shared': self._shared,
+            }
+
+
+group = Group()
+
+
+def coalesce(request, func):
+    """
+    Compute ``func()`` once for concurrent identical reads of ``request``,
+    keyed on the user, path and query string. Clients inside their
+    read-your-writes window compute their own result, so they never share
+    one that started before their write.
+    """
+    # The routing scope allows replica reads only for safe requests from
+    # clients that are not pinned to the primary after a write.
+    state = routers.current()
+    if (
+        not settings.REQUEST_COALESCING or
+        state is None or
+        not state.use_replica
+    ):
+        return func()
+    key = (request.user.pk, request.get_full_path())
+    return group.do(key, func)
@@ -0,0 +1,51 @@
+"""
+Static files storage writing content-hashed names with precompressed
+siblings.
+
+Each hashed file is written next to ``.gz`` and, when ``brotli`` is
+installed, ``.br`` copies compressed at the highest level, so nginx can
+serve them with ``gzip_static`` and cache the hashed names forever.
+"""
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+from core import compression
+
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.eot', '.html', '.ico', '.js', '.json', '.map', '.md',
+    '.otf', '.svg', '.ttf', '.txt', '.xml',
+}
+
+LEVELS = {'gzip': 9, 'br': 11}
+
+SUFFIXES = {'gzip': '.gz', 'br': '.br'}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Siblings must be at least this much smaller to be worth serving.
+    min_saving = 0.05
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Earlier passes yield intermediate names; compress the final ones.
+        for hashed_name in sorted(set(self.hashed_files.values())):
+            if os.path.splitext(hashed_name)[1] in COMPRESSIBLE_EXTENSIONS:
+                self._write_compressed(hashed_name)
+
+    def _write_compressed(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        for encoding in compression.encodings():
+            compressed = compression.compress(
+                encoding, content, LEVELS[encoding]
+            )
+            sibling = name + SUFFIXES[encoding]
+            if self.exists(sibling):
+                self.delete(sibling)
+            if len(compressed) < len(content) * (1 - self.min_saving):
+                self._save(sibling, ContentFile(compressed))
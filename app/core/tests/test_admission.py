@@ -0,0 +1,124 @@
+import os
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import admission
+from core.middleware import AdmissionControlMiddleware
+from core.models import User
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+HEALTH_URL = reverse('health-check')
+BATCH_URL = reverse('batch')
+
+
+@override_settings(ADMISSION_RATE=1, ADMISSION_BURST=5,
+                   ADMISSION_MAX_IN_FLIGHT=10)
+class AdmissionControlTests(TestCase):
+
+    def setUp(self):
+        cache.delete(admission.STATE_KEY)
+        self.addCleanup(cache.delete, admission.STATE_KEY)
+        user = User.objects.create_user('user@example.com', 'password123')
+        self.token = Token.objects.create(user=user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_client_throttled_once_bucket_is_empty(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get(TAGS_URL).status_code, 200)
+
+        response = self.client.get(TAGS_URL)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(admission.stats()['throttled'], 1)
+
+    def test_heavy_views_cost_more(self):
+        self.assertEqual(self.client.get(RECIPES_URL).status_code, 200)
+
+        response = self.client.get(RECIPES_URL)
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '5')
+
+    def test_buckets_are_per_client(self):
+        for _ in range(6):
+            self.client.get(TAGS_URL)
+        other = User.objects.create_user('other@example.com', 'password123')
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=other)}'
+        )
+
+        self.assertEqual(self.client.get(TAGS_URL).status_code, 200)
+
+    def test_shed_when_host_is_busy(self):
+        cache.set(admission.STATE_KEY, {
+            **admission._new_state(), 'in_flight': {os.getpid(): 10},
+        })
+
+        response = APIClient().get(TAGS_URL)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(admission.stats()['shed'], 1)
+
+    def test_in_flight_of_dead_workers_dropped(self):
+        cache.set(admission.STATE_KEY, {
+            **admission._new_state(), 'in_flight': {os.getpid() + 1: 10},
+        })
+
+        with patch.object(admission, '_alive', return_value=False):
+            response = self.client.get(TAGS_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(admission.stats()['in_flight'], 0)
+
+    def test_exempt_views_never_turned_away(self):
+        cache.set(admission.STATE_KEY, {
+            **admission._new_state(), 'in_flight': {os.getpid(): 10},
+        })
+
+        self.assertEqual(self.client.get(HEALTH_URL).status_code, 200)
+
+    def test_in_flight_released_after_response(self):
+        self.client.get(TAGS_URL)
+
+        stats = admission.stats()
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['admitted'], 1)
+
+    def test_streamed_response_holds_slot_until_closed(self):
+        request = RequestFactory().get(TAGS_URL)
+        middleware = AdmissionControlMiddleware(
+            lambda request: StreamingHttpResponse(iter([b'[]']))
+        )
+
+        response = middleware(request)
+        self.assertEqual(admission.stats()['in_flight'], 1)
+        response.close()
+
+        self.assertEqual(admission.stats()['in_flight'], 0)
+
+    def test_batch_charged_for_its_subrequests(self):
+        payload = {'requests': [{'path': TAGS_URL}, {'path': TAGS_URL}]}
+
+        first = self.client.post(BATCH_URL, payload, format='json')
+        second = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 429)
+        self.assertEqual(admission.stats()['in_flight'], 0)
+
+    @override_settings(ADMISSION_CONTROL=False)
+    def test_disabled(self):
+        for _ in range(6):
+            self.assertEqual(self.client.get(TAGS_URL).status_code, 200)
@@ -0,0 +1,212 @@
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import batch
+from core.db import routers
+from core.models import Recipe, Tag
+
+
+BATCH_URL = reverse('batch')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+class BatchApiTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}'
+        )
+
+    def test_auth_required(self):
+        response = APIClient().post(
+            BATCH_URL, {'requests': [{'path': '/api/user/me/'}]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_runs_subrequests_in_order(self):
+        Tag.objects.create(user=self.user, name='Vegan')
+        payload = {'requests': [
+            {'path': '/api/user/me/'},
+            {'path': '/api/recipe/tags/'},
+            {
+                'method': 'POST',
+                'path': '/api/recipe/recipes/',
+                'body': {'title': 'Soup', 'time_minutes': 5, 'price': '1.00'},
+            },
+            {'path': '/api/recipe/recipes/?tags=999'},
+            {'path': '/api/nothing-here/'},
+        ]}
+
+        response = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        responses = response.json()['responses']
+        self.assertEqual(
+            [r['status'] for r in responses], [200, 200, 201, 200, 404]
+        )
+        self.assertEqual(responses[0]['body']['email'], self.user.email)
+        self.assertEqual(responses[1]['body'][0]['name'], 'Vegan')
+        self.assertEqual(responses[2]['body']['title'], 'Soup')
+        self.assertEqual(responses[3]['body'], [])
+        self.assertTrue(Recipe.objects.filter(user=self.user).exists())
+
+    def test_authenticates_once(self):
+        payload = {'requests': [{'path': '/api/recipe/tags/'}] * 5}
+
+        with patch.object(
+            Token.objects, 'select_related', wraps=Token.objects.select_related
+        ) as lookup:
+            response = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(lookup.call_count, 1)
+
+    def test_subrequests_run_as_batch_user(self):
+        other = create_user(email='other@example.com', password='test123')
+        payload = {'requests': [{
+            'path': '/api/user/me/',
+            'headers': {
+                'Authorization': f'Token {Token.objects.create(user=other)}',
+            },
+        }]}
+
+        response = self.client.post(BATCH_URL, payload, format='json')
+
+        body = response.json()['responses'][0]['body']
+        self.assertEqual(body['email'], self.user.email)
+
+    def test_subrequest_idempotency_keys(self):
+        create = {
+            'method': 'POST',
+            'path': '/api/recipe/recipes/',
+            'headers': {'Idempotency-Key': 'batch-soup'},
+            'body': {'title': 'Soup', 'time_minutes': 5, 'price': '1.00'},
+        }
+
+        response = self.client.post(
+            BATCH_URL, {'requests': [create, create]}, format='json'
+        )
+
+        responses = response.json()['responses']
+        self.assertEqual([r['status'] for r in responses], [201, 201])
+        self.assertEqual(responses[0]['body'], responses[1]['body'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_subrequest_writes_pin_client(self):
+        payload = {'requests': [{
+            'method': 'POST',
+            'path': '/api/recipe/recipes/',
+            'body': {'title': 'Soup', 'time_minutes': 5, 'price': '1.00'},
+        }]}
+
+        response = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(response.json()['responses'][0]['status'], 201)
+        self.assertTrue(routers.is_pinned(
+            routers.client_key(response.wsgi_request)
+        ))
+
+    def test_subrequest_errors_are_returned(self):
+        payload = {'requests': [
+            {'method': 'POST', 'path': '/api/recipe/recipes/', 'body': {}},
+            {'method': 'POST', 'path': BATCH_URL, 'body': {}},
+        ]}
+
+        response = self.client.post(BATCH_URL, payload, format='json')
+
+        responses = response.json()['responses']
+        self.assertEqual(responses[0]['status'], 400)
+        self.assertIn('title', responses[0]['body'])
+        self.assertEqual(responses[1]['status'], 400)
+
+    @override_settings(BATCH_MAX_REQUESTS=2)
+    def test_invalid_payloads(self):
+        for payload in [
+            {},
+            {'requests': []},
+            {'requests': [{'path': TAGS_URL}] * 3},
+            {'requests': [{'path': 'relative/'}]},
+            {'requests': [{'path': TAGS_URL, 'method': 'TRACE'}]},
+            {'requests': [{'path': TAGS_URL}], 'parallel': 'maybe'},
+        ]:
+            response = self.client.post(BATCH_URL, payload, format='json')
+
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST, payload)
+
+    def test_paths_outside_api_rejected(self):
+        for path in ['/admin/', '/static/x.css', '//evil.example/api/']:
+            payload = {'requests': [{'path': path}]}
+
+            response = self.client.post(BATCH_URL, payload, format='json')
+
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST, path)
+
+    def test_parallel_flag_parsed_as_boolean(self):
+        for value, expected in [('false', False), ('0', False),
+                                ('no', False), ('true', True), (1, True)]:
+            with patch('core.batch.execute', return_value=[]) as execute:
+                self.client.post(BATCH_URL, {
+                    'requests': [{'path': TAGS_URL}], 'parallel': value,
+                }, format='json')
+
+            self.assertIs(execute.call_args.kwargs['parallel'], expected)
+
+
+class BatchRunsTests(TestCase):
+
+    def test_reads_grouped_between_writes(self):
+        subrequests = [
+            {'method': m} for m in ['GET', 'GET', 'POST', 'GET', 'DELETE']
+        ]
+
+        runs = [
+            [s['method'] for s in run]
+            for run in batch._runs(subrequests, parallel=True)
+        ]
+
+        self.assertEqual(runs, [['GET', 'GET'], ['POST'], ['GET'], ['DELETE']])
+
+    def test_sequential_without_parallel(self):
+        subrequests = [{'method': 'GET'}] * 3
+
+        self.assertEqual(len(list(batch._runs(subrequests, False))), 3)
+
+
+class ParallelBatchTests(TransactionTestCase):
+
+    def test_parallel_reads(self):
+        user = create_user(email='user@example.com', password='test123')
+        Tag.objects.create(user=user, name='Vegan')
+        client = APIClient()
+        client.force_authenticate(user)
+        payload = {
+            'parallel': True,
+            'requests': [{'path': '/api/recipe/tags/'}] * 4 + [
+                {'method': 'DELETE', 'path': '/api/recipe/tags/0/'},
+            ],
+        }
+
+        response = client.post(BATCH_URL, payload, format='json')
+
+        responses = response.json()['responses']
+        self.assertEqual([r['status'] for r in responses],
+                         [200, 200, 200, 200, 404])
+        for result in responses[:4]:
+            self.assertEqual(result['body'][0]['name'], 'Vegan')
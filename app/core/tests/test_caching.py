@@ -0,0 +1,133 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase
+
+from core import caching
+from core.models import Recipe
+
+
+class GetOrComputeTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = LocMemCache('caching-tests', {})
+        self.cache.clear()
+        self.calls = []
+
+    def compute(self, value='fresh'):
+        def func():
+            self.calls.append(value)
+            return value
+        return func
+
+    def get(self, compute=None, **kwargs):
+        kwargs.setdefault('scope', 'scope')
+        return caching.get_or_compute(
+            self.cache, 'key', compute or self.compute(), 60, **kwargs
+        )
+
+    def expire(self):
+        value, generation, cost, _ = self.cache.get('key')
+        self.cache.set('key', (value, generation, cost, time.time() - 1))
+
+    def test_hit_does_not_recompute(self):
+        self.get()
+        self.assertEqual(self.get(beta=0), 'fresh')
+        self.assertEqual(self.calls, ['fresh'])
+
+    def test_recomputes_early_near_expiry(self):
+        self.get()
+        value, generation, _, _ = self.cache.get('key')
+        self.cache.set('key', (value, generation, 1, time.time() + 0.5))
+
+        self.get(beta=0)
+        self.assertEqual(len(self.calls), 1)
+        self.get(beta=1000)
+        self.assertEqual(len(self.calls), 2)
+
+    def test_timeout_jittered(self):
+        before = time.time()
+        self.get(jitter=0.5)
+
+        expires = self.cache.get('key')[3]
+        self.assertGreaterEqual(expires, before + 30)
+        self.assertLessEqual(expires, time.time() + 60)
+
+    def test_invalidate_makes_value_stale(self):
+        self.get(compute=self.compute('old'))
+        caching.invalidate(self.cache, 'scope')
+
+        self.assertEqual(self.get(), 'fresh')
+
+    def test_stale_served_while_another_recomputes(self):
+        self.get(compute=self.compute('old'), stale=30)
+        self.expire()
+        self.cache.add(caching.LOCK_PREFIX + 'key', True)
+
+        self.assertEqual(self.get(), 'old')
+        self.assertEqual(self.calls, ['old'])
+
+    def test_caller_needing_fresh_value_waits_for_it(self):
+        self.get(compute=self.compute('old'), stale=30)
+        caching.invalidate(self.cache, 'scope')
+        lock_key = caching.LOCK_PREFIX + 'key'
+        self.cache.add(lock_key, True)
+
+        def recompute():
+            time.sleep(0.05)
+            self.cache.set('key', (
+                'new', caching.generation(self.cache, 'scope'), 0,
+                time.time() + 60,
+            ))
+            self.cache.delete(lock_key)
+
+        thread = threading.Thread(target=recompute)
+        thread.start()
+        value = self.get(allow_stale=False)
+        thread.join()
+
+        self.assertEqual(value, 'new')
+        self.assertEqual(self.calls, ['old'])
+
+    def test_expired_key_recomputed_once_under_load(self):
+        self.get(compute=self.compute('old'), stale=30)
+        self.expire()
+        barrier = threading.Barrier(8)
+
+        def slow():
+            self.calls.append('new')
+            time.sleep(0.1)
+            return 'new'
+
+        def get(_):
+            barrier.wait()
+            return self.get(compute=slow, beta=0)
+
+        with ThreadPoolExecutor(8) as pool:
+            values = list(pool.map(get, range(8)))
+
+        self.assertEqual(self.calls, ['old', 'new'])
+        self.assertEqual(sorted(values), ['new'] + ['old'] * 7)
+
+
+class LibraryInvalidationTests(TestCase):
+
+    def test_writes_start_new_generation(self):
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'password123'
+        )
+        cache = caching._library_cache()
+        scope = caching.library_scope(user.pk)
+        before = caching.generation(cache, scope)
+
+        recipe = Recipe.objects.create(
+            user=user, title='Recipe', time_minutes=5, price=5
+        )
+        created = caching.generation(cache, scope)
+        recipe.tags.create(user=user, name='Tag')
+
+        self.assertNotEqual(created, before)
+        self.assertNotEqual(caching.generation(cache, scope), created)
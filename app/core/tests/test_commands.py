@@ -1,29 +1,81 @@
-
+import json
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
 
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 from django.test import SimpleTestCase
 
+from core.management.commands import profile_imports
+
 
-@patch('core.management.commands.wait_for_db.Command.check')
+@patch('core.management.commands.wait_for_db.Command.probe')
 class CommandTests(SimpleTestCase):
 
-    def test_wait_for_db_ready(self, patched_check):
-        patched_check.return_value = True
+    def test_wait_for_db_ready(self, patched_probe):
+        patched_probe.return_value = None
 
         call_command('wait_for_db')
 
-        patched_check.assert_called_once_with(databases=['default'])
+        patched_probe.assert_called_once_with('default')
 
     @patch('time.sleep')
-    def test_wait_for_db_delay(self, patched_sleep, patched_check):
-        patched_check.side_effect = [Psycopg2OpError] * 2 + \
-            [OperationalError] * 3 + [True]
+    def test_wait_for_db_delay(self, patched_sleep, patched_probe):
+        patched_probe.side_effect = [Psycopg2OpError] * 2 + \
+            [OperationalError] * 3 + [None]
 
         call_command('wait_for_db')
 
-        self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
+        self.assertEqual(patched_probe.call_count, 6)
+        self.assertEqual(patched_sleep.call_count, 5)
+        patched_probe.assert_called_with('default')
+
+    @patch('time.sleep')
+    def test_wait_for_db_backoff_is_bounded(self, patched_sleep,
+                                            patched_probe):
+        patched_probe.side_effect = [OperationalError] * 10 + [None]
+
+        call_command('wait_for_db', interval=0.5, max_interval=1)
+
+        delays = [c.args[0] for c in patched_sleep.call_args_list]
+        self.assertTrue(all(0 <= delay <= 1 for delay in delays))
+
+    def test_wait_for_db_deadline(self, patched_probe):
+        patched_probe.side_effect = OperationalError
+
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=0.05, interval=0.01)
+
+
+class ProfileImportsTests(SimpleTestCase):
+
+    def test_parse_importtime_builds_tree(self):
+        output = '\n'.join([
+            'import time: self [us] | cumulative | imported package',
+            'import time:        10 |         10 |     b.c',
+            'import time:        20 |         30 |   b',
+            'import time:         5 |          5 |   d',
+            'import time:        40 |         75 | a',
+            'import time:         7 |          7 | e',
+        ])
+
+        roots = profile_imports.parse_importtime(output)
+
+        self.assertEqual([root.name for root in roots], ['a', 'e'])
+        self.assertEqual([child.name for child in roots[0].children],
+                         ['b', 'd'])
+        self.assertEqual(roots[0].children[0].children[0].name, 'b.c')
+        self.assertEqual(roots[0].cumulative_us, 75)
+
+    def test_profile_imports_reports_cold_start(self):
+        out = StringIO()
+
+        call_command('profile_imports', target='setup', json=True, stdout=out)
+
+        report = json.loads(out.getvalue())
+        self.assertGreater(report['imports_ms'], 0)
+        names = [module['name'] for module in report['modules']]
+        self.assertIn('django', names)
@@ -0,0 +1,142 @@
+import gzip
+from decimal import Decimal
+from unittest import skipIf
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import compression
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def get_request(accept_encoding):
+    return RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+
+
+class NegotiationTests(TestCase):
+
+    @patch.object(compression, 'brotli', object())
+    def test_prefers_brotli(self):
+        self.assertEqual(compression.negotiate('gzip, deflate, br'), 'br')
+        self.assertEqual(compression.negotiate('br;q=0.5, gzip'), 'gzip')
+        self.assertEqual(compression.negotiate('br;q=0, *'), 'gzip')
+        self.assertEqual(compression.negotiate('*'), 'br')
+
+    @patch.object(compression, 'brotli', None)
+    def test_gzip_without_brotli(self):
+        self.assertEqual(compression.negotiate('br, gzip'), 'gzip')
+        self.assertIsNone(compression.negotiate('br'))
+
+    def test_nothing_acceptable(self):
+        self.assertIsNone(compression.negotiate(''))
+        self.assertIsNone(compression.negotiate('identity, gzip;q=0'))
+        self.assertIsNone(compression.negotiate('gzip;q=high'))
+
+
+class CompressResponseTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_compresses_large_json(self):
+        body = b'{"title":"%s"}' % (b'soup ' * 1000)
+        response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = '"abc"'
+
+        compression.compress_response(get_request('gzip'), response)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertEqual(int(response['Content-Length']),
+                         len(response.content))
+        self.assertEqual(gzip.decompress(response.content), body)
+
+    @override_settings(COMPRESSION_MIN_SIZE=100)
+    def test_skips_small_and_binary_bodies(self):
+        small = HttpResponse(b'{}', content_type='application/json')
+        image = HttpResponse(b'x' * 1000, content_type='image/jpeg')
+
+        for response in [small, image]:
+            compression.compress_response(get_request('gzip'), response)
+
+            self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_compresses_hot_payload_once(self):
+        body = b'[%s]' % b','.join([b'{"id":1}'] * 500)
+
+        with patch.object(compression, 'compress',
+                          wraps=compression.compress) as compress:
+            for _ in range(3):
+                response = HttpResponse(body, content_type='application/json')
+                compression.compress_response(get_request('gzip'), response)
+                self.assertEqual(gzip.decompress(response.content), body)
+
+        self.assertEqual(compress.call_count, 1)
+
+    def test_streaming(self):
+        chunks = [b'[', b'{"id":1},' * 200, b'{"id":2}', b']']
+        response = StreamingHttpResponse(
+            iter(chunks), content_type='application/json'
+        )
+
+        compression.compress_response(get_request('gzip'), response)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)),
+            b''.join(chunks),
+        )
+
+    @skipIf(compression.brotli is None, 'Requires brotli')
+    def test_brotli(self):
+        body = b'{"title":"%s"}' % (b'soup ' * 1000)
+        response = HttpResponse(body, content_type='application/json')
+        stream = StreamingHttpResponse(
+            iter([body, body]), content_type='application/json'
+        )
+
+        compression.compress_response(get_request('br'), response)
+        compression.compress_response(get_request('br'), stream)
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(compression.brotli.decompress(response.content),
+                         body)
+        self.assertEqual(
+            compression.brotli.decompress(
+                b''.join(stream.streaming_content)
+            ),
+            body * 2,
+        )
+
+
+class CompressionMiddlewareTests(TestCase):
+
+    def test_recipe_list_compressed(self):
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'password123'
+        )
+        Recipe.objects.bulk_create(
+            Recipe(user=user, title=f'Recipe {i}', time_minutes=5,
+                   price=Decimal('1.00'))
+            for i in range(50)
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        plain = client.get(RECIPES_URL)
+        response = client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), plain.content)
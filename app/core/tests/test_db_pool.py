@@ -0,0 +1,185 @@
+import threading
+import time
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.backends.postgresql import base
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import tag
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db import pool as db_pool
+from core.db.backends.postgresql.base import DatabaseWrapper
+from core.db.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def test_reuses_released_connection(self):
+        pool = ConnectionPool('test', max_size=2, timeout=1)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+
+        self.assertIs(pool.acquire(FakeConnection), conn)
+        self.assertEqual(pool.stats()['open'], 1)
+
+    def test_discards_closed_and_unusable_connections(self):
+        pool = ConnectionPool('test', max_size=1, timeout=1)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn, suspect=True)
+
+        new_conn = pool.acquire(FakeConnection, check=lambda c: False)
+
+        self.assertIsNot(new_conn, conn)
+        self.assertTrue(conn.closed)
+        self.assertEqual(pool.stats()['open'], 1)
+
+    def test_timeout_when_exhausted(self):
+        pool = ConnectionPool('test', max_size=1, timeout=0.01)
+        pool.acquire(FakeConnection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+    def test_waiter_receives_released_connection(self):
+        pool = ConnectionPool('test', max_size=1, timeout=5)
+        conn = pool.acquire(FakeConnection)
+        acquired = []
+        waiter = threading.Thread(
+            target=lambda: acquired.append(pool.acquire(FakeConnection))
+        )
+        waiter.start()
+        while not pool._cond._waiters:
+            pass
+        pool.release(conn)
+        waiter.join()
+
+        stats = pool.stats()
+        self.assertEqual(acquired, [conn])
+        self.assertEqual(stats['waits'], 1)
+        self.assertEqual(stats['in_use'], 1)
+        self.assertEqual(stats['idle'], 0)
+
+    def test_only_suspect_connections_checked(self):
+        pool = ConnectionPool('test', max_size=1, timeout=1)
+        conn = pool.acquire(FakeConnection)
+        pool.release(conn)
+
+        self.assertIs(pool.acquire(FakeConnection, check=lambda c: False),
+                      conn)
+
+    def test_failed_connect_frees_slot(self):
+        pool = ConnectionPool('test', max_size=1, timeout=0.01)
+
+        def connect():
+            raise OSError
+
+        with self.assertRaises(OSError):
+            pool.acquire(connect)
+        self.assertIsInstance(pool.acquire(FakeConnection), FakeConnection)
+
+
+@tag('postgres')
+@skipUnless(connection.vendor == 'postgresql', 'Requires PostgreSQL')
+class PooledWrapperTests(SimpleTestCase):
+    databases = {'default'}
+
+    def wrapper(self, **settings):
+        wrapper = DatabaseWrapper(
+            {**connection.settings_dict, 'CONN_HEALTH_CHECKS': True,
+             **settings},
+            alias='pooled',
+        )
+        self.addCleanup(self.close_pools)
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def close_pools(self):
+        for connection_pool in db_pool.all_pools():
+            connection_pool.close_idle()
+
+    def run_requests(self, wrapper, count):
+        """Return the connections opened and checks run by the requests."""
+        with patch.object(base.Database, 'connect',
+                          wraps=base.Database.connect) as connect, \
+                patch.object(wrapper, 'is_usable',
+                             wraps=wrapper.is_usable) as is_usable:
+            for _ in range(count):
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                wrapper.close_if_unusable_or_obsolete()
+        return connect.call_count, is_usable.call_count
+
+    def test_connection_kept_for_conn_max_age(self):
+        wrapper = self.wrapper(CONN_MAX_AGE=600, POOL_SIZE=2)
+
+        connects, checks = self.run_requests(wrapper, 3)
+
+        self.assertEqual(connects, 1)
+        self.assertEqual(checks, 0)
+        self.assertGreater(wrapper.close_at, time.monotonic())
+
+    def test_connection_reused_from_pool_between_requests(self):
+        wrapper = self.wrapper(CONN_MAX_AGE=0, POOL_SIZE=2)
+
+        connects, checks = self.run_requests(wrapper, 3)
+
+        self.assertEqual(connects, 1)
+        self.assertEqual(checks, 0)
+
+    def test_checked_before_reuse_after_error(self):
+        wrapper = self.wrapper(CONN_MAX_AGE=600)
+        wrapper.ensure_connection()
+        wrapper.errors_occurred = True
+
+        with patch.object(wrapper, 'is_usable', return_value=False):
+            connects, checks = self.run_requests(wrapper, 1)
+
+        self.assertEqual(checks, 1)
+        self.assertEqual(connects, 1)
+        self.assertFalse(wrapper.errors_occurred)
+
+
+class MetricsApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_metrics_requires_staff(self):
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(reverse('metrics'))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_reports_connections(self):
+        admin = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='test123',
+        )
+        self.client.force_authenticate(admin)
+
+        res = self.client.get(reverse('metrics'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('db_pool', res.data)
+        self.assertIn('open', res.data['db_connections'])
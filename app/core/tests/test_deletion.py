@@ -0,0 +1,200 @@
+import datetime
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import deletion, jobs
+from core.models import (
+    AccountDeletion, Job, Recipe, Tag, Ingredient, Tombstone
+)
+
+
+@override_settings(ACCOUNT_DELETION_WORKER='command')
+class AccountDeletionTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'gone@example.com', 'testpass123'
+        )
+        self.other = get_user_model().objects.create_user(
+            'kept@example.com', 'testpass123'
+        )
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}')
+                for i in range(3)]
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f'Recipe {i}', time_minutes=5,
+                price=1, image=f'uploads/recipe/{i}.jpg' if i < 2 else '',
+            )
+            recipe.tags.set(tags)
+            recipe.ingredients.add(ingredient)
+        self.kept = Recipe.objects.create(
+            user=self.other, title='Kept', time_minutes=5, price=1
+        )
+        self.kept.tags.add(Tag.objects.create(user=self.other, name='Kept'))
+        self.tombstones = Tombstone.objects.count()
+
+    def _process(self, batch_size=2):
+        reports = []
+        storage = Recipe._meta.get_field('image').storage
+        with patch.object(storage, 'delete') as patched_delete, \
+                self.captureOnCommitCallbacks(execute=True):
+            processed = deletion.process_pending(
+                batch_size, lambda d: reports.append(dict(d.deleted))
+            )
+        return processed, reports, patched_delete
+
+    def _run_job(self):
+        storage = Recipe._meta.get_field('image').storage
+        with patch.object(storage, 'delete'), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(jobs.run_next('test'))
+
+    def test_request_deletion_locks_user_out(self):
+        account = deletion.request_deletion(self.user)
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(account.status, 'pending')
+        self.assertEqual(account.email, self.user.email)
+        self.assertEqual(deletion.request_deletion(self.user), account)
+
+    def test_process_deletes_account_in_batches(self):
+        account = deletion.request_deletion(self.user)
+
+        processed, reports, patched_delete = self._process()
+
+        self.assertEqual(processed, 1)
+        self.assertFalse(
+            get_user_model().objects.filter(pk=self.user.pk).exists()
+        )
+        for model in [Recipe, Tag, Ingredient]:
+            self.assertFalse(model.objects.filter(user=self.user).exists())
+        self.assertEqual(Recipe.tags.through.objects.count(), 1)
+        self.assertFalse(Recipe.ingredients.through.objects.exists())
+        self.assertTrue(Recipe.objects.filter(pk=self.kept.pk).exists())
+        self.assertEqual(Tombstone.objects.count(), self.tombstones)
+        self.assertCountEqual(
+            [c.args[0] for c in patched_delete.call_args_list],
+            ['uploads/recipe/0.jpg', 'uploads/recipe/1.jpg'],
+        )
+        # Recipes in 3 batches, tags in 2, ingredients in 1, then done.
+        self.assertEqual(len(reports), 7)
+        self.assertEqual(reports[0], {'recipes': 2})
+
+        account.refresh_from_db()
+        self.assertEqual(account.status, 'done')
+        self.assertEqual(account.progress, 1.0)
+        self.assertIsNone(account.user)
+        self.assertEqual(
+            account.total,
+            {'recipes': 5, 'tags': 3, 'ingredients': 1, 'tombstones': 0},
+        )
+        self.assertEqual(
+            account.deleted, {'recipes': 5, 'tags': 3, 'ingredients': 1}
+        )
+
+    def test_progress(self):
+        account = AccountDeletion(
+            total={'recipes': 3, 'tags': 1}, deleted={'recipes': 2}
+        )
+
+        self.assertEqual(account.progress, 0.5)
+
+    def test_claimed_deletion_is_left_alone(self):
+        account = deletion.request_deletion(self.user)
+        AccountDeletion.objects.filter(pk=account.pk).update(
+            claimed_at=timezone.now()
+        )
+
+        processed, _, _ = self._process()
+
+        self.assertEqual(processed, 0)
+        self.assertTrue(Recipe.objects.filter(user=self.user).exists())
+
+    def test_stale_claim_is_taken_over(self):
+        account = deletion.request_deletion(self.user)
+        AccountDeletion.objects.filter(pk=account.pk).update(
+            claimed_at=timezone.now() - datetime.timedelta(
+                seconds=deletion.CLAIM_TIMEOUT + 1
+            ),
+            total={'recipes': 5, 'tags': 3, 'ingredients': 1,
+                   'tombstones': 0},
+        )
+
+        processed, _, _ = self._process()
+
+        self.assertEqual(processed, 1)
+        account.refresh_from_db()
+        self.assertEqual(account.status, 'done')
+
+    def test_process_deletions_command(self):
+        deletion.request_deletion(self.user)
+        storage = Recipe._meta.get_field('image').storage
+        out = StringIO()
+
+        with patch.object(storage, 'delete'), \
+                self.captureOnCommitCallbacks(execute=True):
+            call_command('process_deletions', batch_size=10, stdout=out)
+
+        self.assertFalse(
+            get_user_model().objects.filter(pk=self.user.pk).exists()
+        )
+        self.assertIn('gone@example.com: 100%', out.getvalue())
+        self.assertIn('Deleted 1 accounts', out.getvalue())
+
+    def test_resume_queues_unfinished_deletions_once(self):
+        self.assertIsNone(deletion.resume())
+        deletion.request_deletion(self.user)
+
+        job = deletion.resume()
+
+        self.assertEqual(job.task, 'core.deletion.process_pending')
+        self.assertIsNone(deletion.resume())
+        self._run_job()
+        self.assertFalse(
+            get_user_model().objects.filter(pk=self.user.pk).exists()
+        )
+        self.assertIsNone(deletion.resume())
+
+    @override_settings(ACCOUNT_DELETION_WORKER='queue')
+    def test_deletion_runs_as_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            deletion.request_deletion(self.user)
+
+        job = Job.objects.get()
+        self.assertEqual(job.task, 'core.deletion.process_pending')
+        self._run_job()
+
+        self.assertFalse(
+            get_user_model().objects.filter(pk=self.user.pk).exists()
+        )
+
+
+@override_settings(ACCOUNT_DELETION_WORKER='command', JOB_POLL_INTERVAL=0.01)
+class ResumeDeletionTests(TransactionTestCase):
+
+    def test_run_worker_resumes_unfinished_deletion(self):
+        user = get_user_model().objects.create_user(
+            'gone@example.com', 'testpass123'
+        )
+        Recipe.objects.create(user=user, title='Soup', time_minutes=5,
+                              price=1)
+        # As left by a web worker that died half way through.
+        AccountDeletion.objects.create(
+            user=user, email=user.email,
+            claimed_at=timezone.now() - datetime.timedelta(
+                seconds=deletion.CLAIM_TIMEOUT + 1
+            ),
+        )
+
+        call_command('run_worker', burst=True, concurrency=1,
+                     stdout=StringIO())
+
+        self.assertEqual(AccountDeletion.objects.get().status, 'done')
+        self.assertFalse(Recipe.objects.exists())
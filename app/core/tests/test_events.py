@@ -0,0 +1,236 @@
+import asyncio
+import json
+import threading
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+    tag,
+)
+
+from rest_framework.authtoken.models import Token
+
+from core import events
+from core.models import Recipe, Tag
+from core.sse import ChangeFeed, format_event
+
+
+FEED_PATH = '/api/recipe/events/'
+
+
+def create_user(email='user@example.com'):
+    return get_user_model().objects.create_user(email=email, password='pass')
+
+
+def create_recipe(user):
+    return Recipe.objects.create(
+        user=user,
+        title='Sample recipe',
+        time_minutes=5,
+        price=Decimal('1.50'),
+    )
+
+
+class BrokerTests(SimpleTestCase):
+
+    async def test_dispatch_reaches_only_subscribed_user(self):
+        broker = events.Broker()
+        subscription = broker.subscribe(1)
+        other = broker.subscribe(2)
+
+        broker.dispatch({'user': 1, 'type': 'tag.created', 'id': 3})
+        event = await asyncio.wait_for(subscription[1].get(), 1)
+
+        self.assertEqual(event['id'], 3)
+        self.assertTrue(other[1].empty())
+        self.assertEqual(broker.stats()['subscriptions'], 2)
+
+    async def test_full_queue_drops_events(self):
+        broker = events.Broker(queue_size=1)
+        broker.subscribe(1)
+
+        broker.dispatch({'user': 1, 'type': 'tag.created', 'id': 1})
+        broker.dispatch({'user': 1, 'type': 'tag.created', 'id': 2})
+        await asyncio.sleep(0)
+
+        self.assertEqual(broker.stats()['dropped'], 1)
+
+    def test_format_event(self):
+        body = format_event({'seq': 7, 'user': 1, 'type': 'recipe.deleted',
+                             'id': 4})
+
+        self.assertEqual(
+            body,
+            b'id: 7\nevent: recipe.deleted\n'
+            b'data: {"type": "recipe.deleted", "id": 4}\n\n',
+        )
+
+
+@override_settings(CHANGE_FEED_BACKEND='local')
+class SignalTests(TestCase):
+
+    def setUp(self):
+        self.user = create_user()
+        self.published = []
+        dispatch = events.broker.dispatch
+        events.broker.dispatch = self.published.append
+        self.addCleanup(setattr, events.broker, 'dispatch', dispatch)
+
+    def test_events_published_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = create_recipe(self.user)
+            tag = Tag.objects.create(user=self.user, name='Tag')
+            recipe.tags.add(tag)
+            recipe_id = recipe.id
+            recipe.delete()
+
+        self.assertEqual(
+            [(e['type'], e['id']) for e in self.published],
+            [
+                ('recipe.created', recipe_id),
+                ('tag.created', tag.id),
+                ('recipe.updated', recipe_id),
+                ('recipe.deleted', recipe_id),
+            ],
+        )
+        self.assertTrue(all(e['user'] == self.user.id
+                            for e in self.published))
+
+    @override_settings(CHANGE_FEED_BACKEND='postgres')
+    @patch('core.events.connections')
+    def test_events_of_one_commit_notified_together(self, patched):
+        with self.captureOnCommitCallbacks(execute=True):
+            events.publish_on_commit(Recipe, self.user.id, [1, 2, 3],
+                                     'deleted')
+
+        cursor = patched.__getitem__.return_value.cursor.return_value
+        execute = cursor.__enter__.return_value.execute
+        execute.assert_called_once()
+        channel, payloads = execute.call_args.args[1]
+        self.assertEqual(channel, events.CHANNEL)
+        self.assertEqual([json.loads(p)['id'] for p in payloads], [1, 2, 3])
+
+    def test_failed_publish_does_not_fail_the_write(self):
+        events.broker.dispatch = Mock(side_effect=RuntimeError)
+
+        with self.assertLogs('core.events', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            create_recipe(self.user)
+
+        self.assertTrue(Recipe.objects.exists())
+
+    def test_nothing_published_on_rollback(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            create_recipe(self.user)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.published, [])
+
+
+@tag('postgres')
+@skipUnless(connection.vendor == 'postgresql', 'Requires PostgreSQL')
+@override_settings(CHANGE_FEED_BACKEND='postgres')
+class PostgresListenerTests(TransactionTestCase):
+
+    def test_notifications_reach_the_broker(self):
+        received = []
+        dispatched = threading.Event()
+
+        def dispatch(event):
+            received.append(event)
+            dispatched.set()
+
+        listener = events.PostgresListener(poll_interval=0.1)
+        with patch.object(events.broker, 'dispatch', dispatch):
+            listener.start()
+            self.addCleanup(listener.join, 5)
+            self.addCleanup(listener.stop)
+            self.assertTrue(listener.listening.wait(5))
+
+            recipe = create_recipe(create_user())
+
+            self.assertTrue(dispatched.wait(5))
+        self.assertEqual(
+            [(e['type'], e['id']) for e in received],
+            [('recipe.created', recipe.id)],
+        )
+
+
+async def _not_found(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 404,
+                'headers': []})
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+@override_settings(CHANGE_FEED_BACKEND='local', CHANGE_FEED_HEARTBEAT=0.05)
+class ChangeFeedTests(TransactionTestCase):
+
+    def setUp(self):
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.app = ChangeFeed(_not_found, FEED_PATH)
+
+    async def open_feed(self, query_string=b''):
+        sent = []
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            'type': 'http',
+            'path': FEED_PATH,
+            'headers': [],
+            'query_string': query_string,
+        }
+        task = asyncio.ensure_future(self.app(scope, receive, send))
+        return task, sent, disconnect
+
+    async def test_requires_token(self):
+        task, sent, _ = await self.open_feed()
+        await asyncio.wait_for(task, 1)
+
+        self.assertEqual(sent[0]['status'], 401)
+
+    async def test_other_paths_passed_through(self):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await self.app({'type': 'http', 'path': '/api/'}, None, send)
+
+        self.assertEqual(sent[0]['status'], 404)
+
+    async def test_streams_events_and_heartbeats(self):
+        task, sent, disconnect = await self.open_feed(
+            f'token={self.token.key}'.encode()
+        )
+        while events.broker.stats()['subscriptions'] == 0:
+            await asyncio.sleep(0.01)
+
+        recipe = await sync_to_async(create_recipe)(self.user)
+        await asyncio.sleep(0.1)
+        disconnect.set()
+        await asyncio.wait_for(task, 1)
+
+        bodies = b''.join(m.get('body', b'') for m in sent[1:])
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn(
+            f'"type": "recipe.created", "id": {recipe.id}'.encode(), bodies
+        )
+        self.assertIn(b': keepalive', bodies)
+        self.assertEqual(events.broker.stats()['subscriptions'], 0)
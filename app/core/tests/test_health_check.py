@@ -1,9 +1,15 @@
-from django.test import TestCase
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core import health
+
 
 class HealthCheckTests(TestCase):
     """Test the health check API."""
@@ -15,3 +21,48 @@ class HealthCheckTests(TestCase):
         res = client.get(url)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class ReadinessTests(TestCase):
+    """Test the liveness and readiness APIs."""
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media_root.cleanup)
+        health.clear()
+        self.addCleanup(health.clear)
+
+    def test_liveness(self):
+        res = self.client.get(reverse('liveness'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_readiness_reports_checks(self):
+        with override_settings(MEDIA_ROOT=self.media_root.name):
+            res = self.client.get(reverse('readiness'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['ready'])
+        for name in ['database', 'media', 'cache']:
+            self.assertTrue(res.data['checks'][name]['ok'])
+            self.assertIn('latency_ms', res.data['checks'][name])
+
+    def test_readiness_fails_when_media_not_writable(self):
+        missing = os.path.join(self.media_root.name, 'missing')
+        with override_settings(MEDIA_ROOT=missing):
+            res = self.client.get(reverse('readiness'))
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(res.data['checks']['media']['ok'])
+        self.assertIn('error', res.data['checks']['media'])
+
+    @patch('core.health.run_checks')
+    def test_readiness_results_cached(self, patched_run_checks):
+        patched_run_checks.return_value = {'ready': True, 'checks': {}}
+
+        self.client.get(reverse('readiness'))
+        self.client.get(reverse('readiness'))
+
+        patched_run_checks.assert_called_once()
@@ -0,0 +1,107 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, override_settings
+
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+
+from core import idempotency
+
+
+class IdempotencyTests(SimpleTestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.delay = 0
+        tests = self
+
+        class CreateView(APIView):
+            authentication_classes = []
+            permission_classes = []
+
+            def post(self, request):
+                return idempotency.run(request, lambda: self.create(request))
+
+            def create(self, request):
+                tests.calls.append(request.data)
+                time.sleep(tests.delay)
+                if request.data.get('fail'):
+                    return Response({'detail': 'boom'}, status=500)
+                return Response({'call': len(tests.calls)}, status=201)
+
+        self.view = CreateView.as_view()
+        self.user = get_user_model()(pk=1)
+        self.key = uuid.uuid4().hex
+
+    def post(self, data, key=None):
+        request = APIRequestFactory().post(
+            '/recipes/', data, format='json',
+            HTTP_IDEMPOTENCY_KEY=key or self.key,
+        )
+        force_authenticate(request, self.user)
+        return self.view(request)
+
+    def test_without_key_runs_every_time(self):
+        for _ in range(2):
+            request = APIRequestFactory().post('/recipes/', {}, format='json')
+            force_authenticate(request, self.user)
+            self.view(request)
+
+        self.assertEqual(len(self.calls), 2)
+
+    def test_keys_are_per_user(self):
+        self.post({})
+        self.user = get_user_model()(pk=2)
+
+        response = self.post({})
+
+        self.assertEqual(response.data, {'call': 2})
+
+    def test_concurrent_duplicates_wait_for_first(self):
+        self.delay = 0.2
+        barrier = threading.Barrier(4)
+
+        def post(_):
+            barrier.wait()
+            return self.post({'title': 'Soup'})
+
+        with ThreadPoolExecutor(4) as pool:
+            responses = list(pool.map(post, range(4)))
+
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual([r.status_code for r in responses], [201] * 4)
+        self.assertEqual(
+            sorted(r.has_header('Idempotent-Replayed') for r in responses),
+            [False, True, True, True],
+        )
+
+    @override_settings(IDEMPOTENCY_WAIT=0.1)
+    def test_conflict_when_first_still_running(self):
+        self.delay = 0.5
+        first = threading.Thread(target=self.post, args=({},))
+        first.start()
+        time.sleep(0.05)
+
+        response = self.post({})
+        first.join()
+
+        self.assertEqual(response.status_code, 409)
+
+    def test_server_errors_not_stored(self):
+        self.post({'fail': True})
+
+        response = self.post({'fail': True})
+
+        self.assertEqual(len(self.calls), 2)
+        self.assertFalse(response.has_header('Idempotent-Replayed'))
+
+    def test_invalid_key(self):
+        response = self.post({}, key='x' * 256)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.calls, [])
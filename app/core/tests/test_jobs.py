@@ -0,0 +1,188 @@
+import datetime
+import threading
+import time
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+
+calls = []
+
+
+def record(**kwargs):
+    calls.append(kwargs)
+
+
+def fail(**kwargs):
+    raise ValueError('broken')
+
+
+def outlive_lease(**kwargs):
+    calls.append(Job.objects.get().locked_at)
+    time.sleep(0.3)
+    calls.append(Job.objects.get().locked_at)
+
+
+@override_settings(JOB_MAX_ATTEMPTS=3, JOB_RETRY_BACKOFF=10,
+                   JOB_RETRY_BACKOFF_MAX=30, JOB_LEASE=60)
+class JobTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_stores_task_path(self):
+        job = jobs.enqueue(record, {'a': 1}, delay=30)
+
+        self.assertEqual(job.task, 'core.tests.test_jobs.record')
+        self.assertEqual(job.state, Job.QUEUED)
+        self.assertEqual(job.max_attempts, 3)
+        self.assertGreater(job.run_at, timezone.now())
+
+    def test_run_next_runs_ready_job(self):
+        job = jobs.enqueue(record, {'a': 1})
+        jobs.enqueue(record, {'a': 2}, delay=30)
+
+        self.assertTrue(jobs.run_next('test'))
+        self.assertFalse(jobs.run_next('test'))
+
+        self.assertEqual(calls, [{'a': 1}])
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_failed_job_is_retried_with_backoff(self):
+        job = jobs.enqueue(fail)
+
+        jobs.run_next('test')
+
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.QUEUED)
+        self.assertIn('ValueError: broken', job.last_error)
+        delay = (job.run_at - timezone.now()).total_seconds()
+        self.assertTrue(4 < delay <= 10)
+
+    def test_retry_delay_doubles_up_to_limit(self):
+        with patch('random.uniform', lambda low, high: high):
+            delays = [jobs.retry_delay(attempts) for attempts in (1, 2, 3)]
+
+        self.assertEqual(delays, [10, 20, 30])
+
+    def test_job_is_dead_lettered_after_max_attempts(self):
+        job = jobs.enqueue(fail)
+
+        for _ in range(3):
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            jobs.run_next('test')
+
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.DEAD)
+        self.assertEqual(job.attempts, 3)
+        self.assertFalse(jobs.run_next('test'))
+
+        self.assertEqual(jobs.retry(Job.objects.all()), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.state, job.attempts), (Job.QUEUED, 0))
+
+    def test_expired_lease_is_taken_over(self):
+        stale = jobs.enqueue(record, {'a': 1})
+        fresh = jobs.enqueue(record, {'a': 2})
+        Job.objects.filter(pk=stale.pk).update(
+            state=Job.RUNNING, attempts=1, locked_by='gone',
+            locked_at=timezone.now() - datetime.timedelta(seconds=61),
+        )
+        Job.objects.filter(pk=fresh.pk).update(
+            state=Job.RUNNING, attempts=1, locked_by='busy',
+            locked_at=timezone.now(),
+        )
+
+        claimed = jobs.claim('test', limit=10)
+
+        self.assertEqual([job.pk for job in claimed], [stale.pk])
+        self.assertEqual(claimed[0].attempts, 2)
+
+    def test_late_result_of_replaced_worker_is_ignored(self):
+        job = jobs.enqueue(record)
+        claimed, = jobs.claim('slow')
+        Job.objects.filter(pk=job.pk).update(locked_by='other', attempts=2)
+
+        jobs.execute(claimed)
+
+        job.refresh_from_db()
+        self.assertEqual((job.state, job.locked_by), (Job.RUNNING, 'other'))
+        self.assertIsNone(job.finished_at)
+
+    def test_prune_drops_old_finished_jobs(self):
+        old = jobs.enqueue(record)
+        recent = jobs.enqueue(record)
+        Job.objects.filter(pk=old.pk).update(
+            state=Job.DONE,
+            finished_at=timezone.now() - datetime.timedelta(days=2),
+        )
+        Job.objects.filter(pk=recent.pk).update(
+            state=Job.DONE, finished_at=timezone.now()
+        )
+
+        self.assertEqual(jobs.prune(), 1)
+        self.assertTrue(Job.objects.filter(pk=recent.pk).exists())
+
+    @patch('core.jobs.connections')
+    @patch('core.jobs.close_old_connections')
+    def test_serve_refreshes_connections_around_jobs(self, patched_close,
+                                                     patched_connections):
+        jobs.enqueue(record)
+        jobs.enqueue(record)
+
+        jobs.serve(threading.Event(), burst=True)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(patched_close.call_count, 3)
+
+    def test_stats(self):
+        jobs.enqueue(record)
+        jobs.enqueue(record)
+        jobs.run_next('test')
+
+        stats = jobs.stats()
+
+        self.assertEqual(stats['queued'], 1)
+        self.assertEqual(stats['dead'], 0)
+        self.assertEqual(stats['per_second'], 1 / jobs.THROUGHPUT_WINDOW)
+        self.assertGreaterEqual(stats['lag_seconds'], 0)
+
+
+@override_settings(JOB_POLL_INTERVAL=0.01)
+class RunWorkerCommandTests(TransactionTestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_burst_runs_every_ready_job(self):
+        for index in range(20):
+            jobs.enqueue(record, {'index': index})
+        out = StringIO()
+
+        # SQLite locks whole tables, so a single worker thread is tested.
+        call_command('run_worker', burst=True, concurrency=1, stdout=out)
+
+        self.assertCountEqual(calls, [{'index': i} for i in range(20)])
+        self.assertEqual(
+            Job.objects.filter(state=Job.DONE).count(), 20
+        )
+        self.assertIn('Running 1 job workers in a thread pool', out.getvalue())
+        self.assertIn('0 queued', out.getvalue())
+
+    @override_settings(JOB_LEASE=0.15)
+    def test_running_job_keeps_its_lease(self):
+        job = jobs.enqueue(outlive_lease)
+
+        self.assertTrue(jobs.run_next('test'))
+
+        self.assertGreater(calls[1], calls[0])
+        self.assertEqual(Job.objects.get(pk=job.pk).state, Job.DONE)
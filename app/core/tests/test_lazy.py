@@ -0,0 +1,37 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.lazy import lazy_view
+
+
+class LazyViewTests(SimpleTestCase):
+
+    @patch('core.lazy.import_string')
+    def test_view_imported_once_on_first_request(self, patched_import):
+        view = lazy_view('some.module.View', url_name='x')
+
+        patched_import.assert_not_called()
+        view(None)
+        view(None)
+
+        patched_import.assert_called_once_with('some.module.View')
+        patched_import.return_value.as_view.assert_called_once_with(
+            url_name='x'
+        )
+
+
+class SchemaApiTests(TestCase):
+
+    def test_schema_documents_every_endpoint(self):
+        res = APIClient().get(reverse('api-schema'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(b'assigned_only', res.content)
+        for path in ('health-check/', 'health-check/ready/', 'metrics/',
+                     'batch/'):
+            self.assertIn(f'/api/{path}:'.encode(), res.content)
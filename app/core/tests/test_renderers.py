@@ -0,0 +1,137 @@
+import datetime
+import tempfile
+from decimal import Decimal
+
+import msgpack
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.renderers import FastJSONRenderer, MessagePackRenderer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+PAYLOAD = {
+    'id': 1,
+    'title': 'Crème brûlée \u2028 "quoted" \\ </script>',
+    'price': Decimal('5.25'),
+    'ratio': 0.1,
+    'created': datetime.datetime(2021, 6, 1, 12, 30, 15, 123456,
+                                 tzinfo=datetime.timezone.utc),
+    'day': datetime.date(2021, 6, 1),
+    'label': gettext_lazy('Name'),
+    'tags': [{'id': 2, 'name': 'Vegan'}],
+    'empty': None,
+    3: True,
+}
+
+
+class FastJSONRendererTests(TestCase):
+
+    def test_matches_drf_json_bytes(self):
+        self.assertEqual(
+            FastJSONRenderer().render(PAYLOAD),
+            JSONRenderer().render(PAYLOAD),
+        )
+
+    def test_indented_output_uses_drf(self):
+        rendered = FastJSONRenderer().render(
+            PAYLOAD, 'application/json; indent=2', {}
+        )
+
+        self.assertEqual(
+            rendered,
+            JSONRenderer().render(PAYLOAD, 'application/json; indent=2', {})
+        )
+
+    def test_none_renders_empty(self):
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class MessagePackRendererTests(TestCase):
+
+    def test_keeps_decimal_digits_and_encodes_dates(self):
+        data = msgpack.unpackb(
+            MessagePackRenderer().render(PAYLOAD), strict_map_key=False
+        )
+
+        self.assertEqual(data['price'], '5.25')
+        self.assertEqual(data['created'], '2021-06-01T12:30:15.123456Z')
+        self.assertEqual(data['day'], '2021-06-01')
+        self.assertEqual(data['label'], 'Name')
+        self.assertEqual(data['tags'], [{'id': 2, 'name': 'Vegan'}])
+
+
+class ContentNegotiationTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_as_msgpack(self):
+        Recipe.objects.create(user=self.user, title='Soup', time_minutes=5,
+                              price=Decimal('10.50'))
+
+        json_response = self.client.get(RECIPES_URL)
+        response = self.client.get(RECIPES_URL,
+                                   HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content),
+                         json_response.json())
+
+    def test_create_from_msgpack(self):
+        body = msgpack.packb({
+            'title': 'Soup',
+            'time_minutes': 5,
+            'price': '1.50',
+            'tags': [{'name': 'Vegan'}],
+        })
+
+        response = self.client.post(
+            RECIPES_URL, body, content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        data = msgpack.unpackb(response.content)
+        self.assertEqual(data['price'], '1.50')
+        self.assertEqual(data['tags'][0]['name'], 'Vegan')
+
+    def test_invalid_msgpack(self):
+        response = self.client.post(
+            RECIPES_URL, b'\xc1', content_type='application/msgpack'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_image_url_as_msgpack(self):
+        recipe = Recipe.objects.create(user=self.user, title='Soup',
+                                       time_minutes=5, price=Decimal('1'))
+        self.addCleanup(lambda: recipe.image.delete())
+        url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            response = self.client.post(
+                url, {'image': image_file}, format='multipart',
+                HTTP_ACCEPT='application/msgpack',
+            )
+
+        recipe.refresh_from_db()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(msgpack.unpackb(response.content)['image'],
+                         f'http://testserver{recipe.image.url}')
@@ -0,0 +1,181 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connections
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.db import routers
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        cache.clear()
+
+    def route_read(self, use_replica):
+        token = routers.begin(use_replica)
+        try:
+            return self.router.db_for_read(Recipe)
+        finally:
+            routers.end(token)
+
+    def test_reads_outside_request_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Recipe), 'default')
+
+    def test_safe_request_reads_use_replica(self):
+        self.assertEqual(self.route_read(True), 'replica_1')
+
+    def test_credentials_read_from_primary(self):
+        token = routers.begin(True)
+        try:
+            for model in [Token, get_user_model(), Session]:
+                self.assertEqual(self.router.db_for_read(model), 'default')
+        finally:
+            routers.end(token)
+
+    def test_unsafe_request_reads_use_primary(self):
+        self.assertEqual(self.route_read(False), 'default')
+
+    def test_reads_after_write_in_request_use_primary(self):
+        token = routers.begin(True)
+        try:
+            self.assertEqual(self.router.db_for_write(Recipe), 'default')
+            self.assertEqual(self.router.db_for_read(Recipe), 'default')
+        finally:
+            routers.end(token)
+
+    def test_replicas_never_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica_1', 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+    def test_client_pinned_after_write(self):
+        factory = RequestFactory()
+        auth = {'HTTP_AUTHORIZATION': 'Token abc'}
+
+        def write(request):
+            self.router.db_for_write(Recipe)
+
+        ReplicaRoutingMiddleware(write)(factory.post('/', **auth))
+
+        key = routers.client_key(factory.get('/', **auth))
+        self.assertTrue(routers.is_pinned(key))
+        other = routers.client_key(
+            factory.get('/', HTTP_AUTHORIZATION='Token xyz')
+        )
+        self.assertFalse(routers.is_pinned(other))
+
+    @override_settings(READ_YOUR_WRITES_WINDOW=0)
+    def test_pinning_disabled(self):
+        routers.pin('client')
+
+        self.assertFalse(routers.is_pinned('client'))
+
+
+# Lists are uncached unless a test says otherwise, as the list cache is
+# filled from the primary.
+@override_settings(DATABASE_REPLICAS=['replica'], LIST_CACHE_TIMEOUT=0)
+class ReplicaRoutingApiTests(TransactionTestCase):
+    """
+    Against the test settings' 'replica' database, which never receives
+    the primary's writes, so each read shows where it was served from.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='test123',
+        )
+        Recipe.objects.create(user=self.user, title='Soup', time_minutes=5,
+                              price=Decimal('1.00'))
+        token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    def get(self, url):
+        """Return the response and the tables each alias was queried for."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(url)
+        return response, {
+            alias: {
+                table for query in ctx.captured_queries
+                for table in ('core_recipe', 'authtoken_token')
+                if f'FROM "{table}"' in query['sql']
+            }
+            for alias, ctx in (('default', primary), ('replica', replica))
+        }
+
+    def test_list_reads_from_replica(self):
+        response, tables = self.get(RECIPES_URL)
+
+        self.assertEqual(response.status_code, 200)
+        # The replica has not seen the recipe yet.
+        self.assertEqual(response.data, [])
+        self.assertEqual(tables, {
+            'default': {'authtoken_token'},
+            'replica': {'core_recipe'},
+        })
+
+    @override_settings(LIST_CACHE_TIMEOUT=60)
+    def test_cached_list_filled_from_primary(self):
+        response, tables = self.get(RECIPES_URL)
+
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(tables['replica'], set())
+
+        response, tables = self.get(RECIPES_URL)
+
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(tables, {'default': {'authtoken_token'},
+                                  'replica': set()})
+
+    def test_reads_your_writes_from_primary(self):
+        self.client.post(RECIPES_URL, {
+            'title': 'Sample recipe',
+            'time_minutes': 30,
+            'price': Decimal('5.99'),
+        })
+
+        response, tables = self.get(RECIPES_URL)
+
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(tables['replica'], set())
+        self.assertIn('core_recipe', tables['default'])
+
+    def test_login_then_read(self):
+        response = APIClient().post(TOKEN_URL, {
+            'email': 'user@example.com', 'password': 'test123',
+        })
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {response.data["token"]}'
+        )
+
+        response, tables = self.get(RECIPES_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(tables, {
+            'default': {'authtoken_token'},
+            'replica': {'core_recipe'},
+        })
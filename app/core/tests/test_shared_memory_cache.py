@@ -0,0 +1,174 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock, skipUnless
+
+from django.test import SimpleTestCase
+
+from core.cache.backends import shared_memory
+from core.cache.backends.shared_memory import SharedMemoryCache
+
+
+def _set_in_child(location, options):
+    # Map the file afresh rather than through the inherited mapping.
+    shared_memory._segments.clear()
+    SharedMemoryCache(location, {'OPTIONS': options}).set('shared', 'child')
+
+
+class SharedMemoryCacheTests(SimpleTestCase):
+
+    options = {'SIZE': 1024 * 1024, 'MAX_ENTRY_SIZE': 16384}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.location = os.path.join(self.directory, 'cache')
+        self.cache = self._cache()
+
+    def _cache(self, **options):
+        return SharedMemoryCache(
+            self.location, {'OPTIONS': {**self.options, **options}}
+        )
+
+    def test_set_get_delete(self):
+        self.cache.set('key', {'value': [1, 2]})
+
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.assertTrue(self.cache.delete('key'))
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.delete('key'))
+
+    def test_value_moves_between_slab_classes(self):
+        self.cache.set('key', 'x' * 10)
+        self.cache.set('key', 'y' * 5000)
+        self.cache.set('other', 'z')
+
+        self.assertEqual(self.cache.get('key'), 'y' * 5000)
+        self.cache.set('key', 'small')
+        self.assertEqual(self.cache.get('key'), 'small')
+
+    def test_add_keeps_live_value(self):
+        self.assertTrue(self.cache.add('key', 1))
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertEqual(self.cache.get('key'), 1)
+
+    def test_expiry_and_touch(self):
+        self.cache.set('key', 1, 0.05)
+        self.cache.set('forever', 1, None)
+        self.assertTrue(self.cache.touch('forever', 0.05))
+        self.assertTrue(self.cache.touch('key', None))
+        time.sleep(0.1)
+
+        self.assertEqual(self.cache.get('key'), 1)
+        self.assertIsNone(self.cache.get('forever'))
+        self.assertTrue(self.cache.add('forever', 2))
+
+    def test_incr(self):
+        self.cache.set('count', 1)
+
+        self.assertEqual(self.cache.incr('count', 5), 6)
+        self.assertEqual(self.cache.decr('count'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_update(self):
+        self.assertEqual(self.cache.update('key', lambda value: [value]),
+                         [None])
+        self.assertEqual(
+            self.cache.update('key', lambda value: value + [1]), [None, 1]
+        )
+        self.assertEqual(self.cache.get('key'), [None, 1])
+
+    def test_too_large_not_cached(self):
+        self.cache.set('key', 'small')
+        self.cache.set('key', 'x' * 20000)
+
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_evicts_least_recently_read(self):
+        cache = self._cache(SIZE=64 * 1024, MAX_ENTRY_SIZE=256, WAYS=4)
+        slab = cache._segment.slabs[0]
+        keys = []
+        for i in range(10000):
+            data, key_hash = cache._key(f'key-{i}', None)
+            if key_hash % slab.sets == 0:
+                keys.append(f'key-{i}')
+            if len(keys) == 5:
+                break
+        for key in keys[:4]:
+            cache.set(key, key)
+        cache.get(keys[0])
+
+        cache.set(keys[4], keys[4])
+
+        self.assertEqual(cache.get(keys[0]), keys[0])
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual(cache.get(keys[4]), keys[4])
+        self.assertEqual(cache._segment.stats()['evictions'], 1)
+
+    def test_clear(self):
+        self.cache.set('key', 1)
+        self.cache.clear()
+
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache._segment.stats()['entries'], 0)
+
+    def test_clear_moves_sequence_numbers_on(self):
+        self.cache.set('key', 1)
+        data, key_hash = self.cache._key('key', None)
+        segment = self.cache._segment
+        slab, set_index, way, _ = segment._find(
+            segment._attached(), data, key_hash
+        )
+        entry = slab.entry_at(set_index, way)
+        before = shared_memory.SEQUENCE.unpack_from(segment._buffer, entry)
+
+        self.cache.clear()
+
+        after = shared_memory.SEQUENCE.unpack_from(segment._buffer, entry)
+        self.assertEqual(after[0], before[0] + 2)
+
+    def test_private_segment_removes_its_file(self):
+        location = os.path.join(self.directory, 'private')
+        cache = SharedMemoryCache(
+            location, {'OPTIONS': {**self.options, 'PRIVATE': True}}
+        )
+        cache.set('key', 1)
+
+        self.assertFalse(os.path.exists(location))
+        self.assertEqual(cache.get('key'), 1)
+
+    def test_default_location_named_after_project(self):
+        location = shared_memory.default_location()
+        with mock.patch.dict(os.environ,
+                             DJANGO_SETTINGS_MODULE='other.settings'):
+            other = shared_memory.default_location()
+
+        self.assertNotEqual(location, other)
+        self.assertEqual(shared_memory.default_location(), location)
+        self.assertTrue(shared_memory.default_location(True).endswith(
+            f'-{os.getpid()}'
+        ))
+
+    def test_other_layout_starts_new_file(self):
+        self.cache.set('key', 1)
+        shared_memory._segments.clear()
+
+        cache = self._cache(SIZE=2 * 1024 * 1024)
+
+        self.assertIsNone(cache.get('key'))
+        cache.set('key', 2)
+        self.assertEqual(cache.get('key'), 2)
+
+    @skipUnless(hasattr(os, 'fork'), 'Needs fork')
+    def test_shared_between_processes(self):
+        child = multiprocessing.get_context('fork').Process(
+            target=_set_in_child, args=(self.location, self.options)
+        )
+        child.start()
+        child.join()
+
+        self.assertEqual(child.exitcode, 0)
+        self.assertEqual(self.cache.get('shared'), 'child')
@@ -0,0 +1,140 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import (
+    RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import singleflight
+from core.db import routers
+from core.models import Recipe
+from recipe import fastpath
+
+
+class GroupTests(SimpleTestCase):
+
+    def _burst(self, group, func, callers=8):
+        barrier = threading.Barrier(callers)
+
+        def call(_):
+            barrier.wait()
+            return group.do('key', func)
+
+        with ThreadPoolExecutor(callers) as pool:
+            return list(pool.map(call, range(callers)))
+
+    def test_concurrent_callers_share_one_call(self):
+        group = singleflight.Group()
+        calls = []
+
+        def func():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'value': 42}
+
+        results = self._burst(group, func)
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(group.stats(),
+                         {'in_flight': 0, 'executed': 1, 'shared': 7})
+
+    def test_error_shared_with_waiters(self):
+        group = singleflight.Group()
+
+        def func():
+            time.sleep(0.2)
+            raise ValueError('boom')
+
+        with self.assertRaises(ValueError):
+            self._burst(group, func)
+        self.assertEqual(group.stats()['in_flight'], 0)
+
+    def test_sequential_calls_run_again(self):
+        group = singleflight.Group()
+
+        self.assertEqual(group.do('key', lambda: 1), 1)
+        self.assertEqual(group.do('key', lambda: 2), 2)
+
+
+class CoalesceTests(SimpleTestCase):
+
+    def setUp(self):
+        self.request = RequestFactory().get('/api/recipe/recipes/?tags=1')
+        self.request.user = get_user_model()(pk=1)
+
+    def _coalesce(self, use_replica):
+        token = routers.begin(use_replica)
+        try:
+            with patch.object(singleflight.group, 'do') as do:
+                singleflight.coalesce(self.request, lambda: None)
+        finally:
+            routers.end(token)
+        return do
+
+    def test_keyed_on_user_path_and_query(self):
+        do = self._coalesce(use_replica=True)
+
+        self.assertEqual(do.call_args[0][0],
+                         (1, '/api/recipe/recipes/?tags=1'))
+
+    def test_pinned_clients_not_coalesced(self):
+        self.assertFalse(self._coalesce(use_replica=False).called)
+
+    @override_settings(REQUEST_COALESCING=False)
+    def test_disabled(self):
+        self.assertFalse(self._coalesce(use_replica=True).called)
+
+
+# The list cache would also collapse the burst; coalescing alone must.
+@override_settings(ADMISSION_CONTROL=False, LIST_CACHE_TIMEOUT=0)
+class CoalescingStressTests(TransactionTestCase):
+
+    def test_burst_of_identical_lists_computes_once(self):
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'password123'
+        )
+        Recipe.objects.bulk_create(
+            Recipe(user=user, title=f'Recipe {i}', time_minutes=5,
+                   price=Decimal('1.00'))
+            for i in range(20)
+        )
+        token = Token.objects.create(user=user)
+        url = reverse('recipe:recipe-list')
+        represent = fastpath.represent
+        calls = []
+
+        def slow_represent(*args, **kwargs):
+            calls.append(1)
+            time.sleep(0.3)
+            return represent(*args, **kwargs)
+
+        callers = 8
+        barrier = threading.Barrier(callers)
+
+        def get(_):
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+            barrier.wait()
+            try:
+                return client.get(url)
+            finally:
+                connections.close_all()
+
+        with patch.object(fastpath, 'represent', slow_represent), \
+                ThreadPoolExecutor(callers) as pool:
+            responses = list(pool.map(get, range(callers)))
+
+        self.assertEqual(len(calls), 1)
+        for response in responses:
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content, responses[0].content)
@@ -0,0 +1,68 @@
+import gzip
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core import compression
+from core.storage import CompressedManifestStaticFilesStorage
+
+
+class CompressedManifestStorageTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        self.storage = CompressedManifestStaticFilesStorage(
+            location=self.root, base_url='/static/'
+        )
+        self.files = {
+            'css/site.css': b'body { background: url("../img/dot.png"); }'
+                            + b'\n.a { color: red; }' * 200,
+            'img/dot.png': b'\x89PNG' + os.urandom(64),
+            'js/tiny.js': b'1',
+        }
+        for name, content in self.files.items():
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as handle:
+                handle.write(content)
+
+    def _collect(self):
+        paths = {name: (self.storage, name) for name in self.files}
+        for _, _, processed in self.storage.post_process(paths):
+            if isinstance(processed, Exception):
+                raise processed
+
+    def _exists(self, name):
+        return os.path.exists(os.path.join(self.root, name))
+
+    def test_writes_compressed_siblings_of_hashed_files(self):
+        self._collect()
+
+        css = self.storage.stored_name('css/site.css')
+        self.assertRegex(css, r'^css/site\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(self.root, css + '.gz'), 'rb') as handle:
+            with open(os.path.join(self.root, css), 'rb') as original:
+                self.assertEqual(gzip.decompress(handle.read()),
+                                 original.read())
+        self.assertEqual(self._exists(css + '.br'),
+                         compression.brotli is not None)
+
+    def test_skips_binary_and_incompressible_files(self):
+        self._collect()
+
+        png = self.storage.stored_name('img/dot.png')
+        tiny = self.storage.stored_name('js/tiny.js')
+        self.assertFalse(self._exists(png + '.gz'))
+        self.assertFalse(self._exists(tiny + '.gz'))
+
+    def test_dry_run_writes_nothing(self):
+        paths = {name: (self.storage, name) for name in self.files}
+
+        list(self.storage.post_process(paths, dry_run=True))
+
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(self.root, 'css'))), ['site.css']
+        )
@@ -0,0 +1,42 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from core import warmup
+from recipe import serializers
+
+
+class WarmupTests(TestCase):
+
+    def test_warm_up_reports_each_step(self):
+        with self.assertLogs('core.warmup', level='INFO'):
+            report = warmup.warm_up()
+
+        for step in ['imports', 'urls', 'serializers', 'connections']:
+            self.assertIn(f'{step}_ms', report)
+        self.assertIn('total_ms', report)
+        self.assertEqual(warmup.last_report['total_ms'], report['total_ms'])
+
+    def test_warm_up_without_connections(self):
+        with patch('core.warmup.warm_connections') as patched_connections, \
+                self.assertLogs('core.warmup', level='INFO'):
+            report = warmup.warm_up(connect=False)
+
+        patched_connections.assert_not_called()
+        self.assertNotIn('connections_ms', report)
+
+    def test_serializers_for_every_action_built(self):
+        built = warmup.warm_serializers()
+
+        self.assertIn(serializers.RecipeSerializer, built)
+        self.assertIn(serializers.RecipeDetailSerializer, built)
+        self.assertIn(serializers.RecipeImageSerializer, built)
+        self.assertIn(serializers.TagSerializer, built)
+
+    @patch('core.warmup.warm_urls', side_effect=RuntimeError)
+    def test_failing_step_does_not_abort_warm_up(self, patched_urls):
+        with self.assertLogs('core.warmup', level='ERROR') as logs:
+            report = warmup.warm_up(connect=False)
+
+        self.assertIn('serializers_ms', report)
+        self.assertIn('Warm-up step urls failed', logs.output[0])
@@ -0,0 +1,108 @@
+"""
+Keep ``updated_at`` and deletion tombstones accurate for delta sync.
+
+``auto_now`` only covers ``save()``; relation changes and the renaming or
+deletion of a tag or ingredient also change how a recipe serializes, so
+they touch the affected recipes explicitly. Nothing is tracked for rows
+deleted together with their owner: the owner has no client left to sync.
+"""
+import contextlib
+import contextvars
+
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete
+)
+from django.utils import timezone
+
+from core.models import Recipe, Tag, Ingredient, Tombstone
+
+
+TRACKED = {
+    Recipe: Tombstone.RECIPE,
+    Tag: Tombstone.TAG,
+    Ingredient: Tombstone.INGREDIENT,
+}
+
+# Users being deleted by the current thread or task.
+_deleting_owners = contextvars.ContextVar(
+    'deleting_owners', default=frozenset()
+)
+
+
+@contextlib.contextmanager
+def deleting_owners(pks):
+    """Track nothing for rows deleted together with the users ``pks``."""
+    token = _deleting_owners.set(_deleting_owners.get() | frozenset(pks))
+    try:
+        yield
+    finally:
+        _deleting_owners.reset(token)
+
+
+def touch_recipes(**filters):
+    Recipe.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+def _record_tombstone(sender, instance, **kwargs):
+    if instance.user_id in _deleting_owners.get():
+        return
+    Tombstone.objects.create(
+        user_id=instance.user_id,
+        model=TRACKED[sender],
+        object_id=instance.pk,
+    )
+
+
+def _touch_recipes_of(sender, instance):
+    if sender is Tag:
+        touch_recipes(tags=instance)
+    else:
+        touch_recipes(ingredients=instance)
+
+
+def _touch_recipes_of_deleted(sender, instance, **kwargs):
+    if instance.user_id not in _deleting_owners.get():
+        _touch_recipes_of(sender, instance)
+
+
+def _touch_recipes_of_saved(sender, instance, created, raw=False,
+                            **kwargs):
+    # Recipes embed the names of their tags and ingredients.
+    if not created and not raw:
+        _touch_recipes_of(sender, instance)
+
+
+def _relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            touch_recipes(pk=instance.pk)
+    elif action == 'pre_clear':
+        # Clearing from the tag or ingredient side gives no pk_set.
+        field = 'tags' if sender is Recipe.tags.through else 'ingredients'
+        touch_recipes(**{field: instance})
+    elif action in ('post_add', 'post_remove') and pk_set:
+        touch_recipes(pk__in=pk_set)
+
+
+def connect_signals():
+    for model in TRACKED:
+        post_delete.connect(
+            _record_tombstone, sender=model, dispatch_uid=f'tomb-{model}'
+        )
+    for model in [Tag, Ingredient]:
+        pre_delete.connect(
+            _touch_recipes_of_deleted,
+            sender=model,
+            dispatch_uid=f'touch-{model}',
+        )
+        post_save.connect(
+            _touch_recipes_of_saved,
+            sender=model,
+            dispatch_uid=f'touch-saved-{model}',
+        )
+    for through in [Recipe.tags.through, Recipe.ingredients.through]:
+        m2m_changed.connect(
+            _relations_changed,
+            sender=through,
+            dispatch_uid=f'touch-m2m-{through}',
+        )
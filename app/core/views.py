@@ -1,7 +1,81 @@
-from rest_framework.decorators import api_view
+from django.http import HttpResponse
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from rest_framework import status
+
+from core import admission
+from core import batch as core_batch
+from core import health
+from core import metrics as core_metrics
+
+
+# Class-based rather than @api_view: the decorator resolves the default
+# schema class at import time, which imports the drf-spectacular machinery.
+class HealthCheckView(APIView):
+
+    def get(self, request):
+        return Response({'healthy': True})
+
+
+class ReadinessView(APIView):
+
+    def get(self, request):
+        result = health.readiness()
+        if result['ready']:
+            return Response(result)
+
+        return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class MetricsView(APIView):
+    authentication_classes = [
+        core_batch.BatchAuthentication, TokenAuthentication
+    ]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(core_metrics.collect())
+
+
+class BatchView(APIView):
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            subrequests = core_batch.parse(request.data)
+            parallel = core_batch.parse_parallel(request.data)
+        except core_batch.BatchError as exc:
+            return Response(
+                {'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            cost = admission.enter(
+                request._request, core_batch.cost(subrequests)
+            )
+        except admission.Rejected as exc:
+            return exc.response()
+        try:
+            results = core_batch.execute(
+                request._request,
+                subrequests,
+                request.user,
+                request.auth,
+                parallel=parallel,
+            )
+        finally:
+            admission.leave(cost)
+        return HttpResponse(
+            core_batch.encode(results), content_type='application/json'
+        )
 
 
-@api_view(['GET'])
-def health_check(request):
-    return Response({'healthy': True})
+health_check = HealthCheckView.as_view()
+readiness = ReadinessView.as_view()
+metrics = MetricsView.as_view()
+batch = BatchView.as_view()
+batch.batchable = False
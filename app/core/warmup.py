@@ -0,0 +1,115 @@
+"""
+Pre-build lazily initialised structures before a worker takes traffic.
+"""
+import importlib
+import logging
+import time
+
+from django.db import connections
+from django.urls import URLPattern, URLResolver, get_resolver
+
+
+logger = logging.getLogger(__name__)
+
+EAGER_IMPORTS = [
+    'drf_spectacular.openapi',
+    'drf_spectacular.views',
+    'PIL.Image',
+]
+
+last_report = {}
+
+
+def _walk(resolver):
+    resolver.reverse_dict
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern)
+        elif isinstance(pattern, URLPattern):
+            yield pattern
+
+
+def warm_urls():
+    """
+    Populate the reverse and namespace tables of every resolver and import
+    views deferred with ``core.lazy.lazy_view``.
+    """
+    patterns = list(_walk(get_resolver()))
+    for pattern in patterns:
+        if hasattr(pattern.callback, 'resolve'):
+            pattern.callback.resolve()
+    return patterns
+
+
+def warm_serializers(patterns=None):
+    """Build the fields of every serializer used by an API view."""
+    built = set()
+    for pattern in patterns or warm_urls():
+        view_class = getattr(pattern.callback, 'cls', None)
+        if view_class is None or not hasattr(view_class, 'serializer_class'):
+            continue
+        actions = getattr(pattern.callback, 'actions', None) or {}
+        for action in actions.values() or [None]:
+            view = view_class(**getattr(pattern.callback, 'initkwargs', {}))
+            view.action = action
+            try:
+                serializer_class = view.get_serializer_class()
+            except Exception:
+                continue
+            if serializer_class not in built:
+                serializer_class().fields
+                built.add(serializer_class)
+    return built
+
+
+def warm_imports():
+    for module in EAGER_IMPORTS:
+        importlib.import_module(module)
+
+
+def warm_connections():
+    """Open this thread's connection to every configured database."""
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def warm_up(connect=True):
+    """
+    Run every warm-up step and log how long each took. Connections must
+    only be opened after a worker has forked, so a forking server calls
+    this with ``connect=False`` in the master and ``warm_worker()`` in
+    each worker.
+    """
+    steps = [
+        ('imports', warm_imports),
+        ('urls', warm_urls),
+        ('serializers', warm_serializers),
+    ]
+    if connect:
+        steps.append(('connections', warm_connections))
+    return _run(steps)
+
+
+def warm_worker():
+    return _run([('connections', warm_connections)])
+
+
+def _run(steps):
+    report = {}
+    start = time.perf_counter()
+    for name, step in steps:
+        step_start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception('Warm-up step %s failed', name)
+        report[f'{name}_ms'] = _elapsed_ms(step_start)
+    report['total_ms'] = _elapsed_ms(start)
+
+    last_report.update(report)
+    logger.info('Warm-up finished in %.1fms: %s', report['total_ms'], report)
+    return report
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 3)
@@ -0,0 +1,19 @@
+from django.urls import path
+
+from recipe import async_views
+
+
+app_name = 'recipe-async'
+
+urlpatterns = [
+    path('recipes/', async_views.recipes, name='recipe-list'),
+    path('recipes/<int:pk>/', async_views.recipes, name='recipe-detail'),
+    path('tags/', async_views.tags, name='tag-list'),
+    path('tags/<int:pk>/', async_views.tags, name='tag-detail'),
+    path('ingredients/', async_views.ingredients, name='ingredient-list'),
+    path(
+        'ingredients/<int:pk>/',
+        async_views.ingredients,
+        name='ingredient-detail',
+    ),
+]
@@ -0,0 +1,70 @@
+"""
+Async read endpoints for recipes, tags and ingredients.
+
+Served by an ASGI server (``app.asgi``), these views do not hold a worker
+while a client is slow. Django 3.2 has no async ORM API, so queries and
+serialization run through ``sync_to_async`` on the event loop's thread
+pool, reusing the viewsets' filtering and serializers.
+"""
+from asgiref.sync import sync_to_async
+
+from django.db import close_old_connections
+from django.http import HttpResponse
+
+from rest_framework import exceptions, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.request import Request
+
+from core.renderers import FastJSONRenderer
+
+from recipe import views
+
+
+def _read(viewset_class, request, pk=None):
+    drf_request = Request(request, authenticators=[TokenAuthentication()])
+    try:
+        if not drf_request.user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        view = viewset_class(
+            action='list' if pk is None else 'retrieve',
+            request=drf_request,
+            format_kwarg=None,
+            args=(),
+            kwargs={} if pk is None else {'pk': pk},
+        )
+        queryset = view.get_queryset()
+        if pk is None:
+            data = view.list_data(queryset)
+            return data, status.HTTP_200_OK
+        instance = queryset.filter(pk=pk).first()
+        if instance is None:
+            raise exceptions.NotFound()
+        return view.get_serializer(instance).data, status.HTTP_200_OK
+    except exceptions.APIException as exc:
+        return {'detail': exc.detail}, exc.status_code
+    finally:
+        close_old_connections()
+
+
+def _endpoint(viewset_class):
+    read = sync_to_async(_read, thread_sensitive=False)
+
+    async def view(request, pk=None):
+        if request.method != 'GET':
+            return HttpResponse(status=status.HTTP_405_METHOD_NOT_ALLOWED)
+        data, status_code = await read(viewset_class, request, pk)
+        response = HttpResponse(
+            FastJSONRenderer().render(data),
+            status=status_code,
+            content_type='application/json',
+        )
+        if status_code == status.HTTP_401_UNAUTHORIZED:
+            response['WWW-Authenticate'] = 'Token'
+        return response
+
+    return view
+
+
+recipes = _endpoint(views.RecipeViewSet)
+tags = _endpoint(views.TagViewSet)
+ingredients = _endpoint(views.IngredientViewSet)
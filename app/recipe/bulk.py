@@ -0,0 +1,104 @@
+"""
+Set-based changes to many rows of a user's library at once.
+
+Each operation runs a fixed number of statements however many rows it
+changes, deleting and inserting relation rows straight in the M2M through
+tables. That skips the per-row signals, so their work is done here in
+bulk instead: recipes whose relations change are touched for delta sync,
+deleted rows get tombstones, the library cache is invalidated and change
+events are published once the transaction commits.
+"""
+from django.db import transaction
+
+from core import caching, deletion, events, tracking
+from core.models import Recipe, Tag, Ingredient, Tombstone
+
+
+# What ``assign`` can add to and remove from recipes.
+ASSIGNABLE = {
+    'tags': (Tag, Recipe.tags.through, 'tag_id'),
+    'ingredients': (Ingredient, Recipe.ingredients.through, 'ingredient_id'),
+}
+
+
+class Missing(Exception):
+    """Some of the ids given are not the user's, by field."""
+
+    def __init__(self, ids):
+        super().__init__(ids)
+        self.ids = ids
+
+
+def _owned(model, user, ids):
+    return set(
+        model.objects.filter(user=user, pk__in=ids)
+        .values_list('pk', flat=True)
+    )
+
+
+@transaction.atomic
+def delete(model, user, ids):
+    """
+    Delete the rows of ``model`` among ``ids`` that belong to ``user`` and
+    return the ids of those deleted.
+    """
+    found = list(
+        model.objects.filter(user=user, pk__in=ids).order_by('pk')
+        .values_list('pk', flat=True)
+    )
+    if not found:
+        return []
+
+    if model is not Recipe:
+        field = 'tags' if model is Tag else 'ingredients'
+        tracking.touch_recipes(**{f'{field}__in': found})
+    deletion.delete_rows(model, found)
+    Tombstone.objects.bulk_create([
+        Tombstone(user=user, model=tracking.TRACKED[model], object_id=pk)
+        for pk in found
+    ])
+
+    caching.invalidate_library(user.pk)
+    events.publish_on_commit(model, user.pk, found, 'deleted')
+    return found
+
+
+@transaction.atomic
+def assign(user, recipe_ids, add=None, remove=None):
+    """
+    Add tags or ingredients to and remove them from the recipes
+    ``recipe_ids``. ``add`` and ``remove`` map ``'tags'`` or
+    ``'ingredients'`` to ids; removals apply after additions. Raise
+    ``Missing`` unless every id is the user's.
+    """
+    add = add or {}
+    remove = remove or {}
+    missing = {}
+    recipes = _owned(Recipe, user, recipe_ids)
+    if len(recipes) < len(set(recipe_ids)):
+        missing['recipes'] = sorted(set(recipe_ids) - recipes)
+    for key, changes in (('add', add), ('remove', remove)):
+        for name, ids in changes.items():
+            owned = _owned(ASSIGNABLE[name][0], user, ids)
+            if len(owned) < len(set(ids)):
+                missing[f'{key}.{name}'] = sorted(set(ids) - owned)
+    if missing:
+        raise Missing(missing)
+
+    recipes = sorted(recipes)
+    for name, ids in add.items():
+        _, through, column = ASSIGNABLE[name]
+        through.objects.bulk_create([
+            through(recipe_id=recipe_id, **{column: pk})
+            for recipe_id in recipes for pk in set(ids)
+        ], ignore_conflicts=True)
+    for name, ids in remove.items():
+        _, through, column = ASSIGNABLE[name]
+        deletion.raw_delete(through.objects.filter(
+            recipe_id__in=recipes, **{f'{column}__in': ids}
+        ))
+    tracking.touch_recipes(pk__in=recipes)
+
+    caching.invalidate_library(user.pk)
+    events.publish_on_commit(Recipe, user.pk, recipes, 'updated')
+    return recipes
@@ -0,0 +1,148 @@
+"""
+List payloads built by PostgreSQL.
+
+Each row of the list is rendered to JSON by the database, nested tags and
+ingredients included, and handed back as ``bytea`` so Python neither
+decodes nor re-encodes it. Rows are read through a server-side cursor and
+streamed out in chunks.
+
+The documents are put together from ``to_json`` values rather than with
+``json_build_object``/``json_agg``, which add spaces and newlines around
+separators, so the body is byte for byte the one ``FastJSONRenderer``
+emits for the serializers' output.
+"""
+import json
+
+from django.conf import settings
+from django.db import connections
+
+from rest_framework import serializers
+
+
+# Serializer fields whose database value is already its JSON form.
+NATIVE = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.IntegerField,
+)
+
+
+class Unsupported(Exception):
+    """The serializer has a field the database cannot render."""
+
+
+def enabled(queryset):
+    return (
+        settings.RECIPE_LIST_JSON == 'postgres' and
+        connections[queryset.db].vendor == 'postgresql'
+    )
+
+
+def _literal(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _value(field, column):
+    if type(field) in NATIVE:
+        value = column
+    elif type(field) is serializers.DecimalField:
+        # numeric keeps its scale as text, matching the coerced string.
+        value = f'{column}::text'
+    else:
+        raise Unsupported(field.field_name)
+    return f"COALESCE(to_json({value})::text, 'null')"
+
+
+def _object(serializer, alias, model, qn):
+    """Return a text expression of the compact JSON object of a row."""
+    parts = []
+    opening = '{'
+    for name, field in serializer.fields.items():
+        if isinstance(field, serializers.ListSerializer):
+            expression = _relation(field, alias, model, qn)
+        else:
+            column = model._meta.get_field(field.source).column
+            expression = _value(field, f'{alias}.{qn(column)}')
+        parts += [_literal(f'{opening}{json.dumps(name)}:'), expression]
+        opening = ','
+    parts.append(_literal('}' if parts else '{}'))
+    return f'({" || ".join(parts)})'
+
+
+def _relation(field, alias, model, qn):
+    relation = model._meta.get_field(field.source)
+    through = relation.remote_field.through._meta
+    target = relation.related_model
+    owner_column = through.get_field(relation.m2m_field_name()).column
+    target_column = through.get_field(
+        relation.m2m_reverse_field_name()
+    ).column
+    inner = f'{alias}_{field.field_name}'
+    target_pk = f'{inner}.{qn(target._meta.pk.column)}'
+    return (
+        f"('[' || COALESCE((SELECT string_agg("
+        f"{_object(field.child, inner, target, qn)}, ',' "
+        f'ORDER BY {target_pk}) '
+        f'FROM {qn(through.db_table)} AS {inner}_through '
+        f'JOIN {qn(target._meta.db_table)} AS {inner} '
+        f'ON {target_pk} = {inner}_through.{qn(target_column)} '
+        f'WHERE {inner}_through.{qn(owner_column)} = '
+        f"{alias}.{qn(model._meta.pk.column)}), '') || ']')"
+    )
+
+
+def _ordering(queryset, alias, qn):
+    clauses = []
+    for name in queryset.query.order_by:
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        field = queryset.model._meta.pk if name == 'pk' else \
+            queryset.model._meta.get_field(name)
+        clauses.append(
+            f'{alias}.{qn(field.column)}{" DESC" if descending else ""}'
+        )
+    return f' ORDER BY {", ".join(clauses)}' if clauses else ''
+
+
+def build(queryset, serializer_class, fields=None):
+    """Return the SQL and parameters selecting one JSON document a row."""
+    connection = connections[queryset.db]
+    qn = connection.ops.quote_name
+    model = queryset.model
+    serializer = serializer_class(fields=fields)
+    ids, params = queryset.order_by().values('pk').query.sql_with_params()
+    # U+2028 and U+2029 are escaped by the renderer too.
+    document = (
+        f"replace(replace({_object(serializer, 'r', model, qn)}, "
+        f"chr(8232), '\\u2028'), chr(8233), '\\u2029')"
+    )
+    sql = (
+        f"SELECT convert_to({document}, 'UTF8') "
+        f"FROM {qn(model._meta.db_table)} AS r "
+        f"WHERE r.{qn(model._meta.pk.column)} IN ({ids})"
+        f"{_ordering(queryset, 'r', qn)}"
+    )
+    return sql, params
+
+
+def _chunks(alias, sql, params, chunk_size):
+    yield b'['
+    separator = b''
+    with connections[alias].chunked_cursor() as cursor:
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield separator + b','.join(bytes(row[0]) for row in rows)
+            separator = b','
+    yield b']'
+
+
+def stream(queryset, serializer_class, fields=None, chunk_size=500):
+    """
+    Return an iterator over the JSON array of the queryset's rows, in
+    chunks of bytes. Raises ``Unsupported`` before any query runs.
+    """
+    sql, params = build(queryset, serializer_class, fields)
+    return _chunks(queryset.db, sql, params, chunk_size)
@@ -0,0 +1,155 @@
+"""
+Delta sync of a user's library since a client-held watermark.
+
+Each stream (recipes, tags, ingredients and tombstones) is read with a
+keyset on ``(timestamp, id)`` over its ``(user, timestamp)`` index, so a
+page costs the same however large the library is. Timestamps are taken
+before commit, so the returned watermark trails the start of the request
+by ``SYNC_WATERMARK_LAG`` seconds; rows in that window may be sent twice
+but are never missed.
+"""
+import base64
+import datetime
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.models import (Recipe, Tag, Ingredient, Tombstone)
+from recipe import serializers
+
+
+STREAMS = {
+    'recipes': (
+        lambda: Recipe.objects.prefetch_related('tags', 'ingredients'),
+        serializers.RecipeDetailSerializer,
+    ),
+    'tags': (lambda: Tag.objects.all(), serializers.TagSerializer),
+    'ingredients': (
+        lambda: Ingredient.objects.all(), serializers.IngredientSerializer,
+    ),
+}
+
+TOMBSTONE_KEYS = {
+    Tombstone.RECIPE: 'recipes',
+    Tombstone.TAG: 'tags',
+    Tombstone.INGREDIENT: 'ingredients',
+}
+
+
+class SyncError(ValueError):
+    """Invalid sync parameters."""
+
+
+class FullSyncRequired(SyncError):
+    """The watermark predates the retained deletion history."""
+
+
+def parse_since(value):
+    since = parse_datetime(value)
+    if since is None:
+        raise SyncError('since must be an ISO 8601 timestamp.')
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since, datetime.timezone.utc)
+    retention = datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION)
+    if since < timezone.now() - retention:
+        raise FullSyncRequired('since is older than the deletion history; '
+                               'a full sync is required.')
+    return since
+
+
+def encode_cursor(state):
+    return base64.urlsafe_b64encode(json.dumps(state).encode()).decode()
+
+
+def decode_cursor(value):
+    try:
+        state = json.loads(base64.urlsafe_b64decode(value.encode()))
+        if not {'since', 'watermark', 'positions', 'done'} <= set(state):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise SyncError('Invalid cursor.')
+    return state
+
+
+def _keyset(queryset, field, position):
+    if position is None:
+        return queryset
+    timestamp, pk = parse_datetime(position[0]), position[1]
+    return queryset.filter(
+        Q(**{f'{field}__gt': timestamp}) |
+        Q(**{field: timestamp, 'id__gt': pk})
+    )
+
+
+def _page(queryset, field, since, position, page_size):
+    if since is not None:
+        queryset = queryset.filter(**{f'{field}__gt': since})
+    rows = list(
+        _keyset(queryset, field, position).order_by(field, 'id')
+        [:page_size + 1]
+    )
+    more = len(rows) > page_size
+    rows = rows[:page_size]
+    if rows:
+        last = rows[-1]
+        position = [getattr(last, field).isoformat(), last.id]
+    return rows, position, more
+
+
+def changes(user, since=None, cursor=None, page_size=100):
+    """
+    Return one page of rows changed after ``since`` plus the deletions
+    since then. Follow ``next`` until it is null, then keep ``watermark``
+    as the ``since`` of the next sync.
+    """
+    if cursor is not None:
+        state = decode_cursor(cursor)
+        since = state['since'] and parse_datetime(state['since'])
+    else:
+        lag = datetime.timedelta(seconds=settings.SYNC_WATERMARK_LAG)
+        state = {
+            'since': since.isoformat() if since else None,
+            'watermark': (timezone.now() - lag).isoformat(),
+            'positions': {},
+            'done': [],
+        }
+
+    result = {'deleted': {key: [] for key in STREAMS}}
+    more = False
+    for key, (queryset, serializer_class) in STREAMS.items():
+        rows = []
+        if key not in state['done']:
+            rows, state['positions'][key], stream_more = _page(
+                queryset().filter(user=user),
+                'updated_at',
+                since,
+                state['positions'].get(key),
+                page_size,
+            )
+            more = more or stream_more
+            if not stream_more:
+                state['done'].append(key)
+        result[key] = serializer_class(rows, many=True).data
+
+    if since is not None and 'tombstones' not in state['done']:
+        tombstones, state['positions']['tombstones'], stream_more = _page(
+            Tombstone.objects.filter(user=user),
+            'deleted_at',
+            since,
+            state['positions'].get('tombstones'),
+            page_size,
+        )
+        more = more or stream_more
+        if not stream_more:
+            state['done'].append('tombstones')
+        for tombstone in tombstones:
+            result['deleted'][TOMBSTONE_KEYS[tombstone.model]].append(
+                tombstone.object_id
+            )
+
+    result['watermark'] = state['watermark']
+    result['next'] = encode_cursor(state) if more else None
+    return result
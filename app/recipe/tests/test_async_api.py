@@ -0,0 +1,142 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TransactionTestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import (Recipe, Tag, Ingredient)
+
+from recipe.serializers import (
+    RecipeSerializer,
+    RecipeDetailSerializer,
+    TagSerializer,
+)
+
+RECIPES_URL = reverse('recipe-async:recipe-list')
+TAGS_URL = reverse('recipe-async:tag-list')
+INGREDIENTS_URL = reverse('recipe-async:ingredient-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe-async:recipe-detail', args=[recipe_id])
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+        'description': 'Sample description',
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+class PublicAsyncApiTests(TransactionTestCase):
+
+    def test_auth_required(self):
+        response = APIClient().get(RECIPES_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    def test_invalid_token_rejected(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        response = client.get(TAGS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateAsyncApiTests(TransactionTestCase):
+    """The async endpoints run queries in other threads, so data must be
+    committed for them to see it."""
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='test123')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_list_matches_sync_serializer(self):
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, name='Salt')
+        )
+        create_recipe(
+            user=create_user(email='other@example.com', password='test123')
+        )
+
+        response = self.client.get(RECIPES_URL)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        serializer = RecipeSerializer(recipes, many=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), serializer.data)
+
+    def test_filter_by_tags(self):
+        recipe = create_recipe(user=self.user, title='Tagged')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        create_recipe(user=self.user, title='Untagged')
+
+        response = self.client.get(RECIPES_URL, {'tags': f'{tag.id}'})
+
+        self.assertEqual([r['title'] for r in response.json()], ['Tagged'])
+
+    def test_detail(self):
+        recipe = create_recipe(user=self.user)
+
+        response = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(),
+                         RecipeDetailSerializer(recipe).data)
+
+    def test_detail_of_other_users_recipe_not_found(self):
+        other = create_user(email='other@example.com', password='test123')
+        recipe = create_recipe(user=other)
+
+        response = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_tags_assigned_only(self):
+        tag = Tag.objects.create(user=self.user, name='Assigned')
+        Tag.objects.create(user=self.user, name='Unassigned')
+        create_recipe(user=self.user).tags.add(tag)
+
+        response = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(response.json(), [TagSerializer(tag).data])
+
+    def test_ingredients_list(self):
+        Ingredient.objects.create(user=self.user, name='Salt')
+
+        response = self.client.get(INGREDIENTS_URL)
+
+        self.assertEqual([i['name'] for i in response.json()], ['Salt'])
+
+    async def test_served_by_asgi_handler(self):
+        response = await AsyncClient().get(
+            INGREDIENTS_URL,
+            authorization=f'Token {self.token.key}',
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_writes_not_allowed(self):
+        response = self.client.post(RECIPES_URL, {'title': 'New'})
+
+        self.assertEqual(response.status_code,
+                         status.HTTP_405_METHOD_NOT_ALLOWED)
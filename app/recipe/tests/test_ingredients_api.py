@@ -101,6 +101,31 @@ class PrivateIngredientsApiTests(TestCase):
         ingredients = Ingredient.objects.filter(user=self.user)
         self.assertFalse(ingredients.exists())
 
+    def test_bulk_delete_ingredients(self):
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f'Ingredient {i}')
+            for i in range(3)
+        ]
+        recipe = Recipe.objects.create(
+            title='Soup', time_minutes=5, price=Decimal('1.00'),
+            user=self.user,
+        )
+        recipe.ingredients.add(*ingredients)
+        updated_at = recipe.updated_at
+
+        res = self.client.post(
+            reverse('recipe:ingredient-bulk-delete'),
+            {'ids': [ingredients[0].id, ingredients[1].id]}, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['deleted'], [ingredients[0].id, ingredients[1].id]
+        )
+        self.assertEqual(list(recipe.ingredients.all()), [ingredients[2]])
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, updated_at)
+
     def test_filter_ingredients_assigned_to_recipes(self):
         ingredient = Ingredient.objects.create(user=self.user,
                                                name='ingredient1')
@@ -1,17 +1,25 @@
 from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
 import tempfile
 import os
+import uuid
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection
+from django.db.models import Prefetch
+from django.test import TestCase, override_settings
+from django.test.utils import tag as test_tag
 from django.urls import reverse
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
-from core.models import (Recipe, Tag, Ingredient)
+from core import deletion
+from core.models import (Recipe, Tag, Ingredient, Tombstone)
 
 from recipe.serializers import (
     RecipeSerializer,
@@ -19,6 +27,9 @@ from recipe.serializers import (
 )
 
 RECIPES_URL = reverse('recipe:recipe-list')
+BATCH_URL = reverse('recipe:recipe-batch')
+BULK_DELETE_URL = reverse('recipe:recipe-bulk-delete')
+BULK_ASSIGN_URL = reverse('recipe:recipe-bulk-assign')
 
 
 def detail_url(recipe_id):
@@ -415,6 +426,353 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(second_serializer.data, response.data)
         self.assertNotIn(third_serializer.data, response.data)
 
+    def test_batch_retrieve(self):
+        first_recipe = create_recipe(user=self.user, title='First Recipe')
+        second_recipe = create_recipe(user=self.user, title='Second Recipe')
+        first_recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        response = self.client.get(
+            BATCH_URL, {'ids': f'{second_recipe.id},{first_recipe.id}'}
+        )
+
+        serializer = RecipeDetailSerializer(
+            [second_recipe, first_recipe], many=True
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'], serializer.data)
+        self.assertEqual(response.data['missing'], [])
+
+    def test_batch_retrieve_reports_missing_and_other_users(self):
+        other_user = create_user(email='other@example.com', password='test123')
+        other_recipe = create_recipe(user=other_user)
+        recipe = create_recipe(user=self.user)
+
+        response = self.client.post(
+            BATCH_URL, {'ids': [recipe.id, other_recipe.id, 9999]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in response.data['results']],
+                         [recipe.id])
+        self.assertEqual(response.data['missing'], [other_recipe.id, 9999])
+
+    def test_batch_retrieve_constant_queries(self):
+        ids = []
+        for i in range(10):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'I{i}')
+            )
+            ids.append(str(recipe.id))
+
+        with self.assertNumQueries(3):
+            response = self.client.get(BATCH_URL, {'ids': ','.join(ids)})
+
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_batch_retrieve_invalid_ids(self):
+        for params in [{}, {'ids': 'a,b'}]:
+            response = self.client.get(BATCH_URL, params)
+
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+    def test_batch_retrieve_rejects_list_body(self):
+        response = self.client.post(BATCH_URL, [1, 2], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(RECIPE_BATCH_MAX_IDS=2)
+    def test_batch_retrieve_limit(self):
+        response = self.client.get(BATCH_URL, {'ids': '1,2,3'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_delete(self):
+        other_user = create_user(email='other@example.com', password='test123')
+        other_recipe = create_recipe(user=other_user)
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        for recipe in recipes:
+            recipe.tags.add(tag)
+        ids = [recipes[0].id, recipes[2].id, other_recipe.id]
+
+        response = self.client.post(BULK_DELETE_URL, {'ids': ids},
+                                    format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {
+            'deleted': [recipes[0].id, recipes[2].id],
+            'missing': [other_recipe.id],
+        })
+        self.assertEqual(
+            list(Recipe.objects.filter(user=self.user)), [recipes[1]]
+        )
+        self.assertTrue(Recipe.objects.filter(pk=other_recipe.pk).exists())
+        self.assertEqual(Recipe.tags.through.objects.count(), 1)
+        self.assertCountEqual(
+            Tombstone.objects.values_list('model', 'object_id'),
+            [('recipe', recipes[0].id), ('recipe', recipes[2].id)],
+        )
+
+    def test_bulk_delete_removes_images(self):
+        recipe = create_recipe(user=self.user)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image='uploads/recipe/bulk.jpg'
+        )
+        storage = Recipe._meta.get_field('image').storage
+        images = deletion.stats()['images']
+
+        with patch.object(storage, 'delete') as patched_delete, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post(BULK_DELETE_URL, {'ids': [recipe.id]},
+                             format='json')
+
+        patched_delete.assert_called_once_with('uploads/recipe/bulk.jpg')
+        self.assertEqual(deletion.stats()['images'], images + 1)
+
+    def test_bulk_delete_constant_queries(self):
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ids = []
+        for i in range(10):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(tag)
+            ids.append(recipe.id)
+
+        # Select, images, two relation deletes, delete, tombstones,
+        # savepoint and release, however many recipes there are.
+        with self.assertNumQueries(8):
+            self.client.post(BULK_DELETE_URL, {'ids': ids}, format='json')
+
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_delete_invalid_ids(self):
+        for payload in [{}, {'ids': ['a']}]:
+            response = self.client.post(BULK_DELETE_URL, payload,
+                                        format='json')
+
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_actions_reject_list_body(self):
+        urls = [BULK_DELETE_URL, BULK_ASSIGN_URL,
+                reverse('recipe:tag-bulk-delete'),
+                reverse('recipe:ingredient-bulk-delete')]
+        for url in urls:
+            response = self.client.post(url, [1, 2], format='json')
+
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_assign(self):
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        recipes[0].tags.add(vegan, quick)
+        ids = [recipe.id for recipe in recipes[:2]]
+
+        response = self.client.post(BULK_ASSIGN_URL, {
+            'recipes': ids,
+            'add': {'tags': [vegan.id], 'ingredients': [salt.id]},
+            'remove': {'tags': [quick.id]},
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {'updated': ids})
+        for recipe in recipes[:2]:
+            self.assertEqual(list(recipe.tags.all()), [vegan])
+            self.assertEqual(list(recipe.ingredients.all()), [salt])
+        self.assertFalse(recipes[2].tags.exists())
+        recipes[1].refresh_from_db()
+        recipes[2].refresh_from_db()
+        self.assertGreater(recipes[1].updated_at, recipes[2].updated_at)
+
+    def test_bulk_assign_rejects_other_users_ids(self):
+        other_user = create_user(email='other@example.com', password='test123')
+        other_tag = Tag.objects.create(user=other_user, name='Theirs')
+        recipe = create_recipe(user=self.user)
+
+        response = self.client.post(BULK_ASSIGN_URL, {
+            'recipes': [recipe.id],
+            'add': {'tags': [other_tag.id]},
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('add.tags', response.data)
+        self.assertFalse(recipe.tags.exists())
+
+    def test_bulk_assign_requires_changes(self):
+        recipe = create_recipe(user=self.user)
+
+        for payload in [{'recipes': [recipe.id]},
+                        {'recipes': [recipe.id], 'add': {'images': [1]}}]:
+            response = self.client.post(BULK_ASSIGN_URL, payload,
+                                        format='json')
+
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+
+    def test_sparse_fieldset(self):
+        recipe = create_recipe(user=self.user, title='Soup')
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{'id': recipe.id, 'title': 'Soup'}])
+
+    def test_sparse_fieldset_prefetches_requested_relations(self):
+        for i in range(3):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+
+        with self.assertNumQueries(2):
+            response = self.client.get(RECIPES_URL, {'fields': 'title,tags'})
+
+        self.assertEqual(set(response.data[0]), {'title', 'tags'})
+
+    def test_full_list_prefetches_relations(self):
+        for i in range(3):
+            recipe = create_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'I{i}')
+            )
+
+        with self.assertNumQueries(3):
+            self.client.get(RECIPES_URL)
+
+    def test_list_served_from_cache_until_library_changes(self):
+        create_recipe(user=self.user, title='First')
+        self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(RECIPES_URL)
+        self.assertEqual(len(response.data), 1)
+
+        create_recipe(user=self.user, title='Second')
+        response = self.client.get(RECIPES_URL)
+        self.assertEqual([r['title'] for r in response.data],
+                         ['Second', 'First'])
+
+    def test_create_retried_with_idempotency_key(self):
+        payload = {'title': 'Soup', 'time_minutes': 10, 'price': '2.00'}
+        key = uuid.uuid4().hex
+
+        first = self.client.post(RECIPES_URL, payload,
+                                 HTTP_IDEMPOTENCY_KEY=key)
+        with self.assertNumQueries(0):
+            retry = self.client.post(RECIPES_URL, payload,
+                                     HTTP_IDEMPOTENCY_KEY=key)
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_idempotency_key_reused_for_other_request(self):
+        key = uuid.uuid4().hex
+        self.client.post(
+            RECIPES_URL,
+            {'title': 'Soup', 'time_minutes': 10, 'price': '2.00'},
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+        response = self.client.post(
+            RECIPES_URL,
+            {'title': 'Stew', 'time_minutes': 10, 'price': '2.00'},
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+        self.assertEqual(response.status_code,
+                         status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+    def test_sparse_fieldset_on_detail(self):
+        recipe = create_recipe(user=self.user)
+
+        response = self.client.get(
+            detail_url(recipe.id), {'fields': 'description'}
+        )
+
+        self.assertEqual(response.data,
+                         {'description': 'Sample description'})
+
+    def test_sparse_fieldset_unknown_field(self):
+        response = self.client.get(RECIPES_URL, {'fields': 'title,user'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_fast_path_matches_serializer_bytes(self):
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        first = create_recipe(user=self.user, price=Decimal('10.50'))
+        first.tags.add(quick, vegan)
+        first.ingredients.add(salt)
+        second = create_recipe(user=self.user, title='Ünïcode "quoted"',
+                               price=Decimal('0.05'), link='')
+        second.tags.add(vegan)
+        create_recipe(user=self.user, time_minutes=0)
+
+        for params in [{}, {'fields': 'title,tags,price'},
+                       {'tags': f'{vegan.id}'}]:
+            response = self.client.get(RECIPES_URL, params)
+
+            recipes = Recipe.objects.filter(user=self.user).order_by(
+                '-id'
+            ).prefetch_related(
+                Prefetch('tags', queryset=Tag.objects.order_by('id')),
+                Prefetch('ingredients',
+                         queryset=Ingredient.objects.order_by('id')),
+            )
+            if 'tags' in params:
+                recipes = recipes.filter(tags__id=vegan.id)
+            fields = params.get('fields')
+            serializer = RecipeSerializer(
+                recipes, many=True,
+                fields=fields.split(',') if fields else None,
+            )
+            expected = JSONRenderer().render(serializer.data)
+            self.assertEqual(response.content, expected)
+
+    @override_settings(RECIPE_LIST_JSON='postgres')
+    def test_database_json_falls_back_off_postgres(self):
+        create_recipe(user=self.user)
+
+        response = self.client.get(RECIPES_URL)
+
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.data), 1)
+
+    @test_tag('postgres')
+    @skipUnless(connection.vendor == 'postgresql', 'Requires PostgreSQL')
+    def test_database_json_matches_serializer(self):
+        vegan = Tag.objects.create(user=self.user, name='Vegan "v" \\ /')
+        salt = Ingredient.objects.create(user=self.user, name='Sälz\n\t\x01')
+        first = create_recipe(
+            user=self.user, title='Soup \u2028 \u2029 ✓',
+            price=Decimal('10.50'),
+        )
+        first.tags.add(vegan)
+        first.ingredients.add(salt)
+        create_recipe(user=self.user, link='')
+
+        for params in [{}, {'fields': 'id,price,tags'}]:
+            with self.settings(RECIPE_LIST_JSON='python'):
+                expected = self.client.get(RECIPES_URL, params)
+            with self.settings(RECIPE_LIST_JSON='postgres'):
+                response = self.client.get(RECIPES_URL, params)
+
+            self.assertFalse(expected.streaming)
+            self.assertTrue(response.streaming)
+            self.assertEqual(
+                b''.join(response.streaming_content), expected.content
+            )
+
 
 class ImageUploadTests(TestCase):
 
@@ -444,6 +802,26 @@ class ImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_image_retried_with_idempotency_key(self):
+        url = image_upload_url(self.recipe.id)
+        key = uuid.uuid4().hex
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            first = self.client.post(url, {'image': image_file},
+                                     format='multipart',
+                                     HTTP_IDEMPOTENCY_KEY=key)
+            image_file.seek(0)
+            retry = self.client.post(url, {'image': image_file},
+                                     format='multipart',
+                                     HTTP_IDEMPOTENCY_KEY=key)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(os.listdir(os.path.dirname(self.recipe.image.path)),
+                         [os.path.basename(self.recipe.image.path)])
+
     def test_upload_image_bad_request(self):
         url = image_upload_url(self.recipe.id)
         payload = {'image': 'notanimage'}
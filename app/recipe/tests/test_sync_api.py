@@ -0,0 +1,230 @@
+import datetime
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (Recipe, Tag, Ingredient, Tombstone)
+
+from recipe.serializers import RecipeDetailSerializer
+
+
+SYNC_URL = reverse('recipe:sync')
+
+
+def create_recipe(user, **params):
+    defaults = {
+        'title': 'Sample recipe title',
+        'time_minutes': 22,
+        'price': Decimal('5.25'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+class PublicSyncApiTests(TestCase):
+
+    def test_auth_required(self):
+        response = APIClient().get(SYNC_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(SYNC_WATERMARK_LAG=0)
+class PrivateSyncApiTests(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def test_full_sync_returns_library(self):
+        recipe = create_recipe(self.user)
+        Tag.objects.create(user=self.user, name='Vegan')
+        create_recipe(create_user(email='o@example.com', password='pass'))
+
+        response = self.client.get(SYNC_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['recipes'],
+                         [RecipeDetailSerializer(recipe).data])
+        self.assertEqual(len(response.data['tags']), 1)
+        self.assertIsNone(response.data['next'])
+        self.assertIn('watermark', response.data)
+
+    def test_delta_returns_only_changes_and_deletions(self):
+        unchanged = create_recipe(self.user, title='Unchanged')
+        changed = create_recipe(self.user, title='Changed')
+        deleted = create_recipe(self.user, title='Deleted')
+        watermark = self.client.get(SYNC_URL).data['watermark']
+
+        changed.title = 'Changed again'
+        changed.save()
+        deleted_id = deleted.id
+        deleted.delete()
+
+        response = self.client.get(SYNC_URL, {'since': watermark})
+
+        titles = [r['title'] for r in response.data['recipes']]
+        self.assertEqual(titles, ['Changed again'])
+        self.assertNotIn(unchanged.title, titles)
+        self.assertEqual(response.data['deleted']['recipes'], [deleted_id])
+
+    def test_relation_changes_touch_recipe(self):
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        watermark = self.client.get(SYNC_URL).data['watermark']
+
+        recipe.tags.add(tag)
+        response = self.client.get(SYNC_URL, {'since': watermark})
+
+        self.assertEqual([r['id'] for r in response.data['recipes']],
+                         [recipe.id])
+
+    def test_deleting_ingredient_touches_recipes_and_records_tombstone(self):
+        recipe = create_recipe(self.user)
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        recipe.ingredients.add(ingredient)
+        watermark = self.client.get(SYNC_URL).data['watermark']
+
+        ingredient_id = ingredient.id
+        ingredient.delete()
+        response = self.client.get(SYNC_URL, {'since': watermark})
+
+        self.assertEqual(response.data['recipes'][0]['ingredients'], [])
+        self.assertEqual(response.data['deleted']['ingredients'],
+                         [ingredient_id])
+
+    def test_pagination_follows_cursor(self):
+        for i in range(5):
+            create_recipe(self.user, title=f'Recipe {i}')
+
+        ids = []
+        params = {'page_size': 2}
+        pages = 0
+        while True:
+            response = self.client.get(SYNC_URL, params)
+            pages += 1
+            ids += [r['id'] for r in response.data['recipes']]
+            if response.data['next'] is None:
+                break
+            params = {'cursor': response.data['next'], 'page_size': 2}
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(
+            sorted(ids),
+            sorted(Recipe.objects.values_list('id', flat=True)),
+        )
+
+    def test_invalid_since(self):
+        response = self.client.get(SYNC_URL, {'since': 'yesterday'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(SYNC_URL, {'cursor': 'bm90IGpzb24='})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION=1)
+    def test_expired_watermark_requires_full_sync(self):
+        since = timezone.now() - datetime.timedelta(days=2)
+
+        response = self.client.get(SYNC_URL, {'since': since.isoformat()})
+
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_deleting_user_leaves_no_tombstones(self):
+        user = create_user(email='gone@example.com', password='test123')
+        recipe = create_recipe(user)
+        recipe.tags.add(Tag.objects.create(user=user, name='Vegan'))
+
+        user.delete()
+
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_deleting_users_in_bulk_leaves_no_tombstones(self):
+        user = create_user(email='gone@example.com', password='test123')
+        create_recipe(user)
+
+        get_user_model().objects.filter(pk=user.pk).delete()
+
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertFalse(Recipe.objects.filter(user=user).exists())
+
+    def test_failed_user_deletion_keeps_tracking(self):
+        user = create_user(email='kept@example.com', password='test123')
+        recipe = create_recipe(user)
+
+        def fail(sender, **kwargs):
+            raise RuntimeError
+
+        post_delete.connect(fail, sender=Recipe, dispatch_uid='test-fail')
+        self.addCleanup(post_delete.disconnect, sender=Recipe,
+                        dispatch_uid='test-fail')
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            user.delete()
+        post_delete.disconnect(sender=Recipe, dispatch_uid='test-fail')
+
+        recipe.delete()
+
+        self.assertTrue(
+            Tombstone.objects.filter(user=user, model='recipe').exists()
+        )
+
+    def test_renaming_tag_touches_its_recipes(self):
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            updated_at=timezone.now() - datetime.timedelta(hours=1)
+        )
+        before = Recipe.objects.get(pk=recipe.pk).updated_at
+
+        tag.name = 'Plant based'
+        tag.save()
+
+        self.assertGreater(Recipe.objects.get(pk=recipe.pk).updated_at, before)
+
+    def test_query_count_independent_of_library_size(self):
+        for i in range(20):
+            create_recipe(self.user, title=f'Recipe {i}')
+        watermark = self.client.get(SYNC_URL).data['watermark']
+        create_recipe(self.user, title='New')
+
+        with self.assertNumQueries(6):
+            response = self.client.get(SYNC_URL, {'since': watermark})
+
+        self.assertEqual(len(response.data['recipes']), 1)
+
+
+class PruneTombstonesTests(TestCase):
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION=1)
+    def test_prunes_only_expired(self):
+        user = create_user(email='user@example.com', password='test123')
+        old = Tombstone.objects.create(user=user, model='tag', object_id=1)
+        Tombstone.objects.create(user=user, model='tag', object_id=2)
+        Tombstone.objects.filter(pk=old.pk).update(
+            deleted_at=timezone.now() - datetime.timedelta(days=2)
+        )
+
+        with patch('sys.stdout'):
+            from django.core.management import call_command
+            call_command('prune_tombstones')
+
+        self.assertEqual(
+            list(Tombstone.objects.values_list('object_id', flat=True)), [2]
+        )
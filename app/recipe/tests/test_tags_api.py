@@ -1,4 +1,5 @@
 from decimal import Decimal
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.test import TestCase
@@ -12,6 +13,7 @@ from core.models import (
     Recipe
 )
 
+from recipe import fastpath
 from recipe.serializers import (
     TagSerializer
 )
@@ -99,6 +101,31 @@ class PrivateTagsApiTests(TestCase):
         tags = Tag.objects.filter(user=self.user)
         self.assertFalse(tags.exists())
 
+    def test_bulk_delete_tags(self):
+        tags = [
+            Tag.objects.create(user=self.user, name=f'Tag {i}')
+            for i in range(3)
+        ]
+        recipe = Recipe.objects.create(
+            title='Soup', time_minutes=5, price=Decimal('1.00'),
+            user=self.user,
+        )
+        recipe.tags.add(*tags)
+        updated_at = recipe.updated_at
+
+        res = self.client.post(
+            reverse('recipe:tag-bulk-delete'),
+            {'ids': [tags[0].id, tags[1].id]}, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['deleted'], [tags[0].id, tags[1].id]
+        )
+        self.assertEqual(list(recipe.tags.all()), [tags[2]])
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, updated_at)
+
     def test_filter_tags_assigned_to_recipes(self):
         tag = Tag.objects.create(user=self.user, name='tag1')
         tag_2 = Tag.objects.create(user=self.user, name='tag2')
@@ -143,3 +170,22 @@ class PrivateTagsApiTests(TestCase):
         response = self.client.get(TAGS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(response.data), 1)
+
+    def test_sparse_fieldset(self):
+        Tag.objects.create(user=self.user, name='tag1')
+
+        response = self.client.get(TAGS_URL, {'fields': 'name'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, [{'name': 'tag1'}])
+
+    def test_sparse_fieldset_spellings_share_a_plan(self):
+        Tag.objects.create(user=self.user, name='tag1')
+        fastpath._plan.cache_clear()
+
+        for value in ['name,id', 'id,name', 'id,,name,id', ' name , id']:
+            response = self.client.get(TAGS_URL, {'fields': value})
+
+            self.assertEqual(response.data[0], {'id': mock.ANY,
+                                                'name': 'tag1'})
+        self.assertEqual(fastpath._plan.cache_info().currsize, 1)
@@ -1,3 +1,5 @@
+import hashlib
+
 from drf_spectacular.utils import (
     extend_schema,
     extend_schema_view,
@@ -10,16 +12,205 @@ from rest_framework import (
     status
 )
 
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
+from rest_framework.views import APIView
 
+from core import caching, idempotency, singleflight
+from core.batch import BatchAuthentication
+from core.db import routers
 from core.models import (Recipe, Tag, Ingredient)
-from recipe import serializers
+from recipe import bulk, fastpath, pgjson, serializers, sync
+
+
+FIELDS_PARAMETER = OpenApiParameter(
+    'fields',
+    OpenApiTypes.STR,
+    description='Comma separated list of fields to return'
+)
+
+IDEMPOTENCY_KEY_PARAMETER = OpenApiParameter(
+    'Idempotency-Key',
+    OpenApiTypes.STR,
+    location=OpenApiParameter.HEADER,
+    description='Key replaying the first response of a retried request'
+)
+
+BULK_SCHEMA = extend_schema(
+    request=OpenApiTypes.OBJECT, responses=OpenApiTypes.OBJECT
+)
+
+
+def parse_ids(value, field, noun, limit, required=True):
+    """
+    Read a list, or a comma separated string, of ids into a list without
+    duplicates, raising ``ValidationError`` under ``field`` if it is not.
+    """
+    if value is None:
+        value = []
+    elif isinstance(value, str):
+        value = value.split(',') if value else []
+    try:
+        ids = list(dict.fromkeys(int(pk) for pk in value))
+    except (TypeError, ValueError):
+        raise ValidationError({field: [f'Expected a list of {noun} ids.']})
+    if required and not ids:
+        raise ValidationError(
+            {field: [f'At least one {noun} id is required.']}
+        )
+    if len(ids) > limit:
+        raise ValidationError(
+            {field: [f'At most {limit} {noun} ids may be given.']}
+        )
+    return ids
+
+
+def request_object(request):
+    """The request's body, which must be an object to be read by key."""
+    if not isinstance(request.data, dict):
+        raise ValidationError(
+            {'non_field_errors': ['Expected an object.']}
+        )
+    return request.data
+
+
+class SparseFieldsetMixin:
+    """
+    Honour ``?fields=a,b`` on reads: the serializer renders only those
+    fields, the query loads only their columns and relations that were not
+    asked for are not prefetched.
+    """
+    prefetch_fields = []
+
+    def get_requested_fields(self):
+        if self.request.method not in SAFE_METHODS:
+            return None
+        value = self.request.query_params.get('fields')
+        if not value:
+            return None
+        requested = {name.strip() for name in value.split(',')} - {''}
+        known = self.get_serializer_class().Meta.fields
+        unknown = requested - set(known)
+        if unknown:
+            raise ValidationError(
+                {'fields': [f'Unknown fields: {", ".join(sorted(unknown))}']}
+            )
+        # In declaration order, so each field set has a single spelling.
+        return [name for name in known if name in requested]
+
+    def trim_queryset(self, queryset):
+        fields = self.get_requested_fields()
+        prefetch = [
+            name for name in self.prefetch_fields
+            if fields is None or name in fields
+        ]
+        if prefetch:
+            # Ordered to match the rows of the list fast path.
+            queryset = queryset.prefetch_related(*[
+                Prefetch(name, queryset=self._related_model(name)
+                         .objects.order_by('id'))
+                for name in prefetch
+            ])
+        if fields is not None:
+            columns = [name for name in fields
+                       if name not in self.prefetch_fields]
+            queryset = queryset.only('id', *columns)
+        return queryset
+
+    def _related_model(self, name):
+        return self.queryset.model._meta.get_field(name).related_model
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs.setdefault('fields', fields)
+        return super().get_serializer(*args, **kwargs)
+
+
+class BulkDeleteMixin:
+    """Delete many of the user's rows in a fixed number of statements."""
+
+    @action(methods=['POST'], detail=False, url_path='bulk-delete')
+    def bulk_delete(self, request):
+        model = self.queryset.model
+        ids = parse_ids(
+            request_object(request).get('ids'), 'ids',
+            model._meta.model_name,
+            settings.BULK_MAX_IDS,
+        )
+        deleted = bulk.delete(model, request.user, ids)
+        return Response({
+            'deleted': deleted,
+            'missing': sorted(set(ids) - set(deleted)),
+        })
+
+
+class FastListMixin:
+    """Render lists from ``values_list()`` rows instead of serializers."""
+
+    def list_data(self, queryset):
+        return fastpath.represent(
+            queryset,
+            self.get_serializer_class(),
+            self.get_requested_fields(),
+        )
+
+    def coalesced_list_data(self, queryset):
+        return singleflight.coalesce(
+            self.request, lambda: self.list_data(queryset)
+        )
+
+    def cached_list_data(self, queryset):
+        """
+        Serve the list from the cache, recomputed without stampeding when
+        it expires or the user's library changes.
+        """
+        timeout = settings.LIST_CACHE_TIMEOUT
+        if not timeout:
+            return self.coalesced_list_data(queryset)
+        user_id = self.request.user.pk
+        path = hashlib.blake2b(
+            self.request.get_full_path().encode(), digest_size=16
+        ).hexdigest()
+
+        def fill():
+            # Stored lists are read from the primary: one a lagging
+            # replica returned would be served as fresh until it expires.
+            with routers.primary():
+                return self.list_data(queryset)
+
+        # Clients reading their own writes never get a stale list.
+        state = routers.current()
+        return caching.get_or_compute(
+            caches[settings.LIST_CACHE],
+            f'list:{type(self).__name__}:{user_id}:{path}',
+            lambda: singleflight.coalesce(self.request, fill),
+            timeout,
+            scope=caching.library_scope(user_id),
+            stale=settings.LIST_CACHE_STALE,
+            beta=settings.LIST_CACHE_BETA,
+            jitter=settings.LIST_CACHE_JITTER,
+            allow_stale=state is not None and state.use_replica,
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(self.cached_list_data(queryset))
 
 
 @extend_schema_view(
+    create=extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER]),
+    bulk_delete=BULK_SCHEMA,
+    bulk_assign=BULK_SCHEMA,
+    upload_image=extend_schema(parameters=[IDEMPOTENCY_KEY_PARAMETER]),
     list=extend_schema(
         parameters=[
             OpenApiParameter(
@@ -32,14 +223,30 @@ from recipe import serializers
                 OpenApiTypes.STR,
                 description='Comma separate list of ingredients IDs to filter'
             ),
+            FIELDS_PARAMETER,
         ]
-    )
+    ),
+    retrieve=extend_schema(parameters=[FIELDS_PARAMETER]),
+    batch=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'ids',
+                OpenApiTypes.STR,
+                description='Comma separated list of recipe IDs to retrieve'
+            ),
+            FIELDS_PARAMETER,
+        ]
+    ),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(FastListMixin,
+                    SparseFieldsetMixin,
+                    BulkDeleteMixin,
+                    viewsets.ModelViewSet):
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [BatchAuthentication, TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    prefetch_fields = ['tags', 'ingredients']
 
     def _params_to_ints(self, qs):
         return [int(str_id) for str_id in qs.split(',')]
@@ -56,8 +263,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
             queryset = self.queryset.filter(
                 ingredients__id__in=ingredients_ids)
 
-        return queryset.filter(user=self.request.user).order_by('-id'
-                                                                ).distinct()
+        queryset = queryset.filter(
+            user=self.request.user
+        ).order_by('-id').distinct()
+        return self.trim_queryset(queryset)
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -67,11 +276,39 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return self.serializer_class
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if request.accepted_renderer.format == 'json' and \
+                pgjson.enabled(queryset):
+            try:
+                chunks = pgjson.stream(
+                    queryset,
+                    self.get_serializer_class(),
+                    self.get_requested_fields(),
+                )
+            except pgjson.Unsupported:
+                pass
+            else:
+                return StreamingHttpResponse(
+                    chunks, content_type='application/json'
+                )
+        return Response(self.cached_list_data(queryset))
+
+    def create(self, request, *args, **kwargs):
+        return idempotency.run(
+            request, lambda: super(RecipeViewSet, self).create(
+                request, *args, **kwargs
+            )
+        )
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
+        return idempotency.run(request, lambda: self._upload_image(request))
+
+    def _upload_image(self, request):
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
         if serializer.is_valid():
@@ -80,6 +317,59 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.data, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['GET', 'POST'], detail=False, url_path='batch')
+    def batch(self, request):
+        """Retrieve several recipes by id in a fixed number of queries."""
+        if request.method == 'POST':
+            ids = request_object(request).get('ids')
+        else:
+            ids = request.query_params.get('ids', '')
+        ids = parse_ids(
+            ids, 'ids', 'recipe',
+            settings.RECIPE_BATCH_MAX_IDS,
+        )
+
+        recipes = self.trim_queryset(
+            Recipe.objects.filter(user=request.user, id__in=ids)
+        ).in_bulk()
+        found = [recipes[pk] for pk in ids if pk in recipes]
+        return Response({
+            'results': self.get_serializer(found, many=True).data,
+            'missing': [pk for pk in ids if pk not in recipes],
+        })
+
+    @action(methods=['POST'], detail=False, url_path='bulk-assign')
+    def bulk_assign(self, request):
+        """Add tags or ingredients to and remove them from many recipes."""
+        limit = settings.BULK_MAX_IDS
+        data = request_object(request)
+        recipes = parse_ids(data.get('recipes'), 'recipes', 'recipe', limit)
+        changes = {}
+        for key in ('add', 'remove'):
+            value = data.get(key) or {}
+            if not isinstance(value, dict) or \
+                    set(value) - set(bulk.ASSIGNABLE):
+                raise ValidationError({key: [
+                    'Expected an object of tag and ingredient id lists.'
+                ]})
+            changes[key] = {
+                name: parse_ids(ids, f'{key}.{name}', name[:-1], limit,
+                                required=False)
+                for name, ids in value.items()
+            }
+        if not any(any(ids.values()) for ids in changes.values()):
+            raise ValidationError(
+                {'non_field_errors': ['Nothing to add or remove.']}
+            )
+        try:
+            updated = bulk.assign(request.user, recipes, **changes)
+        except bulk.Missing as exc:
+            raise ValidationError({
+                field: [f'Unknown ids: {", ".join(map(str, ids))}']
+                for field, ids in exc.ids.items()
+            })
+        return Response({'updated': updated})
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -88,15 +378,20 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 'assigned_only',
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to recipes.'
-            )
+            ),
+            FIELDS_PARAMETER,
         ]
-    )
+    ),
+    bulk_delete=BULK_SCHEMA,
 )
-class BaseRecipeAttrViewSet(mixins.ListModelMixin,
+class BaseRecipeAttrViewSet(FastListMixin,
+                            SparseFieldsetMixin,
+                            BulkDeleteMixin,
+                            mixins.ListModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.DestroyModelMixin,
                             viewsets.GenericViewSet):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [BatchAuthentication, TokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -108,9 +403,9 @@ class BaseRecipeAttrViewSet(mixins.ListModelMixin,
         if assigned_only:
             queryset = queryset.filter(recipe__isnull=False)
 
-        return queryset.filter(
+        return self.trim_queryset(queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by('-name').distinct())
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -121,3 +416,47 @@ class TagViewSet(BaseRecipeAttrViewSet):
 class IngredientViewSet(BaseRecipeAttrViewSet):
     serializer_class = serializers.IngredientSerializer
     queryset = Ingredient.objects.all()
+
+
+class SyncView(APIView):
+    authentication_classes = [BatchAuthentication, TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'since',
+                OpenApiTypes.DATETIME,
+                description='Watermark returned by the previous sync.'
+            ),
+            OpenApiParameter(
+                'cursor',
+                OpenApiTypes.STR,
+                description='Value of next from the previous page.'
+            ),
+            OpenApiParameter('page_size', OpenApiTypes.INT),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    def get(self, request):
+        params = request.query_params
+        try:
+            page_size = min(
+                int(params.get('page_size', 100)),
+                settings.SYNC_MAX_PAGE_SIZE,
+            )
+            since = params.get('since')
+            result = sync.changes(
+                request.user,
+                since=sync.parse_since(since) if since else None,
+                cursor=params.get('cursor'),
+                page_size=max(page_size, 1),
+            )
+        except sync.FullSyncRequired as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_410_GONE)
+        except ValueError as exc:
+            return Response(
+                {'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(result)
@@ -1,8 +1,37 @@
+# EventSource cannot set headers, so the change feed takes its token in the
+# query string; requests to the ASGI app are logged without it.
+log_format  no_query  '$remote_addr - $remote_user [$time_local] '
+                      '"$request_method $uri $server_protocol" $status '
+                      '$body_bytes_sent "$http_user_agent"';
+
 server {
     listen ${LISTEN_PORT};
 
     location /static {
-        alias /vol/static;
+        root /vol;
+
+        location /static/static/ {
+            # collectstatic writes a precompressed .gz next to each file.
+            gzip_static on;
+            gzip_vary   on;
+
+            # Content-hashed names never change content.
+            location ~ "\.[0-9a-f]{12}\.\w+$" {
+                add_header  Cache-Control "public, max-age=31536000, immutable";
+            }
+        }
+    }
+
+    # Served by the ASGI app: async reads and the Server-Sent Events feed,
+    # whose events must reach the client unbuffered.
+    location ~ ^/api/(async/|recipe/events/) {
+        proxy_pass              http://${ASGI_HOST}:${ASGI_PORT};
+        proxy_http_version      1.1;
+        proxy_set_header        Host $host;
+        proxy_set_header        Connection "";
+        proxy_buffering         off;
+        proxy_read_timeout      1h;
+        access_log              /var/log/nginx/access.log no_query;
     }
 
     location / {
@@ -10,4 +39,4 @@ server {
         include                 /etc/nginx/uwsgi_params;
         client_max_body_size    10M;
     }
-}
\ No newline at end of file
+}